@@ -0,0 +1,409 @@
+"""
+The Elite Flower — Servidor de ingesta asyncio (motor "asyncio").
+Misma interfaz que ImageServer (constructor con la cola, start/stop, rutas),
+pero todas las conexiones viven en un único event loop: un teléfono lento
+enviando por Wi-Fi sólo ocupa una corrutina, no un hilo del pool.
+
+  • POST /upload y POST /upload/batch se leen de forma nativa: el cuerpo se
+    recibe en el loop y cada bloque se escribe a disco en un pool de hilos.
+  • El resto de rutas (reanudables, /health, /) se sirven con la misma app
+    Flask: el cuerpo se lee completo en el loop y la app corre en el pool.
+  • Las fotos llegan al manager por la misma cola thread-safe (ImageServer._publish).
+
+Sin dependencias nuevas: HTTP/1.1 mínimo (keep-alive, Content-Length y
+chunked) sobre asyncio.start_server.
+"""
+
+import asyncio
+import io
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from engines import MAX_DRAIN_BYTES
+from events import PhotoQueue
+from ingest import UploadRejected
+from server import REQUEST_SECONDS, ImageServer, Reply
+from startup import SERVER_LISTENING, STARTUP
+
+logger = logging.getLogger("aioserver")
+
+MAX_HEADER_BYTES = 64 * 1024
+
+# Rutas cuyo cuerpo se ingiere de forma nativa en el loop
+_NATIVE_ROUTES = {"/upload", "/upload/batch"}
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class _TooLarge(Exception):
+    pass
+
+
+class _BodyReader:
+    """Cuerpo de una petición (Content-Length o chunked), leído en el loop."""
+
+    def __init__(self, reader: asyncio.StreamReader, length: Optional[int], chunked: bool,
+                 timeout: float, limit: int,
+                 continue_to: Optional[asyncio.StreamWriter] = None):
+        self._reader = reader
+        self._remaining = length or 0
+        self._chunked = chunked
+        self._chunk_left = 0
+        self._timeout = timeout
+        self._limit = limit
+        self.received = 0
+        self.complete = not chunked and not length
+        # Expect: 100-continue: el 100 sale con la primera lectura, tras la admisión
+        self._continue_to = None if self.complete else continue_to
+
+    @property
+    def awaiting_continue(self) -> bool:
+        return self._continue_to is not None
+
+    async def read(self, n: int) -> bytes:
+        """Hasta n bytes (menos sólo al final del cuerpo); b"" al terminar."""
+        if self._continue_to is not None:
+            self._continue_to.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            self._continue_to = None
+        parts: List[bytes] = []
+        size = 0
+        while size < n and not self.complete:
+            data = await asyncio.wait_for(self._read_some(n - size), self._timeout)
+            if not data:
+                break
+            parts.append(data)
+            size += len(data)
+        self.received += size
+        if self.received > self._limit:
+            raise _TooLarge()
+        return b"".join(parts)
+
+    async def read_all(self) -> bytes:
+        parts = []
+        while True:
+            data = await self.read(256 * 1024)
+            if not data:
+                return b"".join(parts)
+            parts.append(data)
+
+    async def drain(self, limit: int) -> bool:
+        """Descarta el resto del cuerpo; False si excede `limit` (hay que cerrar)."""
+        if self._continue_to is not None:
+            # El cliente espera el 100 Continue: puede enviar el cuerpo o no
+            return False
+        discarded = 0
+        while not self.complete:
+            data = await self._read_some(64 * 1024)
+            if not data:
+                return False
+            discarded += len(data)
+            if discarded > limit:
+                return False
+        return True
+
+    async def _read_some(self, n: int) -> bytes:
+        if not self._chunked:
+            data = await self._reader.read(min(n, self._remaining))
+            if not data:
+                raise ConnectionResetError("cuerpo incompleto")
+            self._remaining -= len(data)
+            self.complete = self._remaining == 0
+            return data
+
+        if self._chunk_left == 0:
+            line = await self._reader.readline()
+            try:
+                self._chunk_left = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise _BadRequest("chunk inválido")
+            if self._chunk_left == 0:
+                # Trailers opcionales hasta la línea vacía
+                while (await self._reader.readline()).strip():
+                    pass
+                self.complete = True
+                return b""
+        data = await self._reader.read(min(n, self._chunk_left))
+        if not data:
+            raise ConnectionResetError("cuerpo incompleto")
+        self._chunk_left -= len(data)
+        if self._chunk_left == 0:
+            await self._reader.readexactly(2)  # CRLF tras cada chunk
+        return data
+
+
+class AsyncImageServer(ImageServer):
+    """ImageServer servido por asyncio en lugar de un servidor WSGI con hilos."""
+
+    def __init__(self, photo_queue: PhotoQueue):
+        super().__init__(photo_queue)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._aserver: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+        # Escritura a disco, hash, SQLite y rutas Flask: fuera del loop
+        self._disk = ThreadPoolExecutor(max_workers=self._cfg["server_workers"],
+                                        thread_name_prefix="aio-disk")
+        self._connections: set = set()
+        self._active_requests = 0
+
+    # ───────── Ciclo de vida ─────────
+    def _serve(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._aserver = await asyncio.start_server(
+            self._handle_connection, self._cfg["host"], self._cfg["port"],
+            backlog=self._cfg["server_backlog"], limit=MAX_HEADER_BYTES,
+        )
+        self.listening.set()
+        STARTUP.mark(SERVER_LISTENING)
+        await self._stopped.wait()
+
+    def stop(self, drain: bool = False):
+        """Deja de aceptar conexiones; con drain=True espera a las peticiones en curso."""
+        loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(drain), loop)
+        future.result(timeout=self._cfg["server_read_timeout_s"] + 5)
+        self._disk.shutdown(wait=drain)
+
+    async def _shutdown(self, drain: bool):
+        self._aserver.close()
+        loop = asyncio.get_running_loop()
+        if drain:
+            deadline = loop.time() + self._cfg["server_read_timeout_s"]
+            while self._active_requests and loop.time() < deadline:
+                await asyncio.sleep(0.05)
+        for task in list(self._connections):
+            task.cancel()
+        self._stopped.set()
+
+    # ───────── Conexiones ─────────
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        peer = writer.get_extra_info("peername") or ("", 0)
+        first = True
+        try:
+            while True:
+                timeout = self._cfg["server_read_timeout_s"] if first else self._cfg["server_keepalive_s"]
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    return
+                first = False
+                self._active_requests += 1
+                try:
+                    keep_alive = await self._handle_request(head, reader, writer, peer)
+                finally:
+                    self._active_requests -= 1
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Error atendiendo a %s", peer[0])
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _handle_request(self, head: bytes, reader: asyncio.StreamReader,
+                              writer: asyncio.StreamWriter, peer) -> bool:
+        """Atiende una petición; devuelve True si la conexión sigue abierta."""
+        try:
+            method, target, version, headers = self._parse_head(head)
+        except _BadRequest:
+            await self._send(writer, 400, {"error": "Petición HTTP inválida."}, keep_alive=False)
+            return False
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        try:
+            length = None if chunked else int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            await self._send(writer, 400, {"error": "Content-Length inválido."}, keep_alive=False)
+            return False
+
+        limit = self._app.config["MAX_CONTENT_LENGTH"]
+        if length is not None and length > limit:
+            await self._send(writer, 413, self._too_large_payload(), keep_alive=False)
+            return False
+
+        expect_continue = headers.get("expect", "").lower() == "100-continue"
+        body = _BodyReader(reader, length, chunked, self._cfg["server_read_timeout_s"], limit,
+                           writer if expect_continue else None)
+
+        path, _, query = target.partition("?")
+        path = unquote(path)
+        try:
+            if method == "POST" and path in _NATIVE_ROUTES:
+                started = time.perf_counter()
+                status, payload = await self._ingest(path, headers, length, body)
+                response = (status, self._json(payload), "application/json",
+                            self._reply_headers(status))
+                # Las rutas servidas por Flask se miden en sus propios hooks
+                REQUEST_SECONDS.labels(path, method).observe(time.perf_counter() - started)
+            else:
+                response = await self._call_wsgi(method, path, query, version, headers,
+                                                 await body.read_all(), peer)
+        except _TooLarge:
+            await self._send(writer, 413, self._too_large_payload(), keep_alive=False)
+            return False
+        except _BadRequest:
+            await self._send(writer, 400, {"error": "Petición HTTP inválida."}, keep_alive=False)
+            return False
+
+        # Respuesta anticipada (error, duplicado anunciado): descartar el resto del cuerpo
+        if not body.complete and not await body.drain(MAX_DRAIN_BYTES):
+            keep_alive = False
+
+        status, data, content_type, extra = response
+        await self._write(writer, status, data, content_type, extra, keep_alive)
+        return keep_alive
+
+    # ───────── Rutas nativas ─────────
+    async def _ingest(self, path: str, headers: Dict[str, str], length: Optional[int],
+                      body: _BodyReader) -> Tuple[int, dict]:
+        loop = asyncio.get_running_loop()
+        content_type = headers.get("content-type")
+        if path == "/upload":
+            ingestor, early = await loop.run_in_executor(
+                self._disk, self._begin_upload, content_type, headers.get("x-content-sha256", ""),
+                length, headers.get("x-filename", ""))
+            outcomes = None
+        else:
+            ingestor, outcomes, early = await loop.run_in_executor(
+                self._disk, self._begin_batch, content_type, length)
+        if early is not None:
+            return early[1], early[0]
+
+        try:
+            while True:
+                data = await body.read(self._chunk_size)
+                await loop.run_in_executor(self._disk, ingestor.feed, data or None)
+                if not data:
+                    break
+        except (UploadRejected, ValueError) as e:
+            payload, status = await loop.run_in_executor(self._disk, self._ingest_failed,
+                                                         e, ingestor)
+            return status, payload
+        except BaseException:
+            # Cliente desconectado, timeout o cuerpo demasiado grande: sin restos en disco
+            await loop.run_in_executor(self._disk, ingestor.discard)
+            raise
+
+        if outcomes is None:
+            reply: Reply = await loop.run_in_executor(self._disk, self._finish_upload, ingestor)
+        else:
+            reply = await loop.run_in_executor(self._disk, self._finish_batch, ingestor, outcomes)
+        return reply[1], reply[0]
+
+    # ───────── Puente WSGI (resto de rutas) ─────────
+    async def _call_wsgi(self, method: str, path: str, query: str, version: str,
+                         headers: Dict[str, str], body: bytes, peer):
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": self._cfg["host"],
+            "SERVER_PORT": str(self._cfg["port"]),
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": peer[0],
+            "REMOTE_PORT": str(peer[1]),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            if key == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif key not in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+                environ[f"HTTP_{key}"] = value
+        return await asyncio.get_running_loop().run_in_executor(self._disk, self._run_wsgi, environ)
+
+    def _run_wsgi(self, environ: dict):
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = response_headers
+
+        result = self._app(environ, start_response)
+        try:
+            data = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        content_type = "application/json"
+        extra = []
+        for name, value in started["headers"]:
+            lowered = name.lower()
+            if lowered == "content-type":
+                content_type = value
+            elif lowered not in ("content-length", "connection", "transfer-encoding"):
+                extra.append((name, value))
+        return started["status"], data, content_type, extra
+
+    # ───────── HTTP ─────────
+    @staticmethod
+    def _parse_head(head: bytes):
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+        except (UnicodeDecodeError, ValueError):
+            raise _BadRequest()
+        if not version.startswith("HTTP/1."):
+            raise _BadRequest()
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise _BadRequest()
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, version, headers
+
+    def _json(self, payload: dict) -> bytes:
+        # Lo que devolvería jsonify: mismo proveedor JSON, separadores compactos incluidos
+        return self._app.json.response(payload).get_data()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: dict,
+                    keep_alive: bool):
+        await self._write(writer, status, self._json(payload), "application/json", [], keep_alive)
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, status: int, data: bytes, content_type: str,
+                     extra: List[Tuple[str, str]], keep_alive: bool):
+        reason = HTTPStatus(status).phrase if status in HTTPStatus._value2member_map_ else ""
+        lines = [
+            f"HTTP/1.1 {status} {reason}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in extra]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
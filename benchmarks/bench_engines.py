@@ -0,0 +1,136 @@
+"""
+The Elite Flower — Benchmark de motores HTTP.
+Compara los motores "pool" (keep-alive), "asyncio" y el servidor de desarrollo "dev"
+enviando subidas concurrentes a POST /upload por loopback.
+
+Uso:
+    python benchmarks/bench_engines.py --clients 16 --uploads 20 --size-kb 3000
+"""
+
+import argparse
+import http.client
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from config import APP_CONFIG, find_available_port  # noqa: E402
+from events import PhotoQueue  # noqa: E402
+from server import create_image_server  # noqa: E402
+
+
+def jpeg_payload(size_kb: int) -> bytes:
+    """
+    JPEG pequeño real + relleno aleatorio + EOI: pasa la validación estructural
+    (firma, cabecera, fin) sin coste de codificación y sin repetir contenido.
+    """
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (125, 160, 125)).save(buf, "JPEG")
+    jpeg = buf.getvalue()
+    return jpeg + os.urandom(max(0, size_kb * 1024 - len(jpeg) - 2)) + b"\xff\xd9"
+
+
+def _multipart_body(payload: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="image"; filename="bench.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + payload + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def _client(port: int, uploads: int, body: bytes, content_type: str,
+            keep_alive: bool, latencies: list, errors: list):
+    conn = None
+    for _ in range(uploads):
+        if conn is None or not keep_alive:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/upload", body=body, headers={"Content-Type": content_type})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except OSError as e:
+            errors.append(repr(e))
+            conn = None
+            continue
+        latencies.append(time.perf_counter() - t0)
+    if conn is not None:
+        conn.close()
+
+
+def run_engine(engine: str, clients: int, uploads: int, size_kb: int) -> dict:
+    folder = tempfile.mkdtemp(prefix=f"bench_{engine}_")
+    APP_CONFIG.update(upload_folder=folder, server_engine=engine,
+                      port=find_available_port(18000), host="127.0.0.1")
+    photo_queue = PhotoQueue()  # sin consumidor: sin límite, mide sólo la ingesta
+    server = create_image_server(photo_queue)
+    server.start()
+    time.sleep(0.3)
+
+    body, content_type = _multipart_body(jpeg_payload(size_kb))
+    latencies: list = []
+    errors: list = []
+    threads = [
+        threading.Thread(target=_client, args=(APP_CONFIG["port"], uploads, body, content_type,
+                                               True, latencies, errors))
+        for _ in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    server.stop()
+    shutil.rmtree(folder, ignore_errors=True)
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000  # noqa: E731
+    return {
+        "engine": engine,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "uploads_per_s": round(len(latencies) / elapsed, 1),
+        "mb_per_s": round(len(latencies) * size_kb / 1024 / elapsed, 1),
+        "p50_ms": round(p(0.50), 1),
+        "p99_ms": round(p(0.99), 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--uploads", type=int, default=20, help="subidas por cliente")
+    parser.add_argument("--size-kb", type=int, default=3000)
+    parser.add_argument("--engines", nargs="+", default=["dev", "pool", "asyncio"])
+    args = parser.parse_args()
+
+    print(f"{args.clients} clientes × {args.uploads} subidas de {args.size_kb} KB")
+    for engine in args.engines:
+        r = run_engine(engine, args.clients, args.uploads, args.size_kb)
+        print(f"  {r['engine']:<7} ok={r['ok']:<5} err={r['errors']:<3} "
+              f"{r['uploads_per_s']:>7} subidas/s {r['mb_per_s']:>7} MB/s  "
+              f"p50={r['p50_ms']} ms p99={r['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
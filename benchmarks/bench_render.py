@@ -0,0 +1,364 @@
+"""
+The Elite Flower — Benchmark de pintado en la GUI.
+Mide bajo un servidor X virtual (Xvfb) lo que cuesta en el hilo de Tk pintar una foto:
+ImageViewer.show_image, ImageViewer._do_resize y HistoryBar.add_thumbnail del
+paquete ui, frente a PhotoReceiverApp._display_image de main_desktop.py (legado).
+Cada llamada se desglosa en decodificación, reescalado, máscara/composición y
+conversión a PhotoImage; además se mide cuánto queda bloqueado el bucle de
+eventos (la llamada más el pintado pendiente) y el retraso de un latido de
+`--heartbeat-ms` programado con after().
+
+Si no hay DISPLAY se arranca un Xvfb propio (hace falta el binario Xvfb).
+
+Uso:
+    python benchmarks/bench_render.py --sizes 2MP 12MP --formats jpeg png --repeat 5
+    python benchmarks/bench_render.py --sizes 48MP --output render.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import (Image, ImageDraw, ImageFile, ImageFilter, ImageOps,  # noqa: E402
+                 ImageTk, JpegImagePlugin)
+
+from config import APP_CONFIG  # noqa: E402
+
+SIZES = {"2MP": (1600, 1200), "12MP": (4000, 3000), "48MP": (8000, 6000)}
+FORMATS = {"jpeg": ("JPEG", ".jpg", {"quality": 90}),
+           "png": ("PNG", ".png", {"compress_level": 6}),
+           "webp": ("WEBP", ".webp", {"quality": 85})}
+PHASES = ("decode", "resample", "mask", "photoimage")
+WINDOW = "1280x800"
+RESIZED = "1024x680"
+
+# Funciones de Pillow que se cronometran, por fase. El tiempo se atribuye a la
+# llamada más interna (thumbnail() llama a draft() y load(): cada una a su fase).
+_PATCHES = [
+    ("decode", Image, "open"),
+    ("decode", ImageFile.ImageFile, "load"),
+    ("decode", Image.Image, "draft"),
+    ("decode", JpegImagePlugin.JpegImageFile, "draft"),
+    ("resample", Image.Image, "resize"),
+    ("resample", Image.Image, "reduce"),
+    ("resample", Image.Image, "thumbnail"),
+    ("resample", Image.Image, "transpose"),
+    ("resample", ImageOps, "exif_transpose"),
+    ("mask", Image.Image, "paste"),
+    ("mask", Image.Image, "putalpha"),
+    ("mask", ImageDraw.ImageDraw, "rounded_rectangle"),
+    ("photoimage", ImageTk.PhotoImage, "__init__"),
+]
+
+
+class PhaseTimer:
+    """Acumula tiempo exclusivo por fase; sólo cuenta lo que corre en el hilo de Tk."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._stack: list = []
+        self._thread = threading.main_thread()
+        self._saved: list = []
+
+    def install(self):
+        for phase, owner, name in _PATCHES:
+            original = owner.__dict__.get(name)
+            if original is None:
+                continue
+            self._saved.append((owner, name, original))
+            setattr(owner, name, self._wrap(phase, original))
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._saved):
+            setattr(owner, name, original)
+        self._saved.clear()
+
+    def reset(self):
+        self.totals.clear()
+
+    def _wrap(self, phase: str, fn):
+        timer = self
+
+        def timed(*args, **kwargs):
+            if threading.current_thread() is not timer._thread:
+                return fn(*args, **kwargs)
+            timer._stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                nested = timer._stack.pop()
+                timer.totals[phase] += elapsed - nested
+                if timer._stack:
+                    timer._stack[-1] += elapsed
+
+        timed.__wrapped__ = fn
+        return timed
+
+
+# ───────── Servidor X virtual ─────────
+def start_xvfb() -> subprocess.Popen:
+    """Arranca Xvfb en el primer display libre y exporta DISPLAY."""
+    binary = shutil.which("Xvfb")
+    if binary is None:
+        raise SystemExit("No hay DISPLAY ni binario Xvfb (apt install xvfb)")
+    read_fd, write_fd = os.pipe()
+    proc = subprocess.Popen(
+        [binary, "-displayfd", str(write_fd), "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+        pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        display = pipe.readline().strip()
+    if not display:
+        proc.kill()
+        raise SystemExit("Xvfb no arrancó")
+    os.environ["DISPLAY"] = f":{display}"
+    return proc
+
+
+# ───────── Imágenes sintéticas ─────────
+def make_sample(folder: str, size_name: str, fmt: str) -> str:
+    w, h = SIZES[size_name]
+    # Ruido suavizado: contenido con detalle para que el decodificador trabaje de verdad
+    base = Image.effect_noise((w // 8, h // 8), 80).convert("RGB").filter(ImageFilter.SMOOTH)
+    img = base.resize((w, h), Image.BILINEAR)
+    pil_format, ext, options = FORMATS[fmt]
+    path = os.path.join(folder, f"{size_name}_{fmt}{ext}")
+    img.save(path, pil_format, **options)
+    return path
+
+
+# ───────── Escenario ─────────
+class RenderBench:
+    """
+    Ejecuta los casos dentro del mainloop de Tk, un paso por after(), para que
+    el latido pueda medir cuánto se retrasa el bucle de eventos.
+    """
+
+    def __init__(self, samples: dict, repeat: int, heartbeat_ms: int, legacy: bool):
+        import customtkinter as ctk
+
+        from ui.viewer import HistoryBar, ImageViewer
+
+        self.samples = samples
+        self.repeat = repeat
+        self.heartbeat_ms = heartbeat_ms
+        self.timer = PhaseTimer()
+        self.results: list = []
+
+        self.root = ctk.CTk()
+        self.root.geometry(WINDOW)
+        self.viewer = ImageViewer(self.root, local_ip="127.0.0.1")
+        self.viewer.pack(expand=True, fill="both")
+        self.history = HistoryBar(self.root)
+        self.history.pack(fill="x")
+
+        self.legacy = None
+        if legacy:
+            import main_desktop
+
+            main_desktop.UPLOAD_FOLDER = APP_CONFIG["upload_folder"]
+            self.legacy = main_desktop.PhotoReceiverApp()
+            self.legacy.geometry(WINDOW)
+
+        self._steps = self._plan()
+        self._case = None
+        self._beats: list = []
+        self._beat_due = 0.0
+
+    def run(self) -> list:
+        self.timer.install()
+        try:
+            self.root.after(200, self._next)
+            self.root.after(self.heartbeat_ms, self._beat)
+            self.root.mainloop()
+        finally:
+            self.timer.uninstall()
+        return self.results
+
+    # ───────── Latido ─────────
+    def _beat(self):
+        now = time.perf_counter()
+        if self._beat_due:
+            self._beats.append(max(0.0, now - self._beat_due))
+        self._beat_due = now + self.heartbeat_ms / 1000
+        self.root.after(self.heartbeat_ms, self._beat)
+
+    # ───────── Pasos ─────────
+    def _plan(self) -> list:
+        """Lista de (caso, etiqueta de imagen, preparación sin medir, llamada medida, ventana)."""
+        steps = []
+        for label, path in self.samples.items():
+            thumb = self._prepared_thumbnail(path)
+            for _ in range(self.repeat):
+                # Pirámide en frío: caché vacía, como la primera vez que llega la foto
+                steps.append(("ImageViewer.show_image", label, self._clear_pyramids,
+                              lambda p=path: self.viewer.show_image(p), self.root))
+            for i in range(self.repeat):
+                geometry = RESIZED if i % 2 == 0 else WINDOW
+                steps.append(("ImageViewer._do_resize", label,
+                              lambda g=geometry: self._resize_window(g),
+                              self.viewer._do_resize, self.root))
+            steps.append((None, label, lambda: self.root.geometry(WINDOW), None, self.root))
+            for i in range(self.repeat):
+                name = f"{os.path.basename(path)}.{i}"
+                steps.append(("HistoryBar.add_thumbnail (miniatura lista)", label, None,
+                              lambda n=name: self.history.add_thumbnail(n, thumb), self.root))
+            stem, ext = os.path.splitext(path)
+            for i in range(self.repeat):
+                copy = f"{stem}_diferida{i}{ext}"
+                steps.append(("HistoryBar.add_thumbnail (carga diferida)", label,
+                              lambda c=copy: shutil.copyfile(path, c),
+                              lambda c=copy: self.history.add_thumbnail(c), self.root))
+            if self.legacy is not None:
+                for _ in range(self.repeat):
+                    steps.append(("legado PhotoReceiverApp._display_image", label, None,
+                                  lambda p=path: self.legacy._display_image(p), self.legacy))
+        return steps
+
+    def _prepared_thumbnail(self, path: str) -> Image.Image:
+        """Miniatura como la entrega pipeline.py (generada fuera del hilo de Tk)."""
+        from thumbcache import get_thumbnail_cache
+
+        return get_thumbnail_cache().get_or_create(path, APP_CONFIG["thumbnail_size"])
+
+    def _clear_pyramids(self):
+        from pyramid import PyramidCache
+
+        self.viewer._pyramids = PyramidCache(self.viewer._pyramids.budget)
+        self.viewer._pyramid = None
+
+    def _resize_window(self, geometry: str):
+        self.root.geometry(geometry)
+        self.root.update_idletasks()
+
+    def _next(self):
+        if not self._steps:
+            self.root.after(300, self._finish)
+            return
+        case, label, prepare, call, widget = self._steps.pop(0)
+        if prepare is not None:
+            prepare()
+        if call is None:
+            self.root.after(150, self._next)
+            return
+        # Dar tiempo a que se procese el <Configure> del paso de preparación
+        self.root.after(60, lambda: self._measure(case, label, call, widget))
+
+    def _measure(self, case: str, label: str, call, widget):
+        if self.viewer._resize_after_id is not None:
+            # El redimensionado con debounce se mide a mano: se cancela el programado
+            self.viewer.after_cancel(self.viewer._resize_after_id)
+            self.viewer._resize_after_id = None
+        self._beats = []
+        self.timer.reset()
+        t0 = time.perf_counter()
+        call()
+        called = time.perf_counter()
+        widget.update_idletasks()  # pintado pendiente: también bloquea el bucle
+        done = time.perf_counter()
+        phases = {phase: self.timer.totals.get(phase, 0.0) for phase in PHASES}
+        self._case = {"case": case, "image": label, "call_s": called - t0,
+                      "stall_s": done - t0, **phases}
+        # El latido se observa durante los 120 ms siguientes (trabajo en segundo plano incluido)
+        self.root.after(120, self._close_case)
+
+    def _close_case(self):
+        self._case["beat_late_s"] = max(self._beats, default=0.0)
+        self.results.append(self._case)
+        self._case = None
+        self._next()
+
+    def _finish(self):
+        if self.legacy is not None:
+            self.legacy.destroy()
+        self.root.quit()
+
+
+# ───────── Informe ─────────
+def _median(values: list) -> float:
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else 0.0
+
+
+def summarize(results: list) -> list:
+    groups = defaultdict(list)
+    for r in results:
+        groups[(r["case"], r["image"])].append(r)
+    rows = []
+    for (case, image), runs in groups.items():
+        row = {"case": case, "image": image, "runs": len(runs)}
+        for key in ("call_s", "stall_s", *PHASES):
+            row[key.replace("_s", "") + "_ms"] = round(_median([r[key] for r in runs]) * 1000, 2)
+        row["stall_max_ms"] = round(max(r["stall_s"] for r in runs) * 1000, 2)
+        row["beat_late_max_ms"] = round(max(r["beat_late_s"] for r in runs) * 1000, 2)
+        rows.append(row)
+    return rows
+
+
+def print_table(rows: list):
+    header = (f"  {'caso':<44} {'imagen':<12} {'llamada':>8} {'decod.':>8} {'reesc.':>8} "
+              f"{'máscara':>8} {'PhotoImg':>8} {'bloqueo':>8} {'bl.máx':>8} {'latido':>8}")
+    print(header)
+    print("  " + "─" * (len(header) - 2))
+    for r in rows:
+        print(f"  {r['case']:<44} {r['image']:<12} {r['call_ms']:>8.1f} {r['decode_ms']:>8.1f} "
+              f"{r['resample_ms']:>8.1f} {r['mask_ms']:>8.1f} {r['photoimage_ms']:>8.1f} "
+              f"{r['stall_ms']:>8.1f} {r['stall_max_ms']:>8.1f} {r['beat_late_max_ms']:>8.1f}")
+    print("  (ms; medianas salvo «bl.máx» y «latido» = retraso máximo del latido tras la llamada)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--sizes", nargs="+", default=["2MP", "12MP"], choices=list(SIZES))
+    parser.add_argument("--formats", nargs="+", default=["jpeg", "png"], choices=list(FORMATS))
+    parser.add_argument("--repeat", type=int, default=5, help="llamadas por caso e imagen")
+    parser.add_argument("--heartbeat-ms", type=int, default=5)
+    parser.add_argument("--no-legacy", action="store_true", help="omitir main_desktop.py")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    xvfb = None
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        xvfb = start_xvfb()
+    try:
+        import customtkinter  # noqa: F401
+    except ImportError:
+        raise SystemExit("Falta customtkinter (pip install customtkinter)")
+
+    folder = tempfile.mkdtemp(prefix="bench_render_")
+    APP_CONFIG.update(upload_folder=folder)
+    try:
+        samples = {}
+        for size_name in args.sizes:
+            for fmt in args.formats:
+                samples[f"{size_name} {fmt}"] = make_sample(folder, size_name, fmt)
+        bench = RenderBench(samples, args.repeat, args.heartbeat_ms, legacy=not args.no_legacy)
+        rows = summarize(bench.run())
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait(5)
+
+    print(f"Ventana {WINDOW} (redimensionado a {RESIZED}), {args.repeat} llamadas por caso, "
+          f"latido cada {args.heartbeat_ms} ms")
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"window": WINDOW, "repeat": args.repeat, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+The Elite Flower — Benchmark de clientes lentos.
+Simula muchos teléfonos subiendo fotos por Wi-Fi lenta contra cada motor.
+Cada cliente envía el cuerpo troceado y con pausas; a la vez se mide la
+latencia de un cliente rápido (GET /health). Con el motor "pool" cada
+cliente lento ocupa un hilo; con "asyncio" sólo una corrutina.
+
+Uso:
+    python benchmarks/bench_slow_clients.py --clients 64 --size-kb 512 --kbps 256
+"""
+
+import argparse
+import io
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from config import APP_CONFIG, find_available_port  # noqa: E402
+from events import PhotoQueue  # noqa: E402
+from server import create_image_server  # noqa: E402
+
+SEND_CHUNK = 8 * 1024
+
+
+def jpeg_payload(size_kb: int) -> bytes:
+    """
+    JPEG pequeño real + relleno aleatorio + EOI: pasa la validación estructural
+    (firma, cabecera, fin) sin coste de codificación y sin repetir contenido.
+    """
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (125, 160, 125)).save(buf, "JPEG")
+    jpeg = buf.getvalue()
+    return jpeg + os.urandom(max(0, size_kb * 1024 - len(jpeg) - 2)) + b"\xff\xd9"
+
+
+def _upload_request(port: int, payload: bytes) -> bytes:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="image"; filename="slow.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    head = (
+        "POST /upload HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{port}\r\n"
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode()
+    return head + body
+
+
+def _status(sock: socket.socket) -> int:
+    data = b""
+    while b"\r\n" not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            return 0
+        data += chunk
+    return int(data.split(b" ", 2)[1])
+
+
+def _slow_client(port: int, request: bytes, kbps: float, durations: list, errors: list):
+    """Envía la petición a `kbps` KB/s en bloques de SEND_CHUNK."""
+    pause = SEND_CHUNK / (kbps * 1024)
+    t0 = time.perf_counter()
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=120) as sock:
+            for i in range(0, len(request), SEND_CHUNK):
+                sock.sendall(request[i:i + SEND_CHUNK])
+                time.sleep(pause)
+            status = _status(sock)
+    except OSError as e:
+        errors.append(repr(e))
+        return
+    if status != 200:
+        errors.append(status)
+        return
+    durations.append(time.perf_counter() - t0)
+
+
+def _probe(port: int, stop: threading.Event, latencies: list, errors: list):
+    """Cliente rápido: GET /health en bucle mientras duran las subidas lentas."""
+    request = f"GET /health HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nConnection: close\r\n\r\n".encode()
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=120) as sock:
+                sock.sendall(request)
+                status = _status(sock)
+        except OSError as e:
+            errors.append(repr(e))
+            continue
+        if status == 200:
+            latencies.append(time.perf_counter() - t0)
+        stop.wait(0.05)
+
+
+def _percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def run_engine(engine: str, clients: int, size_kb: int, kbps: float) -> dict:
+    folder = tempfile.mkdtemp(prefix=f"bench_slow_{engine}_")
+    APP_CONFIG.update(upload_folder=folder, server_engine=engine, dedup_uploads=False,
+                      port=find_available_port(18100), host="127.0.0.1")
+    port = APP_CONFIG["port"]
+    server = create_image_server(PhotoQueue())  # sin consumidor: sin límite
+    server.start()
+    server.listening.wait(10)
+
+    durations: list = []
+    probe_latencies: list = []
+    errors: list = []
+    stop = threading.Event()
+    probe = threading.Thread(target=_probe, args=(port, stop, probe_latencies, errors))
+    senders = [
+        threading.Thread(target=_slow_client,
+                         args=(port, _upload_request(port, jpeg_payload(size_kb)),
+                               kbps, durations, errors))
+        for _ in range(clients)
+    ]
+    t0 = time.perf_counter()
+    probe.start()
+    for t in senders:
+        t.start()
+    for t in senders:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    probe.join()
+
+    server.stop()
+    shutil.rmtree(folder, ignore_errors=True)
+    return {
+        "engine": engine,
+        "ok": len(durations),
+        "errors": len(errors),
+        "wall_s": round(elapsed, 2),
+        "upload_p50_s": round(_percentile(durations, 0.50) / 1000, 2),
+        "upload_max_s": round(_percentile(durations, 1.0) / 1000, 2),
+        "health_p50_ms": round(_percentile(probe_latencies, 0.50), 1),
+        "health_p99_ms": round(_percentile(probe_latencies, 0.99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--kbps", type=float, default=256, help="velocidad de cada cliente (KB/s)")
+    parser.add_argument("--engines", nargs="+", default=["pool", "asyncio"])
+    args = parser.parse_args()
+
+    ideal = (args.size_kb / args.kbps)
+    print(f"{args.clients} clientes lentos × {args.size_kb} KB a {args.kbps:g} KB/s "
+          f"(ideal ≈ {ideal:.1f} s por subida), motor pool con {APP_CONFIG['server_workers']} hilos")
+    for engine in args.engines:
+        r = run_engine(engine, args.clients, args.size_kb, args.kbps)
+        print(f"  {r['engine']:<7} ok={r['ok']:<4} err={r['errors']:<3} total={r['wall_s']} s  "
+              f"subida p50={r['upload_p50_s']} s máx={r['upload_max_s']} s  "
+              f"/health p50={r['health_p50_ms']} ms p99={r['health_p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
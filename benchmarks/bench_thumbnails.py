@@ -0,0 +1,93 @@
+"""
+The Elite Flower — Benchmark de miniaturas.
+Compara la latencia por miniatura del camino anterior (decodificación completa
++ copy() + LANCZOS) con imaging.open_thumbnail() sobre JPEG sintéticos de
+12 MP y 48 MP, con y sin miniatura EXIF embebida.
+
+Uso:
+    python benchmarks/bench_thumbnails.py --repeat 5
+"""
+
+import argparse
+import io
+import os
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from imaging import open_thumbnail  # noqa: E402
+
+THUMB = (90, 90)
+SAMPLES = {"12MP": (4000, 3000), "48MP": (8000, 6000)}
+
+
+def _exif_with_thumbnail(thumb_jpeg: bytes, orientation: int) -> bytes:
+    """EXIF mínimo: IFD0 con Orientation e IFD1 apuntando a una miniatura JPEG."""
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHII", 0x0112, 3, 1, orientation) + struct.pack("<I", 26)
+    thumb_offset = 8 + len(ifd0) + 30
+    ifd1 = (struct.pack("<H", 2)
+            + struct.pack("<HHII", 0x0201, 4, 1, thumb_offset)
+            + struct.pack("<HHII", 0x0202, 4, 1, len(thumb_jpeg))
+            + struct.pack("<I", 0))
+    return b"Exif\x00\x00" + b"II*\x00" + struct.pack("<I", 8) + ifd0 + ifd1 + thumb_jpeg
+
+
+def make_sample(folder: str, name: str, size: tuple, embedded: bool) -> str:
+    w, h = size
+    # Contenido con detalle (no un color plano) para que el decodificador trabaje de verdad
+    base = Image.effect_noise((w // 8, h // 8), 80).convert("RGB").filter(ImageFilter.SMOOTH)
+    img = base.resize(size, Image.BILINEAR)
+    exif = b""
+    if embedded:
+        small = img.copy()
+        small.thumbnail((160, 120))
+        buf = io.BytesIO()
+        small.save(buf, "JPEG", quality=80)
+        exif = _exif_with_thumbnail(buf.getvalue(), orientation=6)
+    path = os.path.join(folder, f"{name}.jpg")
+    img.save(path, "JPEG", quality=90, exif=exif)
+    return path
+
+
+def legacy_thumbnail(path: str) -> Image.Image:
+    img = Image.open(path)
+    thumb = img.copy()
+    thumb.thumbnail(THUMB, Image.LANCZOS)
+    return thumb
+
+
+def timed(fn, path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--repeat", type=int, default=5, help="repeticiones (se toma la mejor)")
+    args = parser.parse_args()
+
+    cases = {
+        "antes (decodificación completa)": legacy_thumbnail,
+        "draft JPEG (sin EXIF)": lambda p: open_thumbnail(p, THUMB, use_embedded=False),
+        "miniatura EXIF embebida": lambda p: open_thumbnail(p, THUMB),
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        for label, size in SAMPLES.items():
+            path = make_sample(folder, label, size, embedded=True)
+            mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{label} {size[0]}x{size[1]} ({mb:.1f} MB)")
+            for name, fn in cases.items():
+                print(f"  {name:<34} {timed(fn, path, args.repeat):8.1f} ms/miniatura")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+The Elite Flower — Benchmark de carga de POST /upload.
+Genera fotos sintéticas (JPEG, PNG y contenedores del tamaño de un HEIC) y
+las sube de dos formas: dentro del proceso con el test client de Flask (sólo
+la app, sin sockets) y por loopback con N clientes concurrentes y keep-alive.
+Informa throughput, percentiles de latencia, CPU y RSS, y guarda los
+resultados en JSON para comparar ejecuciones (--compare falla con código 1
+si hay regresión).
+
+Uso:
+    python benchmarks/bench_upload.py                                  # todo con valores por defecto
+    python benchmarks/bench_upload.py --modes loopback --engines pool asyncio \\
+        --payloads jpeg-12mp heic-12mp --concurrency 1 8 32 --output hoy.json
+    python benchmarks/bench_upload.py --output hoy.json --compare ayer.json --tolerance 0.15
+
+La CPU y la memoria son las del proceso completo: en modo loopback incluyen
+a los clientes, que corren en hilos del mismo proceso.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.client import HTTPConnection
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from config import APP_CONFIG, find_available_port, setup_logging  # noqa: E402
+from events import PhotoQueue  # noqa: E402
+from server import create_image_server  # noqa: E402
+
+# nombre → (formato, resolución o tamaño en bytes para "heic")
+PAYLOADS: Dict[str, Tuple[str, object]] = {
+    "jpeg-2mp": ("jpeg", (1600, 1200)),
+    "jpeg-12mp": ("jpeg", (4000, 3000)),
+    "png-2mp": ("png", (1600, 1200)),
+    "heic-12mp": ("heic", 2_600_000),  # tamaño típico de un HEIC de 12 MP de iPhone
+}
+EXTENSIONS = {"jpeg": "jpg", "png": "png", "heic": "heic"}
+
+
+# ───────── Fotos sintéticas ─────────
+def _photo_like(size: Tuple[int, int]) -> Image.Image:
+    """Ruido suavizado: se comprime como una foto real, no como un color plano."""
+    w, h = size
+    base = Image.effect_noise((w // 8, h // 8), 80).convert("RGB").filter(ImageFilter.SMOOTH)
+    return base.resize(size, Image.BILINEAR)
+
+
+def make_payload(name: str) -> Tuple[bytes, str]:
+    """(bytes del archivo, nombre de archivo) para el preset `name`."""
+    kind, spec = PAYLOADS[name]
+    if kind == "heic":
+        # Pillow no codifica HEIC: cajas ftyp y meta (vacía) reales + mdat de relleno
+        # del tamaño típico; pasa la validación estructural (validation.py)
+        head = b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic" + b"\x00\x00\x00\x0cmeta\x00\x00\x00\x00"
+        mdat_size = spec - len(head)
+        data = head + mdat_size.to_bytes(4, "big") + b"mdat" + os.urandom(mdat_size - 8)
+    else:
+        buf = io.BytesIO()
+        img = _photo_like(spec)
+        if kind == "jpeg":
+            img.save(buf, "JPEG", quality=90)
+        else:
+            img.save(buf, "PNG", compress_level=6)
+        data = buf.getvalue()
+    return data, f"bench.{EXTENSIONS[kind]}"
+
+
+def multipart_body(data: bytes, filename: str) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="image"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + data + tail, f"multipart/form-data; boundary={boundary}"
+
+
+# ───────── CPU y memoria ─────────
+def _cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        import psutil  # opcional
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _ResourceSampler:
+    """Muestrea el RSS cada 50 ms para obtener el pico durante una ejecución."""
+
+    def __init__(self):
+        self.start_mb = _rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._cpu0 = _cpu_seconds()
+        self._t0 = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.cpu_s = _cpu_seconds() - self._cpu0
+        self.wall_s = time.perf_counter() - self._t0
+
+    def _run(self):
+        while not self._stop.wait(0.05):
+            rss = _rss_mb()
+            if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+                self.peak_mb = rss
+
+
+# ───────── Clientes ─────────
+def _loopback_client(port: int, n: int, body: bytes, content_type: str,
+                     latencies: list, errors: list):
+    conn = None
+    for _ in range(n):
+        if conn is None:
+            conn = HTTPConnection("127.0.0.1", port, timeout=120)
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/upload", body=body, headers={"Content-Type": content_type})
+            resp = conn.getresponse()
+            resp.read()
+        except OSError as e:
+            errors.append(repr(e))
+            conn = None
+            continue
+        if resp.status != 200:
+            errors.append(resp.status)
+        else:
+            latencies.append(time.perf_counter() - t0)
+        if resp.getheader("Connection", "").lower() == "close":
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+
+def _inprocess_client(app, n: int, body: bytes, content_type: str,
+                      latencies: list, errors: list):
+    client = app.test_client()
+    for _ in range(n):
+        t0 = time.perf_counter()
+        resp = client.post("/upload", data=body, content_type=content_type)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+        else:
+            latencies.append(time.perf_counter() - t0)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def run_case(mode: str, engine: str, payload: str, data: bytes, filename: str,
+             concurrency: int, requests: int, dedup: bool) -> dict:
+    folder = tempfile.mkdtemp(prefix="bench_upload_")
+    APP_CONFIG.update(upload_folder=folder, server_engine=engine, dedup_uploads=dedup,
+                      host="127.0.0.1", port=find_available_port(18200))
+    server = create_image_server(PhotoQueue())  # sin consumidor: sin límite, mide la ingesta
+    body, content_type = multipart_body(data, filename)
+    per_client = max(1, requests // concurrency)
+
+    if mode == "loopback":
+        server.start()
+        server.listening.wait(10)
+        target: Callable = _loopback_client
+        first_arg: object = APP_CONFIG["port"]
+    else:
+        target = _inprocess_client
+        first_arg = server._app
+
+    latencies: list = []
+    errors: list = []
+    threads = [threading.Thread(target=target,
+                                args=(first_arg, per_client, body, content_type, latencies, errors))
+               for _ in range(concurrency)]
+    with _ResourceSampler() as usage:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    if mode == "loopback":
+        server.stop()
+    shutil.rmtree(folder, ignore_errors=True)
+
+    latencies.sort()
+    ok = len(latencies)
+    return {
+        "mode": mode,
+        "engine": engine if mode == "loopback" else "flask",
+        "payload": payload,
+        "size_kb": round(len(data) / 1024, 1),
+        "concurrency": concurrency,
+        "requests": per_client * concurrency,
+        "ok": ok,
+        "errors": len(errors),
+        "throughput_rps": round(ok / usage.wall_s, 1),
+        "mb_per_s": round(ok * len(data) / 2 ** 20 / usage.wall_s, 1),
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p90_ms": round(_percentile(latencies, 0.90), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "cpu_s": round(usage.cpu_s, 2),
+        "cpu_pct": round(100 * usage.cpu_s / usage.wall_s, 1),
+        "rss_start_mb": round(usage.start_mb, 1) if usage.start_mb is not None else None,
+        "rss_peak_mb": round(usage.peak_mb, 1) if usage.peak_mb is not None else None,
+    }
+
+
+# ───────── Comparación ─────────
+def _key(run: dict) -> tuple:
+    return run["mode"], run["engine"], run["payload"], run["concurrency"]
+
+
+def compare(current: List[dict], baseline_path: str, tolerance: float) -> bool:
+    """Throughput que cae o p99 que sube más de `tolerance` respecto al JSON anterior."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_key(r): r for r in json.load(f)["runs"]}
+    ok = True
+    print(f"\nComparación con {baseline_path} (tolerancia {tolerance:.0%}):")
+    for run in current:
+        old = baseline.get(_key(run))
+        if old is None:
+            continue
+        rps = run["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+        p99 = run["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] else 0.0
+        regressed = rps < -tolerance or p99 > tolerance
+        ok &= not regressed
+        print(f"  {'/'.join(str(k) for k in _key(run)):<36} subidas/s {rps:+7.1%}  "
+              f"p99 {p99:+7.1%}  {'REGRESIÓN' if regressed else 'OK'}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--modes", nargs="+", choices=("inprocess", "loopback"),
+                        default=["inprocess", "loopback"])
+    parser.add_argument("--engines", nargs="+", default=["pool"],
+                        help="motores para el modo loopback (pool, asyncio, dev)")
+    parser.add_argument("--payloads", nargs="+", choices=sorted(PAYLOADS),
+                        default=["jpeg-2mp", "jpeg-12mp", "png-2mp", "heic-12mp"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--requests", type=int, default=200, help="subidas por caso")
+    parser.add_argument("--dedup", action="store_true",
+                        help="deja activa la deduplicación (por defecto se desactiva: el cuerpo se repite)")
+    parser.add_argument("--output", metavar="RUTA", help="guarda los resultados en JSON")
+    parser.add_argument("--compare", metavar="RUTA", help="JSON de una ejecución anterior")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    setup_logging(logging.WARNING)  # sin una línea de log por subida
+
+    payloads = {name: make_payload(name) for name in args.payloads}
+    runs = []
+    print(f"{'modo':<10} {'motor':<8} {'payload':<10} {'KB':>7} {'conc':>4} "
+          f"{'subidas/s':>9} {'MB/s':>7} {'p50':>8} {'p99':>8} {'CPU%':>6} {'RSS pico':>8}")
+    for mode in args.modes:
+        for engine in (args.engines if mode == "loopback" else ["pool"]):
+            for name, (data, filename) in payloads.items():
+                for concurrency in args.concurrency:
+                    r = run_case(mode, engine, name, data, filename, concurrency,
+                                 args.requests, args.dedup)
+                    runs.append(r)
+                    print(f"{r['mode']:<10} {r['engine']:<8} {r['payload']:<10} {r['size_kb']:>7.0f} "
+                          f"{r['concurrency']:>4} {r['throughput_rps']:>9} {r['mb_per_s']:>7} "
+                          f"{r['p50_ms']:>8} {r['p99_ms']:>8} {r['cpu_pct']:>6} "
+                          f"{r['rss_peak_mb'] if r['rss_peak_mb'] is not None else '-':>8}"
+                          + (f"  ({r['errors']} errores)" if r["errors"] else ""))
+
+    if args.output:
+        result = {
+            "meta": {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "server_workers": APP_CONFIG["server_workers"],
+                "ingest_chunk_kb": APP_CONFIG["ingest_chunk_kb"],
+            },
+            "runs": runs,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        return 0 if compare(runs, args.compare, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
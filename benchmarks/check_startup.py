@@ -0,0 +1,88 @@
+"""
+The Elite Flower — Control de regresión del tiempo de arranque.
+Lanza `main.py --profile-startup` varias veces, toma la mediana y falla
+(código de salida 1) si supera el presupuesto. Pensado para CI: cada ejecución
+usa una carpeta de destino temporal, así que no toca fotos_recibidas/.
+
+Uso:
+    python benchmarks/check_startup.py                       # GUI + headless
+    python benchmarks/check_startup.py --mode headless --runs 5 --headless-budget-ms 800
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milisegundos desde el inicio del proceso
+DEFAULT_GUI_BUDGET_MS = 2500     # hasta "ventana visible"
+DEFAULT_HEADLESS_BUDGET_MS = 1500  # hasta "servidor escuchando"
+
+
+def _profile_once(headless: bool, timeout_s: float) -> dict:
+    fd, output = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    folder = tempfile.mkdtemp(prefix="elite_startup_")
+    cmd = [sys.executable, os.path.join(ROOT, "main.py"), "--profile-startup",
+           "--profile-output", output, "--folder", folder]
+    if headless:
+        cmd.append("--headless")
+    try:
+        subprocess.run(cmd, cwd=ROOT, check=True, timeout=timeout_s,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        with open(output, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def _check(name: str, headless: bool, key: str, budget_ms: float, runs: int,
+           timeout_s: float) -> bool:
+    samples, last = [], {}
+    for _ in range(runs):
+        last = _profile_once(headless, timeout_s)
+        if last.get(key) is None:
+            print(f"{name}: el perfil no contiene '{key}'")
+            return False
+        samples.append(last[key])
+
+    median = statistics.median(samples)
+    ok = median <= budget_ms
+    print(f"{name}: mediana {median:.0f} ms (presupuesto {budget_ms:.0f} ms, "
+          f"{runs} ejecuciones: {', '.join(f'{s:.0f}' for s in samples)}) "
+          f"→ {'OK' if ok else 'REGRESIÓN'}")
+    if not ok:
+        print("  Imports más lentos (propio / acumulado, ms):")
+        for item in last.get("imports", [])[:10]:
+            print(f"    {item['module']:<34} {item['self_ms']:7.1f} {item['cumulative_ms']:7.1f}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--mode", choices=("all", "gui", "headless"), default="all")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--gui-budget-ms", type=float, default=DEFAULT_GUI_BUDGET_MS)
+    parser.add_argument("--headless-budget-ms", type=float, default=DEFAULT_HEADLESS_BUDGET_MS)
+    parser.add_argument("--timeout-s", type=float, default=60)
+    args = parser.parse_args()
+
+    ok = True
+    if args.mode in ("all", "headless"):
+        ok &= _check("headless", True, "time_to_listening_ms",
+                     args.headless_budget_ms, args.runs, args.timeout_s)
+    if args.mode in ("all", "gui"):
+        ok &= _check("gui", False, "time_to_first_window_ms",
+                     args.gui_budget_ms, args.runs, args.timeout_s)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
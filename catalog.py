@@ -0,0 +1,285 @@
+"""
+The Elite Flower — Catálogo persistente de fotos (SQLite).
+Registra nombre, tamaño, mtime y hash de cada foto de la carpeta de destino
+para que el conteo, el historial y la deduplicación no escaneen el directorio.
+
+Base de datos: <carpeta>/.elite/catalog.sqlite3
+Los nombres son relativos a la carpeta (AAAA/MM/DD/foto_….jpg con la
+disposición por fecha, ver storage.py).
+La reconciliación con el disco se hace en dos fases:
+  1. escaneo rápido (sólo stat): altas, bajas y cambios desde el último arranque;
+  2. hash en segundo plano de las filas nuevas o modificadas.
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from config import APP_CONFIG, meta_dir
+from storage import iter_photos
+
+logger = logging.getLogger("catalog")
+
+CATALOG_FILENAME = "catalog.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    name     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256   TEXT
+);
+CREATE INDEX IF NOT EXISTS photos_sha256 ON photos(sha256);
+CREATE INDEX IF NOT EXISTS photos_mtime ON photos(mtime_ns);
+"""
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 de un archivo leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def newest_on_disk(folder: str, n: int) -> List[str]:
+    """
+    Rutas de las n fotos más recientes por mtime, de la más antigua a la más nueva.
+    Un solo recorrido (raíz y subcarpetas de fecha) y un heap acotado a n:
+    no ordena la carpeta entera.
+    """
+    def entries():
+        for _, entry in iter_photos(folder):
+            try:
+                yield entry.stat().st_mtime_ns, entry.path
+            except OSError:
+                continue
+
+    return [path for _, path in reversed(heapq.nlargest(n, entries()))]
+
+
+class PhotoCatalog:
+    """Catálogo de una carpeta de destino. Seguro entre hilos (servidor y GUI)."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(meta_dir(folder), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(meta_dir(folder), CATALOG_FILENAME),
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._count = self._db.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+        # scanned: fase 1 terminada (conteo e historial fiables)
+        # ready:   fase 2 terminada (todos los hashes calculados)
+        self.scanned = threading.Event()
+        self.ready = threading.Event()
+
+    # ───────── Consultas ─────────
+    def count(self) -> int:
+        """Número de fotos catalogadas (O(1), mantenido en memoria)."""
+        return self._count
+
+    def newest(self, n: int) -> List[str]:
+        """Rutas de las n fotos más recientes por mtime, de la más antigua a la más nueva."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name FROM photos ORDER BY mtime_ns DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [os.path.join(self.folder, name) for (name,) in reversed(rows)]
+
+    def lookup(self, digest: str) -> Optional[str]:
+        """Nombre de la foto existente con ese hash, o None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name FROM photos WHERE sha256 = ? LIMIT 1", (digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        if not os.path.isfile(os.path.join(self.folder, row[0])):
+            self.remove(row[0])
+            return self.lookup(digest)
+        return row[0]
+
+    # ───────── Altas y bajas ─────────
+    def add(self, filepath: str, digest: Optional[str] = None):
+        """Registra (o actualiza) una foto guardada en la carpeta."""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return
+        with self._lock:
+            self._upsert(self._name(filepath), st.st_size, st.st_mtime_ns, digest)
+
+    def claim(self, digest: str, filepath: str) -> Optional[str]:
+        """
+        Registra `filepath` con su hash si el contenido es nuevo y devuelve None.
+        Si ya existía otra foto con el mismo hash, devuelve su nombre sin registrar.
+        """
+        existing = self.lookup(digest)
+        if existing is not None:
+            return existing
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        with self._lock:
+            # Otra subida idéntica pudo ganar la carrera entre lookup() y aquí
+            row = self._db.execute(
+                "SELECT name FROM photos WHERE sha256 = ? LIMIT 1", (digest,)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            self._upsert(self._name(filepath), st.st_size, st.st_mtime_ns, digest)
+        return None
+
+    def rename(self, old_name: str, new_name: str):
+        """
+        Mueve una foto dentro de la carpeta (storage.migrate_flat) junto con su fila.
+        El archivo se mueve dentro de la transacción de escritura: otro proceso con el
+        catálogo abierto (el servidor) que vea desaparecer el nombre viejo espera al
+        COMMIT para borrar la fila, y para entonces la fila ya tiene el nombre nuevo.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("UPDATE OR IGNORE photos SET name = ? WHERE name = ?",
+                                 (new_name, old_name))
+                os.rename(os.path.join(self.folder, old_name), os.path.join(self.folder, new_name))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def remove(self, name: str):
+        with self._lock:
+            cur = self._db.execute("DELETE FROM photos WHERE name = ?", (name,))
+            self._count -= cur.rowcount
+
+    # ───────── Reconciliación ─────────
+    def reconcile(self):
+        """Sincroniza el catálogo con el disco (archivos cambiados con la app cerrada)."""
+        try:
+            added, changed, removed = self._scan()
+            self._refresh_count()
+            logger.info("Catálogo: %d fotos (%d nuevas, %d modificadas, %d eliminadas)",
+                        self._count, added, changed, removed)
+        except Exception as e:
+            logger.warning("No se pudo reconciliar el catálogo: %s", e)
+        finally:
+            self.scanned.set()
+
+        try:
+            hashed = self._hash_pending()
+            if hashed:
+                logger.info("Catálogo: %d hashes calculados", hashed)
+        except Exception as e:
+            logger.warning("No se pudieron calcular los hashes del catálogo: %s", e)
+        finally:
+            self.ready.set()
+
+    def _scan(self) -> tuple[int, int, int]:
+        with self._lock:
+            known: Dict[str, tuple] = {
+                name: (size, mtime_ns)
+                for name, size, mtime_ns in self._db.execute("SELECT name, size, mtime_ns FROM photos")
+            }
+        on_disk = set()
+        added = changed = 0
+        rows = []
+        for name, entry in iter_photos(self.folder):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            on_disk.add(name)
+            record = known.get(name)
+            if record == (st.st_size, st.st_mtime_ns):
+                continue
+            if record is None:
+                added += 1
+            else:
+                changed += 1
+            rows.append((name, st.st_size, st.st_mtime_ns))
+
+        gone = [(name,) for name in known if name not in on_disk]
+        with self._lock:
+            self._db.execute("BEGIN")
+            # Un archivo modificado pierde su hash hasta la fase 2
+            self._db.executemany(
+                "INSERT INTO photos (name, size, mtime_ns, sha256) VALUES (?, ?, ?, NULL) "
+                "ON CONFLICT(name) DO UPDATE SET size = excluded.size, "
+                "mtime_ns = excluded.mtime_ns, sha256 = NULL "
+                "WHERE photos.size != excluded.size OR photos.mtime_ns != excluded.mtime_ns",
+                rows,
+            )
+            self._db.executemany("DELETE FROM photos WHERE name = ?", gone)
+            self._db.execute("COMMIT")
+        return added, changed, len(gone)
+
+    def _hash_pending(self) -> int:
+        with self._lock:
+            pending = [name for (name,) in self._db.execute(
+                "SELECT name FROM photos WHERE sha256 IS NULL")]
+        for name in pending:
+            try:
+                digest = hash_file(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            with self._lock:
+                self._db.execute("UPDATE photos SET sha256 = ? WHERE name = ? AND sha256 IS NULL",
+                                 (digest, name))
+        return len(pending)
+
+    # ───────── Internos ─────────
+    def _name(self, filepath: str) -> str:
+        return os.path.relpath(filepath, self.folder)
+
+    def _upsert(self, name: str, size: int, mtime_ns: int, digest: Optional[str]):
+        cur = self._db.execute(
+            "INSERT OR IGNORE INTO photos (name, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (name, size, mtime_ns, digest),
+        )
+        if cur.rowcount:
+            self._count += 1
+        else:
+            # Sin hash nuevo se conserva el anterior sólo si el archivo no cambió
+            self._db.execute(
+                "UPDATE photos SET sha256 = CASE WHEN ? IS NOT NULL THEN ? "
+                "WHEN size = ? AND mtime_ns = ? THEN sha256 END, "
+                "size = ?, mtime_ns = ? WHERE name = ?",
+                (digest, digest, size, mtime_ns, size, mtime_ns, name),
+            )
+
+    def _refresh_count(self):
+        with self._lock:
+            self._count = self._db.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+
+
+# ──────────────────────────────────────────────
+# Catálogo compartido de la carpeta actual
+# ──────────────────────────────────────────────
+_current: Optional[PhotoCatalog] = None
+_current_lock = threading.Lock()
+
+
+def get_catalog() -> PhotoCatalog:
+    """
+    Catálogo de APP_CONFIG["upload_folder"], compartido por servidor y GUI.
+    Si la carpeta cambió, abre el catálogo nuevo y lo reconcilia en segundo plano.
+    """
+    global _current
+    folder = APP_CONFIG["upload_folder"]
+    with _current_lock:
+        if _current is None or _current.folder != folder:
+            # El catálogo anterior no se cierra: otro hilo puede estar usándolo
+            _current = PhotoCatalog(folder)
+            threading.Thread(target=_current.reconcile, name="catalog-reconcile",
+                             daemon=True).start()
+        return _current
@@ -1,6 +1,7 @@
 """
 The Elite Flower — Configuración centralizada.
 Tema visual, constantes de la app, logging y utilidades compartidas.
+Sin efectos al importar: el punto de entrada llama a setup_logging() y load_settings().
 """
 
 import json
@@ -30,14 +31,13 @@ SETTINGS_FILE = os.path.join(_EXE_DIR, "settings.json")
 LOG_FORMAT = "%(asctime)s │ %(levelname)-7s │ %(name)-12s │ %(message)s"
 LOG_DATE_FORMAT = "%H:%M:%S"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format=LOG_FORMAT,
-    datefmt=LOG_DATE_FORMAT,
-)
 
-# Silenciar logs excesivos de werkzeug
-logging.getLogger("werkzeug").setLevel(logging.ERROR)
+def setup_logging(level: int = logging.INFO):
+    """Configura el logging de la app. Lo llama el punto de entrada, no el import."""
+    logging.basicConfig(level=level, format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    # Silenciar logs excesivos de werkzeug
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
 
 logger = logging.getLogger("config")
 
@@ -50,9 +50,40 @@ APP_CONFIG = {
     "upload_folder": os.path.join(_EXE_DIR, "fotos_recibidas"),
     "allowed_extensions": {"png", "jpg", "jpeg", "gif", "bmp", "webp", "heic", "heif"},
     "max_upload_mb": 16,
+    "min_free_disk_mb": 200,  # por debajo, las subidas se rechazan (507) antes de leer el cuerpo
+    "server_engine": "pool",  # "pool" (thread-pool, keep-alive) | "asyncio" (clientes lentos) | "dev" (werkzeug)
+    "server_workers": 8,
+    "server_backlog": 64,
+    "server_read_timeout_s": 30,
+    "server_keepalive_s": 5,
+    "ingest_chunk_kb": 64,
+    "meta_dirname": ".elite",
+    "storage_layout": "flat",  # "flat" (todo en la carpeta) | "date" (AAAA/MM/DD/); ver storage.py
+    "dedup_uploads": True,
+    "resumable_max_mb": 512,
+    "resumable_chunk_mb": 4,
+    "resumable_ttl_s": 24 * 3600,
+    "resumable_sweep_s": 600,
     "thumbnail_size": (90, 90),
-    "max_thumbnails": 30,
+    "history_max_entries": 100_000,  # rutas en la tira de historial (virtualizada)
+    "history_loaded_images": 200,    # miniaturas en memoria como PhotoImage
+    "startup_recent": 60,            # fotos que se muestran antes de terminar el catálogo
+    "thumb_cache_mb": 64,
+    "gui_wakeup": "event",  # "event" (<<PhotoReady>>) o "poll" (cada poll_interval_ms)
     "poll_interval_ms": 250,
+    "latency_log_every": 20,
+    "frame_budget_ms": 8,        # tiempo máximo por cuadro para añadir miniaturas
+    "frame_interval_ms": 16,     # pausa entre cuadros mientras quedan miniaturas
+    "status_debounce_ms": 150,   # estado y contador: una vez por ráfaga
+    "decode_workers": 2,
+    "queue_max_depth": 500,          # cola servidor → manager (eventos, un lote cuenta 1)
+    "queue_high_water": 400,         # por encima: presión, se aplica backpressure_mode
+    "backpressure_mode": "reject",   # "reject" (503 + Retry-After) | "save_only" (guarda sin mostrar)
+    "backpressure_retry_after_s": 5,
+    "trace_buffer": 500,             # trazas por foto en memoria (GET /traces); 0 = desactivado
+    "headless_workers": 2,       # modo --headless: hilos que ejecutan los procesadores
+    "viewer_cache_mb": 96,       # pirámides de la foto actual y sus vecinas
+    "viewer_prefetch_radius": 1,
     "led_duration_ms": 3000,
     "status_duration_ms": 4000,
 }
@@ -71,6 +102,8 @@ def load_settings():
         if "upload_folder" in data and os.path.isdir(data["upload_folder"]):
             APP_CONFIG["upload_folder"] = data["upload_folder"]
             logger.info("Carpeta restaurada: %s", data["upload_folder"])
+        if data.get("storage_layout") in ("flat", "date"):
+            APP_CONFIG["storage_layout"] = data["storage_layout"]
     except Exception:
         logger.warning("settings.json corrupto — usando valores por defecto")
 
@@ -79,6 +112,7 @@ def save_settings():
     """Guarda la configuración actual en settings.json."""
     data = {
         "upload_folder": APP_CONFIG["upload_folder"],
+        "storage_layout": APP_CONFIG["storage_layout"],
     }
     try:
         with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
@@ -87,8 +121,7 @@ def save_settings():
         logger.warning("No se pudo guardar settings.json: %s", e)
 
 
-# Cargar settings al importar el módulo
-load_settings()
+# load_settings() lo llama el punto de entrada (main.py): importar config no toca el disco
 
 # ──────────────────────────────────────────────
 # Tema visual — Identidad "The Elite Flower"
@@ -160,6 +193,11 @@ def find_available_port(start_port: int = 5000, max_tries: int = 10) -> int:
     return start_port  # fallback
 
 
+def meta_dir(folder: str | None = None) -> str:
+    """Carpeta oculta de metadatos (índices, cachés) dentro de la carpeta de fotos."""
+    return os.path.join(folder or APP_CONFIG["upload_folder"], APP_CONFIG["meta_dirname"])
+
+
 def get_icon_path() -> str | None:
     """Devuelve la ruta al icono .ico si existe."""
     # Buscar en el directorio del bundle (PyInstaller) y en el directorio del exe
@@ -0,0 +1,277 @@
+"""
+The Elite Flower — Motores HTTP para ImageServer.
+"pool": servidor WSGI con pool fijo de hilos, HTTP/1.1 keep-alive, backlog
+        y timeouts de lectura configurables.
+"dev":  servidor de desarrollo de werkzeug (un hilo por conexión, sin keep-alive).
+El motor "asyncio" no es WSGI: ver aioserver.py y server.create_image_server().
+"""
+
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+
+logger = logging.getLogger("engines")
+
+ENGINES = ("pool", "dev")
+
+# Si la app no consumió todo el cuerpo, se descarta el resto para poder
+# reutilizar la conexión; por encima de este tamaño es más barato cerrarla.
+MAX_DRAIN_BYTES = 256 * 1024
+
+_DROPPED = (ConnectionError, socket.timeout)
+
+
+class _CountingInput:
+    """
+    Envuelve wsgi.input para saber cuántos bytes del cuerpo se leyeron. Con
+    Expect: 100-continue, el 100 Continue se envía en la primera lectura: si la
+    app responde antes (admisión por cabeceras), el cliente no llega a enviar el cuerpo.
+    """
+
+    def __init__(self, stream, send_continue: Optional[Callable[[], None]] = None):
+        self._stream = stream
+        self._send_continue = send_continue
+        self.consumed = 0
+
+    @property
+    def awaiting_continue(self) -> bool:
+        return self._send_continue is not None
+
+    def _continue(self):
+        send, self._send_continue = self._send_continue, None
+        send()
+
+    def read(self, size: int = -1) -> bytes:
+        if self._send_continue is not None:
+            self._continue()
+        data = self._stream.read(size)
+        self.consumed += len(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        if self._send_continue is not None:
+            self._continue()
+        data = self._stream.readline(size)
+        self.consumed += len(data)
+        return data
+
+    def readinto(self, buf) -> int:
+        if self._send_continue is not None:
+            self._continue()
+        n = self._stream.readinto(buf)
+        self.consumed += n or 0
+        return n
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """Handler WSGI con HTTP/1.1 persistente y timeouts separados de lectura y reposo."""
+
+    protocol_version = "HTTP/1.1"
+    read_timeout: float = 30.0
+    keepalive_timeout: float = 5.0
+    _served = 0
+
+    def setup(self):
+        super().setup()
+        # Sin Nagle: cabeceras y cuerpo de respuesta salen sin esperar el ACK retardado
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle_one_request(self):
+        # Entre peticiones la conexión sólo espera keepalive_timeout
+        self.connection.settimeout(self.keepalive_timeout if self._served else self.read_timeout)
+        super().handle_one_request()
+        self._served += 1
+
+    def parse_request(self) -> bool:
+        self.connection.settimeout(self.read_timeout)
+        return super().parse_request()
+
+    def handle_expect_100(self) -> bool:
+        # http.server respondería 100 Continue al leer las cabeceras; se difiere
+        # a la primera lectura del cuerpo (ver _CountingInput)
+        return True
+
+    def log_error(self, format: str, *args):
+        # El cierre de una conexión keep-alive inactiva no es un error
+        if self._served and format.startswith("Request timed out"):
+            return
+        super().log_error(format, *args)
+
+    def _client_keeps_alive(self) -> bool:
+        token = self.headers.get("Connection", "").lower()
+        if self.request_version == "HTTP/1.1":
+            return "close" not in token
+        return "keep-alive" in token
+
+    def run_wsgi(self):
+        self.environ = environ = self.make_environ()
+        expects_body = bool(environ.get("wsgi.input_terminated")
+                            or environ.get("CONTENT_LENGTH") not in (None, "", "0"))
+        expect_continue = (expects_body and
+                           self.headers.get("Expect", "").lower().strip(" \t") == "100-continue")
+        body = _CountingInput(environ["wsgi.input"],
+                              self._send_continue if expect_continue else None)
+        environ["wsgi.input"] = body
+        keep_alive = self._client_keeps_alive()
+
+        status_set: Optional[str] = None
+        headers_set: Optional[list] = None
+        headers_sent = False
+        chunked = False
+
+        def write(data: bytes):
+            nonlocal headers_sent, chunked, keep_alive
+            if not headers_sent:
+                headers_sent = True
+                if body.awaiting_continue:
+                    # Respuesta sin haber pedido el cuerpo: el cliente puede enviarlo
+                    # igualmente o no; la conexión no es reutilizable
+                    keep_alive = False
+                code, _, msg = status_set.partition(" ")
+                code = int(code)
+                self.send_response(code, msg)
+                keys = set()
+                for key, value in headers_set:
+                    self.send_header(key, value)
+                    keys.add(key.lower())
+                if not ("content-length" in keys or environ["REQUEST_METHOD"] == "HEAD"
+                        or code in (204, 304) or 100 <= code < 200):
+                    chunked = True
+                    self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Connection", "keep-alive" if keep_alive else "close")
+                self.end_headers()
+            if data:
+                if chunked:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                else:
+                    self.wfile.write(data)
+            self.wfile.flush()
+
+        def start_response(status, headers, exc_info=None):
+            nonlocal status_set, headers_set
+            if exc_info:
+                try:
+                    if headers_sent:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            status_set, headers_set = status, headers
+            return write
+
+        try:
+            app_iter = self.server.app(environ, start_response)
+            try:
+                for data in app_iter:
+                    write(data)
+                if not headers_sent:
+                    write(b"")
+                if chunked:
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+        except _DROPPED as e:
+            self.close_connection = True
+            self.connection_dropped(e, environ)
+            return
+        except Exception:
+            logger.exception("Error atendiendo %s %s", self.command, self.path)
+            self.close_connection = True
+            if not headers_sent:
+                keep_alive = False
+                status_set = "500 INTERNAL SERVER ERROR"
+                headers_set = [("Content-Length", "0")]
+                write(b"")
+            return
+
+        if not keep_alive or not self._drain_body(body, environ):
+            self.close_connection = True
+
+    def _send_continue(self):
+        self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+    def _drain_body(self, body: _CountingInput, environ) -> bool:
+        """Descarta el cuerpo no leído. Devuelve False si la conexión no es reutilizable."""
+        if environ.get("wsgi.input_terminated"):
+            # Cuerpo chunked: hay que decodificar hasta el chunk final
+            drained = 0
+            while drained <= MAX_DRAIN_BYTES:
+                data = body.read(64 * 1024)
+                if not data:
+                    return True
+                drained += len(data)
+            return False
+        try:
+            remaining = int(environ.get("CONTENT_LENGTH") or 0) - body.consumed
+        except ValueError:
+            return False
+        if remaining <= 0:
+            return True
+        if remaining > MAX_DRAIN_BYTES:
+            return False
+        while remaining > 0:
+            data = body.read(min(remaining, 64 * 1024))
+            if not data:
+                return False
+            remaining -= len(data)
+        return True
+
+
+class ThreadPoolWSGIServer(BaseWSGIServer):
+    """Servidor WSGI que atiende conexiones con un pool fijo de hilos."""
+
+    multithread = True
+    daemon_threads = True
+    # Como socketserver.ThreadingMixIn: server_close() espera a las peticiones en curso
+    block_on_close = False
+
+    def __init__(self, host: str, port: int, app, workers: int, backlog: int,
+                 handler: type[WSGIRequestHandler]):
+        # request_queue_size se lee en server_activate(), dentro de super().__init__
+        self.request_queue_size = backlog
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        super().__init__(host, port, app, handler=handler)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=self.block_on_close, cancel_futures=not self.block_on_close)
+
+
+def make_engine(app, cfg: dict) -> BaseWSGIServer:
+    """Crea el servidor HTTP indicado por cfg["server_engine"] (fallback: "dev")."""
+    engine = cfg.get("server_engine", "pool")
+    if engine not in ENGINES:
+        logger.warning("Motor HTTP desconocido '%s' — usando 'dev'", engine)
+        engine = "dev"
+
+    if engine == "pool":
+        handler = type("ConfiguredRequestHandler", (KeepAliveRequestHandler,), {
+            "read_timeout": float(cfg["server_read_timeout_s"]),
+            "keepalive_timeout": float(cfg["server_keepalive_s"]),
+        })
+        return ThreadPoolWSGIServer(
+            cfg["host"], cfg["port"], app,
+            workers=cfg["server_workers"],
+            backlog=cfg["server_backlog"],
+            handler=handler,
+        )
+
+    return make_server(cfg["host"], cfg["port"], app, threaded=True)
@@ -0,0 +1,152 @@
+"""
+The Elite Flower — Eventos entre el servidor y la GUI.
+Define el elemento que viaja por la cola servidor → manager y la medición
+de latencia desde que la foto queda guardada hasta que se ve en pantalla.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Deque, List, Optional, Tuple
+
+from metrics import REGISTRY, Histogram
+
+if TYPE_CHECKING:
+    from tracing import Trace
+    from validation import Verdict
+
+logger = logging.getLogger("events")
+
+QUEUE_WAIT = REGISTRY.histogram("elite_queue_wait_seconds",
+                                "Espera de cada evento en la cola servidor → manager")
+PHOTO_LATENCY = REGISTRY.histogram(
+    "elite_photo_latency_seconds",
+    "Desde que la foto queda guardada hasta verse en pantalla (GUI) o procesarse (headless)")
+
+# Evento virtual de Tk con el que se despierta el hilo de la GUI
+PHOTO_READY_EVENT = "<<PhotoReady>>"
+
+
+@dataclass
+class PhotoEvent:
+    """Una o varias fotos guardadas en disco (un lote de /upload/batch viaja junto)."""
+
+    paths: List[str]
+    # Reloj monotónico (time.perf_counter) al terminar de escribir el archivo
+    saved_at: float = field(default_factory=time.perf_counter)
+    # Traza de cada foto, en el orden de `paths` (vacía si el trazado está desactivado)
+    traces: List[Optional["Trace"]] = field(default_factory=list)
+    # Veredicto de la validación estructural de cada foto, en el orden de `paths`
+    verdicts: List[Optional["Verdict"]] = field(default_factory=list)
+
+    def items(self) -> List[Tuple[str, Optional["Trace"], Optional["Verdict"]]]:
+        """(ruta, traza, veredicto) de cada foto del evento."""
+        missing = [None] * len(self.paths)
+        return list(zip(self.paths, self.traces or missing, self.verdicts or missing))
+
+
+class PhotoQueue(queue.Queue):
+    """
+    Cola acotada servidor → manager.
+    Por encima de `high_water` elementos se considera bajo presión: el servidor
+    deja de entregar fotos a la pantalla (503 o sólo guardar, ver ImageServer).
+    Mide cuánto espera cada PhotoEvent entre put() y get().
+    """
+
+    def __init__(self, maxsize: int = 0, high_water: Optional[int] = None):
+        super().__init__(maxsize)
+        self.high_water = high_water if high_water is not None else maxsize
+        self.wait = LatencyRecorder("Espera en la cola", log_every=0, histogram=QUEUE_WAIT)
+
+    @property
+    def under_pressure(self) -> bool:
+        return 0 < self.high_water <= self.qsize()
+
+    def offer(self, item) -> bool:
+        """put() sin bloquear (seguro desde el event loop); False si la cola está llena."""
+        try:
+            self.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        with self.mutex:
+            depth = len(self.queue)
+            head = self.queue[0] if depth else None
+        oldest = time.perf_counter() - head.saved_at if isinstance(head, PhotoEvent) else 0.0
+        wait = self.wait.summary()
+        return {
+            "depth": depth,
+            "max_depth": self.maxsize,
+            "high_water": self.high_water,
+            "under_pressure": 0 < self.high_water <= depth,
+            "oldest_wait_ms": round(oldest * 1000, 1),
+            "wait_p50_ms": round(wait["p50_ms"], 1),
+            "wait_p95_ms": round(wait["p95_ms"], 1),
+            "wait_max_ms": round(wait["max_ms"], 1),
+        }
+
+    def _get(self):
+        # Llamado por Queue.get() con el mutex tomado
+        item = super()._get()
+        if isinstance(item, PhotoEvent):
+            now = time.perf_counter()
+            self.wait.record(now - item.saved_at)
+            for trace in item.traces:
+                if trace is not None:
+                    trace.span("cola", "manager", item.saved_at, now, depth=len(self.queue))
+        return item
+
+
+class LatencyRecorder:
+    """
+    Latencias guardado → pantalla de las últimas `window` fotos.
+    Registra un resumen en el log cada `log_every` fotos y, si se indica,
+    alimenta un histograma de /metrics.
+    """
+
+    def __init__(self, name: str, window: int = 500, log_every: int = 20,
+                 histogram: Optional[Histogram] = None):
+        self.name = name
+        self.log_every = log_every
+        self._histogram = histogram
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._total = 0
+
+    def record(self, seconds: float):
+        if self._histogram is not None:
+            self._histogram.observe(seconds)
+        with self._lock:
+            self._samples.append(seconds)
+            self._total += 1
+            summarize = self.log_every and self._total % self.log_every == 0
+        logger.debug("%s: %.1f ms", self.name, seconds * 1000)
+        if summarize:
+            s = self.summary()
+            logger.info("%s (últimas %d): p50 %.1f ms · p95 %.1f ms · máx %.1f ms",
+                        self.name, s["samples"], s["p50_ms"], s["p95_ms"], s["max_ms"])
+
+    def summary(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            total = self._total
+        return {
+            "count": total,
+            "samples": len(ordered),
+            "p50_ms": _percentile(ordered, 50) * 1000,
+            "p95_ms": _percentile(ordered, 95) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+        }
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
@@ -0,0 +1,130 @@
+"""
+The Elite Flower — Modo headless (sólo ingesta, sin GUI).
+Servidor + cadena de procesadores + pool de trabajadores que consume la cola.
+No importa Tk ni customtkinter, y PIL sólo al validar la primera foto recibida:
+pensado para receptores Linux sin pantalla.
+
+Uso:
+    python main.py --headless
+
+SIGTERM / SIGINT: deja de aceptar subidas, espera a las peticiones en curso,
+procesa lo que quede en la cola y termina.
+"""
+
+import logging
+import signal
+import threading
+import time
+from typing import Callable, List
+
+from config import APP_CONFIG, get_local_ip, find_available_port
+from events import PHOTO_LATENCY, LatencyRecorder, PhotoEvent, PhotoQueue
+from processors import ProcessorChain
+from server import create_image_server
+from startup import STARTUP
+
+logger = logging.getLogger("headless")
+
+_STOP = None  # centinela de fin para los trabajadores
+
+
+class HeadlessReceiver:
+    """Receptor de fotos sin interfaz gráfica. Misma API de plugins que AppManager."""
+
+    def __init__(self, workers: int | None = None):
+        self._queue = PhotoQueue(APP_CONFIG["queue_max_depth"], APP_CONFIG["queue_high_water"])
+        self._server = create_image_server(self._queue)
+        self._processors = ProcessorChain()
+        self._n_workers = workers or APP_CONFIG["headless_workers"]
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._processed = 0
+        self._count_lock = threading.Lock()
+        self.latency = LatencyRecorder("Latencia guardado → procesada",
+                                       log_every=APP_CONFIG["latency_log_every"],
+                                       histogram=PHOTO_LATENCY)
+
+    # ───────── Sistema de plugins ─────────
+    def register_processor(self, fn: Callable[[str], str], thread_safe: bool = False):
+        """Registra un procesador (ver AppManager.register_processor)."""
+        self._processors.register(fn, thread_safe)
+
+    # ───────── Ciclo de vida ─────────
+    def run(self):
+        """Inicia servidor y trabajadores; bloquea hasta SIGTERM/SIGINT."""
+        ip = get_local_ip()
+        preferred_port = APP_CONFIG["port"]
+        APP_CONFIG["port"] = find_available_port(preferred_port)
+        if APP_CONFIG["port"] != preferred_port:
+            logger.info("Puerto %d ocupado, usando %d", preferred_port, APP_CONFIG["port"])
+
+        logger.info("=" * 50)
+        logger.info("THE ELITE FLOWER — Receptor de Fotos (headless)")
+        logger.info("=" * 50)
+        logger.info("IP local: %s", ip)
+        logger.info("Puerto:   %d", APP_CONFIG["port"])
+        logger.info("Carpeta:  %s", APP_CONFIG["upload_folder"])
+        logger.info("Trabajadores: %d · Procesadores: %d", self._n_workers, len(self._processors))
+        logger.info("=" * 50)
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+
+        self.start()
+        if STARTUP.profiling:
+            # --profile-startup: medir hasta que el servidor acepta conexiones y salir
+            self._server.listening.wait(30)
+            STARTUP.finish()
+            self.stop()
+        # Espera con timeout: en Windows un wait() sin límite no atiende Ctrl+C
+        while not self._stop.wait(1.0):
+            pass
+        self.shutdown()
+
+    def start(self):
+        self._server.start()
+        for i in range(self._n_workers):
+            worker = threading.Thread(target=self._work, name=f"ingest-{i}")
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        """Pide la parada (seguro desde cualquier hilo o manejador de señal)."""
+        self._stop.set()
+
+    def shutdown(self):
+        """Parada ordenada: sin subidas nuevas, termina las en curso y vacía la cola."""
+        started = time.perf_counter()
+        logger.info("Deteniendo: esperando peticiones en curso…")
+        self._server.stop(drain=True)
+
+        logger.info("Procesando %d elementos pendientes en la cola…", self._queue.qsize())
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+
+        logger.info("Receptor detenido en %.1f s (%d fotos procesadas)",
+                    time.perf_counter() - started, self._processed)
+
+    def _on_signal(self, signum, _frame):
+        logger.info("Señal %s recibida", signal.Signals(signum).name)
+        self.stop()
+
+    # ───────── Trabajadores ─────────
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            self._handle(item)
+
+    def _handle(self, event: PhotoEvent):
+        for filepath, trace, _verdict in event.items():
+            self._processors(filepath, trace)
+            if trace is not None:
+                trace.instant("procesada", "headless")
+            with self._count_lock:
+                self._processed += 1
+        self.latency.record(time.perf_counter() - event.saved_at)
@@ -0,0 +1,121 @@
+"""
+The Elite Flower — Decodificación rápida de imágenes.
+Utilidades sólo-PIL (sin Tk ni config) compartidas por la GUI y main_desktop.
+
+open_thumbnail() evita decodificar el fotograma completo:
+  1. usa la miniatura EXIF embebida que traen casi todos los JPEG de teléfono;
+  2. si no hay, decodifica el JPEG en modo draft (DCT a 1/2, 1/4 o 1/8);
+  3. sólo los formatos sin reducción en decodificación se leen completos.
+La orientación EXIF se aplica siempre sobre la imagen ya reducida.
+"""
+
+import io
+from typing import Optional, Tuple
+
+from PIL import ExifTags, Image
+
+EXIF_ORIENTATION = 0x0112
+EXIF_THUMB_OFFSET = 0x0201  # JPEGInterchangeFormat
+EXIF_THUMB_LENGTH = 0x0202  # JPEGInterchangeFormatLength
+
+# Diferencia de proporción tolerada entre la miniatura embebida y la foto;
+# por encima suele significar bandas negras (miniatura 4:3 de una foto 16:9).
+_ASPECT_TOLERANCE = 0.03
+
+_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def orient(img: Image.Image, orientation: int) -> Image.Image:
+    """Aplica la orientación EXIF (1–8) a una imagen."""
+    method = _TRANSPOSE.get(orientation)
+    return img.transpose(method) if method is not None else img
+
+
+def _display_mode(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    has_alpha = img.mode in ("LA", "PA") or "transparency" in img.info
+    return img.convert("RGBA" if has_alpha else "RGB")
+
+
+def _embedded_exif_thumbnail(img: Image.Image, exif: Image.Exif,
+                             size: Tuple[int, int]) -> Optional[Image.Image]:
+    """Miniatura JPEG del IFD1 si es suficientemente grande y de la misma proporción."""
+    raw = img.info.get("exif")
+    if not raw:
+        return None
+    try:
+        ifd1 = exif.get_ifd(ExifTags.IFD.IFD1)
+    except Exception:
+        return None
+    offset, length = ifd1.get(EXIF_THUMB_OFFSET), ifd1.get(EXIF_THUMB_LENGTH)
+    if not offset or not length:
+        return None
+
+    # Los offsets EXIF son relativos a la cabecera TIFF, tras "Exif\0\0"
+    base = 6 if raw.startswith(b"Exif\x00\x00") else 0
+    data = raw[base + offset:base + offset + length]
+    try:
+        thumb = Image.open(io.BytesIO(data))
+        thumb.load()
+    except Exception:
+        return None
+
+    if max(thumb.size) < max(size):
+        return None
+    aspect, thumb_aspect = img.width / img.height, thumb.width / thumb.height
+    if abs(thumb_aspect - aspect) / aspect > _ASPECT_TOLERANCE:
+        return None
+    return thumb
+
+
+def _reduce(img: Image.Image, box: Tuple[int, int], orientation: int) -> Image.Image:
+    # Caja en el sistema de coordenadas sin rotar
+    if orientation in (5, 6, 7, 8):
+        box = (box[1], box[0])
+    # Sin copy(): thumbnail() llama a draft() antes de cargar, así el JPEG
+    # se decodifica directamente a escala reducida; otros formatos usan reduce()
+    img.thumbnail(box, Image.LANCZOS, reducing_gap=2.0)
+    return _display_mode(orient(img, orientation))
+
+
+def open_scaled(filepath: str, box: Tuple[int, int]) -> Image.Image:
+    """
+    Abre `filepath` reducida para caber en `box` (sin ampliar), orientada y en RGB/RGBA.
+    Lanza la excepción de PIL si el archivo no es una imagen válida o está truncado.
+    """
+    with Image.open(filepath) as img:
+        scaled = _reduce(img, box, img.getexif().get(EXIF_ORIENTATION, 1))
+        # Si ya cabía en `box`, thumbnail() no la decodificó: cargar antes de cerrar el archivo
+        scaled.load()
+        return scaled
+
+
+def open_thumbnail(filepath: str, size: Tuple[int, int],
+                   use_embedded: bool = True) -> Image.Image:
+    """
+    Como open_scaled(), pero prueba antes la miniatura EXIF embebida de los JPEG.
+    Lanza la excepción de PIL si el archivo no es una imagen válida.
+    """
+    with Image.open(filepath) as img:
+        exif = img.getexif()
+        orientation = exif.get(EXIF_ORIENTATION, 1)
+
+        if use_embedded and img.format == "JPEG":
+            thumb = _embedded_exif_thumbnail(img, exif, size)
+            if thumb is not None:
+                thumb.thumbnail(size, Image.LANCZOS)
+                return _display_mode(orient(thumb, orientation))
+
+        scaled = _reduce(img, size, orientation)
+        # Igual que en open_scaled(): una foto menor que `size` sigue sin decodificar
+        scaled.load()
+        return scaled
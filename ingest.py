@@ -0,0 +1,239 @@
+"""
+The Elite Flower — Ingesta en streaming.
+Decodifica cuerpos multipart por bloques y escribe cada archivo directo a
+su destino final, contando bytes y calculando el hash sobre la marcha.
+La memoria usada por subida es constante (un bloque + el buffer del parser).
+"""
+
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from werkzeug.sansio.multipart import (
+    Data,
+    Epilogue,
+    Field,
+    File,
+    MultipartDecoder,
+    NeedData,
+)
+
+from metrics import REGISTRY
+from validation import SNIFF_BYTES, Verdict, inspect_image, sniff
+
+logger = logging.getLogger("ingest")
+
+SAVE_SECONDS = REGISTRY.histogram(
+    "elite_save_seconds", "Tiempo de disco por foto: escritura de bloques y cierre del archivo",
+    ("stage",))
+_SAVE_WRITE = SAVE_SECONDS.labels("write")
+_SAVE_CLOSE = SAVE_SECONDS.labels("close")
+
+# Tope del buffer interno del parser: cabeceras de parte y campos de texto.
+# Los datos de archivo nunca se acumulan, se vacían a disco en cada bloque.
+MAX_PART_BUFFER = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """La subida se rechaza durante la ingesta (campo, nombre o extensión inválidos)."""
+
+    def __init__(self, message: str, status: int = 400, reason: str = "invalid"):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.reason = reason  # etiqueta de elite_uploads_rejected_total
+
+
+@dataclass
+class IngestResult:
+    """Resultado de escribir una parte de archivo a disco."""
+
+    field: str
+    original_name: str
+    filepath: str
+    size: int
+    sha256: str
+    duration_s: float
+    # Validación estructural (validation.inspect_image); None si no se validó
+    verdict: Optional[Verdict] = None
+
+    @property
+    def size_kb(self) -> float:
+        return round(self.size / 1024, 1)
+
+    @property
+    def throughput_mbps(self) -> float:
+        """Throughput de escritura en MB/s (0 si la duración es despreciable)."""
+        if self.duration_s <= 0:
+            return 0.0
+        return round(self.size / (1024 * 1024) / self.duration_s, 2)
+
+
+class UploadSink:
+    """
+    Destino de una parte: archivo abierto + hash + contador de bytes.
+    Con los primeros bytes se reconoce el formato; si no es una imagen, el
+    resto de la parte ya no se escribe y close() devuelve el veredicto negativo.
+    """
+
+    def __init__(self, filepath: str, field: str = "image", original_name: str = ""):
+        self.filepath = filepath
+        self.field = field
+        self.original_name = original_name
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._started = time.perf_counter()
+        self._write_s = 0.0  # sólo disco, sin la espera de red entre bloques
+        self._head = b""
+        self._rejected: Optional[Verdict] = None
+        # "xb": nunca pisar un archivo existente con el mismo nombre
+        self._fh = open(filepath, "xb")
+
+    def write(self, data: bytes):
+        if len(self._head) < SNIFF_BYTES and data:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) == SNIFF_BYTES and sniff(self._head) is None:
+                self._rejected = Verdict(False, reason="no es una imagen (formato no reconocido)")
+        if self._rejected is not None:
+            self._size += len(data)
+            return
+        if data:
+            started = time.perf_counter()
+            self._fh.write(data)
+            self._write_s += time.perf_counter() - started
+            self._hash.update(data)
+            self._size += len(data)
+
+    def close(self) -> IngestResult:
+        """Cierra el archivo y devuelve el resultado de la ingesta."""
+        started = time.perf_counter()
+        self._fh.close()
+        _SAVE_CLOSE.observe(time.perf_counter() - started)
+        _SAVE_WRITE.observe(self._write_s)
+        return IngestResult(
+            field=self.field,
+            original_name=self.original_name,
+            filepath=self.filepath,
+            size=self._size,
+            sha256=self._hash.hexdigest(),
+            duration_s=time.perf_counter() - self._started,
+            verdict=self._rejected or inspect_image(self.filepath, self._head),
+        )
+
+    def abort(self):
+        """Descarta el archivo parcial."""
+        try:
+            self._fh.close()
+        finally:
+            try:
+                os.remove(self.filepath)
+            except OSError:
+                pass
+
+
+# open_sink(nombre_campo, nombre_archivo) -> UploadSink, o None para ignorar la parte
+SinkFactory = Callable[[str, str], Optional[UploadSink]]
+
+
+class MultipartIngestor:
+    """
+    Parser multipart incremental que vuelca los archivos a disco.
+
+    Se alimenta con `feed(bloque)` y `feed(None)` al final del cuerpo.
+    No depende de cómo se lean los bloques, así que sirve tanto para
+    `request.stream` como para un lector asíncrono.
+    """
+
+    def __init__(self, boundary: bytes, open_sink: SinkFactory, max_files: Optional[int] = None):
+        self._decoder = MultipartDecoder(boundary, max_form_memory_size=MAX_PART_BUFFER)
+        self._open_sink = open_sink
+        self._max_files = max_files
+        self._sink: Optional[UploadSink] = None
+        self._field_name: Optional[str] = None
+        self._field_buf: List[bytes] = []
+        self._skip = False
+        self.results: List[IngestResult] = []
+        self.fields: Dict[str, str] = {}
+        self.bytes_received = 0
+        self.done = False
+
+    def feed(self, data: Optional[bytes]):
+        """Procesa un bloque del cuerpo (None indica fin del cuerpo)."""
+        if data is not None:
+            self.bytes_received += len(data)
+        try:
+            self._decoder.receive_data(data)
+            event = self._decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                self._handle(event)
+                event = self._decoder.next_event()
+            if isinstance(event, Epilogue):
+                self.done = True
+        except Exception:
+            self.abort()
+            raise
+
+    def abort(self):
+        """Descarta el archivo en curso (los ya completados se conservan)."""
+        if self._sink is not None:
+            self._sink.abort()
+            self._sink = None
+
+    def discard(self):
+        """
+        Descarta el cuerpo entero: el archivo en curso y los ya completados, que
+        aún no se catalogaron ni encolaron (el cliente recibe un error y reintenta).
+        """
+        self.abort()
+        for result in self.results:
+            try:
+                os.remove(result.filepath)
+            except OSError:
+                pass
+        self.results.clear()
+
+    def _handle(self, event):
+        if isinstance(event, File):
+            self._skip = (
+                self._max_files is not None and len(self.results) >= self._max_files
+            )
+            if not self._skip:
+                self._sink = self._open_sink(event.name, event.filename)
+                self._skip = self._sink is None
+        elif isinstance(event, Field):
+            self._field_name = event.name
+            self._field_buf = []
+            self._skip = False
+        elif isinstance(event, Data):
+            if self._sink is not None:
+                self._sink.write(event.data)
+                if not event.more_data:
+                    self.results.append(self._sink.close())
+                    self._sink = None
+            elif self._field_name is not None and not self._skip:
+                self._field_buf.append(event.data)
+                if not event.more_data:
+                    self.fields[self._field_name] = b"".join(self._field_buf).decode("utf-8", "replace")
+                    self._field_name = None
+
+
+def ingest_stream(read: Callable[[int], bytes], ingestor: MultipartIngestor,
+                  chunk_size: int) -> MultipartIngestor:
+    """Lee `read` por bloques de `chunk_size` hasta EOF alimentando el ingestor."""
+    try:
+        while True:
+            data = read(chunk_size)
+            if not data:
+                break
+            ingestor.feed(data)
+        ingestor.feed(None)
+    except (UploadRejected, ValueError):
+        raise  # responde el llamador, que descarta el cuerpo (ImageServer._ingest_failed)
+    except BaseException:
+        # Cliente desconectado (ClientDisconnected) o timeout: sin restos en disco
+        ingestor.discard()
+        raise
+    return ingestor
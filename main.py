@@ -1,11 +1,62 @@
 """
 The Elite Flower — Punto de entrada.
+
+    python main.py                      # app de escritorio (GUI)
+    python main.py --headless           # sólo ingesta, sin Tk (servidores sin pantalla)
+    python main.py --profile-startup    # mide imports y tiempo hasta la primera ventana, y sale
+    python main.py --migrate-storage    # pasa la carpeta a subcarpetas AAAA/MM/DD, y sale
+    python main.py --folder RUTA        # usa otra carpeta de destino, sin guardarla
 """
 
-from manager import AppManager
+# Primero: fija el instante cero de la medición de arranque
+from startup import STARTUP
+
+import argparse
+import os
+
+from config import APP_CONFIG, load_settings, setup_logging
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="The Elite Flower — Receptor de Fotos")
+    parser.add_argument("--headless", action="store_true",
+                        help="sólo servidor y procesadores, sin interfaz gráfica")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="informa del tiempo de import de cada módulo y hasta la "
+                             "primera ventana (o el servidor listo, en headless) y sale")
+    parser.add_argument("--profile-output", metavar="RUTA",
+                        help="con --profile-startup, guarda el perfil en JSON")
+    parser.add_argument("--folder", metavar="RUTA",
+                        help="carpeta de destino de esta ejecución (en lugar de la de "
+                             "settings.json)")
+    parser.add_argument("--migrate-storage", action="store_true",
+                        help="activa la disposición por fecha (AAAA/MM/DD) y mueve a ella las "
+                             "fotos de la carpeta; puede ejecutarse con la app abierta")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    app = AppManager()
+    args = parse_args()
+    setup_logging()
+    if args.profile_startup:
+        STARTUP.enable_profiling(args.profile_output)
+    load_settings()
+    if args.folder:
+        APP_CONFIG["upload_folder"] = os.path.abspath(args.folder)
+
+    if args.migrate_storage:
+        from storage import migrate_storage
+        migrate_storage()
+        raise SystemExit(0)
+
+    # Imports diferidos: el modo headless no debe cargar la GUI
+    if args.headless:
+        from headless import HeadlessReceiver
+        app = HeadlessReceiver()
+    else:
+        from manager import AppManager
+        app = AppManager()
+    STARTUP.mark("módulos importados")
 
     # ── Ejemplo: registrar un procesador de imágenes ──
     # def mi_procesador(filepath: str) -> str:
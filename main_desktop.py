@@ -22,6 +22,8 @@ from PIL import Image, ImageTk, ImageDraw
 from flask import Flask, request, jsonify
 from werkzeug.utils import secure_filename
 
+from imaging import open_thumbnail
+
 # ──────────────────────────────────────────────
 # Configuración
 # ──────────────────────────────────────────────
@@ -344,9 +346,12 @@ class PhotoReceiverApp(ctk.CTk):
         self.current_image_ref = photo
         self.image_label.configure(image=photo, text="")
 
-        # ── Thumbnail para historial ──
-        thumb = img.copy()
-        thumb.thumbnail(self.THUMBNAIL_SIZE, Image.LANCZOS)
+        # ── Thumbnail para historial (miniatura EXIF o decodificación reducida) ──
+        try:
+            thumb = open_thumbnail(filepath, self.THUMBNAIL_SIZE)
+        except Exception:
+            thumb = img.copy()
+            thumb.thumbnail(self.THUMBNAIL_SIZE, Image.LANCZOS)
 
         # Fondo oscuro cuadrado
         bg = Image.new("RGB", self.THUMBNAIL_SIZE, (15, 23, 42))
@@ -426,9 +431,7 @@ class PhotoReceiverApp(ctk.CTk):
 
         for fp in files[-self.MAX_THUMBNAILS:]:
             try:
-                img = Image.open(fp)
-                thumb = img.copy()
-                thumb.thumbnail(self.THUMBNAIL_SIZE, Image.LANCZOS)
+                thumb = open_thumbnail(fp, self.THUMBNAIL_SIZE)
 
                 bg = Image.new("RGB", self.THUMBNAIL_SIZE, (15, 23, 42))
                 offset_x = (self.THUMBNAIL_SIZE[0] - thumb.size[0]) // 2
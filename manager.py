@@ -7,30 +7,58 @@ Incluye sistema de plugins para procesamiento de imágenes.
 import logging
 import os
 import queue
-from typing import Callable, List
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
 
 from config import APP_CONFIG, get_local_ip, save_settings, find_available_port
-from server import ImageServer
+from events import PHOTO_LATENCY, PHOTO_READY_EVENT, LatencyRecorder, PhotoQueue
+from pipeline import DecodePipeline, PreparedPhoto
+from processors import ProcessorChain
+from startup import STARTUP
+
+if TYPE_CHECKING:
+    from server import ImageServer
 
 logger = logging.getLogger("manager")
 
+# Fotos en decodificación por hilo del pipeline; el resto espera en la cola
+# acotada, que es la que aplica la contrapresión al servidor
+IN_FLIGHT_PER_WORKER = 4
+
 
 class AppManager:
     """Controlador principal: conecta ImageServer ↔ AppInterface."""
 
     def __init__(self):
-        self._queue: queue.Queue = queue.Queue()
-        self._server = ImageServer(self._queue)
+        self._queue = PhotoQueue(APP_CONFIG["queue_max_depth"], APP_CONFIG["queue_high_water"])
+        # Se crea tras mostrar la ventana: importar Flask es lo más caro del arranque
+        self._server: Optional["ImageServer"] = None
         self._gui = None  # se asigna en run()
-        self._processors: List[Callable[[str], str]] = []
+        self._processors = ProcessorChain()
+        self._pipeline = DecodePipeline(
+            self._processors,
+            workers=APP_CONFIG["decode_workers"],
+            thumb_size=APP_CONFIG["thumbnail_size"],
+            on_ready=self._wakeup,
+        )
+
+        # Despertar por evento: un único <<PhotoReady>> pendiente a la vez
+        self._event_wakeup = False
+        self._wake_pending = threading.Event()
+        self.latency = LatencyRecorder("Latencia guardado → pantalla",
+                                       log_every=APP_CONFIG["latency_log_every"],
+                                       histogram=PHOTO_LATENCY)
 
     # ───────── Sistema de plugins ─────────
-    def register_processor(self, fn: Callable[[str], str]):
+    def register_processor(self, fn: Callable[[str], str], thread_safe: bool = False):
         """
         Registra una función que procesa cada foto antes de mostrarla.
 
         La función recibe la ruta del archivo y debe devolver una ruta
         (puede ser la misma o una nueva si genera un archivo procesado).
+        Se ejecuta en un hilo de trabajo; con thread_safe=False (por defecto)
+        nunca corre en paralelo consigo misma ni con otros procesadores.
 
         Ejemplo de uso:
             def watermark(filepath: str) -> str:
@@ -39,17 +67,7 @@ class AppManager:
 
             manager.register_processor(watermark)
         """
-        self._processors.append(fn)
-        logger.info("Procesador registrado: %s", fn.__name__)
-
-    def _apply_processors(self, filepath: str) -> str:
-        """Ejecuta todos los procesadores registrados en orden."""
-        for fn in self._processors:
-            try:
-                filepath = fn(filepath)
-            except Exception as e:
-                logger.warning("Processor %s falló: %s", fn.__name__, e)
-        return filepath
+        self._processors.register(fn, thread_safe)
 
     # ───────── Cambio de carpeta ─────────
     def update_storage_path(self, new_path: str):
@@ -65,26 +83,118 @@ class AppManager:
         if self._gui is not None:
             self._gui.on_storage_path_changed(new_path)
 
-    # ───────── Polling de la cola ─────────
+    # ───────── Despacho de la cola ─────────
+    def _wakeup(self):
+        """
+        Despierta al hilo de Tk (llamado desde hilos del servidor y del pipeline).
+        Tk con hilos encola event_generate en el hilo principal de forma segura.
+        """
+        if not self._event_wakeup or self._wake_pending.is_set():
+            return
+        self._wake_pending.set()
+        try:
+            self._gui.event_generate(PHOTO_READY_EVENT, when="tail")
+        except Exception:
+            # Ventana cerrándose o mainloop aún no iniciado: lo recoge el siguiente despertar
+            self._wake_pending.clear()
+
+    def _on_photo_ready(self, _event=None):
+        # Limpiar antes de drenar: un put() posterior genera un evento nuevo
+        self._wake_pending.clear()
+        self._process_queue()
+
     def _poll_queue(self):
-        """Revisa la cola y despacha fotos nuevas a la GUI."""
+        """Modo polling (respaldo): drena la cola y se re-programa."""
+        self._process_queue()
+        if self._gui is not None:
+            self._gui.after(APP_CONFIG["poll_interval_ms"], self._poll_queue)
+
+    def _process_queue(self):
+        """Envía las fotos nuevas al pipeline y despacha a la GUI las ya decodificadas."""
+        if self._gui is None:
+            return
+        for photo in self._pipeline.drain_ready():
+            self._gui.display_prepared(photo)
+
+        # Sólo se saca de la cola lo que el pipeline puede atender: cada foto
+        # decodificada vuelve a despertar este método y libera su hueco
+        self._pipeline.viewer_box = self._gui.viewer_box()
+        in_flight = APP_CONFIG["decode_workers"] * IN_FLIGHT_PER_WORKER
+        arrived = []
         try:
-            while True:
-                filepath = self._queue.get_nowait()
-                filepath = self._apply_processors(filepath)
-                if self._gui is not None:
-                    self._gui.display_image(filepath)
+            while self._pipeline.pending + len(arrived) < in_flight:
+                item = self._queue.get_nowait()
+                # Un lote de /upload/batch llega como un solo evento
+                arrived.extend((filepath, item.saved_at, trace, verdict)
+                               for filepath, trace, verdict in item.items())
         except queue.Empty:
             pass
 
-        if self._gui is not None:
+        # De una ráfaga el visor sólo mostrará la última: el resto sólo necesita miniatura.
+        # Con el pipeline saturado cada hueco libre saca una sola foto; si la cola no
+        # quedó vacía, aún vienen más detrás y ésta tampoco llegará al visor
+        last = len(arrived) - 1 if self._queue.empty() else -1
+        for i, (filepath, saved_at, trace, verdict) in enumerate(arrived):
+            self._pipeline.submit(filepath, saved_at, viewer=i == last, trace=trace,
+                                  verdict=verdict)
+
+    def on_photo_shown(self, photo: PreparedPhoto):
+        """Llamado por la GUI tras redibujar el visor con una foto nueva."""
+        if photo.saved_at is not None:
+            self.latency.record(time.perf_counter() - photo.saved_at)
+        if photo.trace is not None:
+            photo.trace.instant("en pantalla", "gui")
+
+    def _start_dispatch(self):
+        """Elige despertar por evento o polling según config y el Tcl disponible."""
+        self._pipeline.pyramid_box = self._gui.pyramid_box()
+
+        mode = APP_CONFIG["gui_wakeup"]
+        if mode == "event" and not self._tcl_threaded():
+            logger.warning("Tcl sin soporte de hilos: usando polling cada %d ms",
+                           APP_CONFIG["poll_interval_ms"])
+            mode = "poll"
+
+        if mode == "event":
+            self._gui.bind(PHOTO_READY_EVENT, self._on_photo_ready)
+            self._event_wakeup = True
+            # Fotos que llegaron antes de crear la ventana
+            self._gui.after_idle(self._on_photo_ready)
+        else:
             self._gui.after(APP_CONFIG["poll_interval_ms"], self._poll_queue)
+        logger.info("Despacho de fotos: %s", mode)
+
+    def _tcl_threaded(self) -> bool:
+        try:
+            return bool(int(self._gui.tk.eval("set tcl_platform(threaded)")))
+        except Exception:
+            return False
 
     # ───────── Ciclo de vida ─────────
+    def _start_server(self):
+        with STARTUP.phase("importar servidor"):
+            from server import create_image_server
+        self._server = create_image_server(self._queue)
+        self._server.set_notifier(self._wakeup)
+        self._server.start()
+
+    def on_startup_done(self):
+        """Llamado por la GUI al terminar la carga inicial."""
+        if not STARTUP.profiling:
+            STARTUP.finish()
+            return
+        # --profile-startup: esperar al servidor, informar y cerrar
+        if self._server is None or not self._server.listening.is_set():
+            self._gui.after(50, self.on_startup_done)
+            return
+        STARTUP.finish()
+        self._gui.destroy()
+
     def run(self):
         """Inicia el servidor y la GUI (bloquea hasta cerrar ventana)."""
         # Import aquí para evitar dependencia circular
-        from ui import AppInterface
+        with STARTUP.phase("importar GUI"):
+            from ui import AppInterface
 
         ip = get_local_ip()
 
@@ -106,15 +216,19 @@ class AppManager:
         logger.info("Procesadores: %d", len(self._processors))
         logger.info("=" * 50)
 
-        # Iniciar servidor Flask
-        self._server.start()
-
         # Crear GUI, pasando referencia al manager
         self._gui = AppInterface(local_ip=ip, manager=self)
 
-        # Iniciar polling
-        self._gui.after(APP_CONFIG["poll_interval_ms"], self._poll_queue)
+        # Despertar por evento (o polling de respaldo)
+        self._start_dispatch()
+
+        # Iniciar servidor Flask sin retrasar la primera ventana
+        threading.Thread(target=self._start_server, name="server-init", daemon=True).start()
 
         # Mainloop (bloquea)
-        self._gui.mainloop()
+        try:
+            self._gui.mainloop()
+        finally:
+            self._event_wakeup = False
+            self._pipeline.shutdown()
 
@@ -0,0 +1,280 @@
+"""
+The Elite Flower — Métricas del receptor en formato Prometheus (texto 0.0.4).
+Contadores, gauges e histogramas baratos para el camino caliente: cada hilo
+escribe en su propia celda sin tomar locks y la exposición (/metrics) suma
+las celdas de todos los hilos. Los hilos que terminan se pliegan en una
+celda común para no acumular memoria con el motor "dev" (un hilo por conexión).
+
+Uso:
+    UPLOADS = REGISTRY.counter("elite_uploads_total", "Fotos guardadas", ("route",))
+    UPLOADS.labels("upload").inc()
+    SAVE = REGISTRY.histogram("elite_save_seconds", "Escritura a disco")
+    SAVE.observe(0.012)
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Segundos: de una miniatura (ms) a una subida lenta por Wi-Fi (decenas de s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Shards:
+    """Una celda (lista de floats) por hilo; snapshot() suma todas."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * size  # celdas de hilos ya terminados
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+            return cell
+
+    def snapshot(self) -> List[float]:
+        with self._lock:
+            alive = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    alive.append((thread, cell))
+                else:
+                    # Un hilo terminado ya no escribe: se puede plegar sin carreras
+                    for i, value in enumerate(cell):
+                        self._retired[i] += value
+            self._cells = alive
+            total = list(self._retired)
+        for _, cell in alive:
+            for i, value in enumerate(cell):
+                total[i] += value
+        return total
+
+
+class _Metric:
+    """Familia de series con el mismo nombre, una por combinación de etiquetas."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._unlabeled = None
+
+    def labels(self, *values: str):
+        """Serie para estos valores de etiqueta (se crea la primera vez)."""
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(str(v) for v in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: se esperaban etiquetas {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        """Serie única de una métrica sin etiquetas."""
+        child = self._unlabeled
+        if child is None:
+            child = self._unlabeled = self.labels()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape_help(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._series():
+            lines.extend(self._expose_child(self._label_pairs(key), child))
+        return lines
+
+    def _expose_child(self, labels: List[Tuple[str, str]], child) -> List[str]:
+        raise NotImplementedError
+
+    def _label_pairs(self, key: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0):
+        self._shards.cell()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.snapshot()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _expose_child(self, labels, child):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value())}"]
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_fn")
+
+    def __init__(self):
+        self._value = 0.0
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value  # asignación atómica: sin lock
+
+    def set_function(self, fn: Optional[Callable[[], float]]):
+        """El valor se lee de `fn` en cada exposición (p. ej. la profundidad de la cola)."""
+        self._fn = fn
+
+    def value(self) -> float:
+        fn = self._fn
+        return float(fn()) if fn is not None else self._value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, fn: Optional[Callable[[], float]]):
+        self._default().set_function(fn)
+
+    def _expose_child(self, labels, child):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value())}"]
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_shards")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # Una cuenta por bucket, otra para +Inf y la suma al final
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float):
+        cell = self._shards.cell()
+        cell[bisect.bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        values = self._shards.snapshot()
+        return values[:-1], values[-1]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _expose_child(self, labels, child):
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = labels + [("le", "+Inf" if bound == float("inf") else _format_value(bound))]
+            lines.append(f"{self.name}_bucket{_format_labels(le)} {_format_value(cumulative)}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    """Métricas del proceso. Registrar dos veces el mismo nombre devuelve la existente."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrica {name} ya registrada como {metric.kind}")
+        if not metric.labelnames:
+            metric.labels()  # sin etiquetas: la serie existe (a 0) desde el inicio
+        return metric
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels)
+    return "{" + inner + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
@@ -0,0 +1,129 @@
+"""
+The Elite Flower — Etapa de decodificación en segundo plano.
+Ejecuta los procesadores, decodifica cada foto (pirámide al tamaño de la
+pantalla, imagen del visor y miniatura) en un pool de hilos, fuera del hilo de Tk. La GUI sólo recibe
+imágenes PIL listas para envolver en PhotoImage.
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Deque, List, Optional, Tuple
+
+from PIL import Image
+
+from metrics import REGISTRY
+from pyramid import ImagePyramid
+from thumbcache import get_thumbnail_cache
+
+if TYPE_CHECKING:
+    from tracing import Trace
+    from validation import Verdict
+
+logger = logging.getLogger("pipeline")
+
+DECODE_SECONDS = REGISTRY.histogram(
+    "elite_decode_seconds", "Decodificación de una foto en el pipeline (pirámide y miniatura)",
+    ("kind",))
+_DECODE_VIEWER = DECODE_SECONDS.labels("viewer")
+_DECODE_THUMBNAIL = DECODE_SECONDS.labels("thumbnail")
+
+
+@dataclass
+class PreparedPhoto:
+    """Foto procesada y reducida, lista para el hilo de la GUI."""
+
+    filepath: str
+    ok: bool
+    viewer_image: Optional[Image.Image] = None
+    thumbnail: Optional[Image.Image] = None
+    error: str = ""
+    pyramid: Optional[ImagePyramid] = None
+    saved_at: Optional[float] = None  # PhotoEvent.saved_at, para medir latencia
+    # Reloj monotónico al terminar la decodificación (retraso de despacho en la GUI)
+    ready_at: float = field(default_factory=time.perf_counter)
+    trace: Optional["Trace"] = None
+
+
+class DecodePipeline:
+    """
+    Pool de decodificación que entrega resultados en orden de llegada.
+
+    `submit()` y `drain_ready()` se llaman desde el hilo de Tk; el trabajo
+    pesado corre en los hilos del pool (PIL libera el GIL al decodificar).
+    """
+
+    def __init__(self, process: Callable[[str, Optional["Trace"]], str], workers: int,
+                 thumb_size: Tuple[int, int],
+                 on_ready: Optional[Callable[[], None]] = None):
+        self._process = process
+        self._thumb_size = thumb_size
+        self._on_ready = on_ready
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        self._pending: Deque[Future] = deque()
+        # Tamaños del visor y de la pantalla, actualizados por la GUI
+        # (lectura atómica desde los hilos)
+        self.viewer_box: Tuple[int, int] = (800, 600)
+        self.pyramid_box: Tuple[int, int] = (1920, 1080)
+
+    def submit(self, filepath: str, saved_at: Optional[float] = None, viewer: bool = True,
+               trace: Optional["Trace"] = None, verdict: Optional["Verdict"] = None):
+        """
+        Encola una foto. Con viewer=False sólo se genera la miniatura
+        (fotos intermedias de una ráfaga que el visor no llegará a mostrar).
+        `verdict` es la validación hecha al recibirla: si Pillow no sabe
+        decodificarla, no se intenta.
+        """
+        future = self._pool.submit(self._prepare, filepath, saved_at, viewer, trace, verdict)
+        if self._on_ready is not None:
+            future.add_done_callback(lambda _f: self._on_ready())
+        self._pending.append(future)
+
+    def drain_ready(self) -> List[PreparedPhoto]:
+        """Resultados terminados, respetando el orden de envío."""
+        ready = []
+        while self._pending and self._pending[0].done():
+            ready.append(self._pending.popleft().result())
+        return ready
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ───────── Hilos del pool ─────────
+    def _prepare(self, filepath: str, saved_at: Optional[float], viewer: bool,
+                 trace: Optional["Trace"], verdict: Optional["Verdict"]) -> PreparedPhoto:
+        try:
+            processed = self._process(filepath, trace)
+            # Íntegra pero no decodificable (HEIC sin plugin, demasiados píxeles): no se intenta,
+            # salvo que un procesador la haya convertido en otro archivo
+            if verdict is not None and not verdict.displayable and processed == filepath:
+                return PreparedPhoto(filepath, ok=False, saved_at=saved_at, trace=trace,
+                                     error=verdict.reason
+                                     or f"formato {verdict.format} sin decodificador")
+            filepath = processed
+            started = time.perf_counter()
+            pyramid = ImagePyramid.open(filepath, self.pyramid_box) if viewer else None
+        except Exception as e:
+            return PreparedPhoto(filepath, ok=False, error=str(e), saved_at=saved_at, trace=trace)
+
+        thumbnail = get_thumbnail_cache().get_or_create(filepath, self._thumb_size)
+        viewer_image = pyramid.fit(self.viewer_box) if pyramid is not None else None
+        ended = time.perf_counter()
+        (_DECODE_VIEWER if viewer else _DECODE_THUMBNAIL).observe(ended - started)
+        if trace is not None:
+            trace.span("decodificación", "pipeline", started, ended, viewer=viewer)
+
+        if pyramid is None:
+            if thumbnail is None:
+                return PreparedPhoto(filepath, ok=False, error="no se pudo decodificar",
+                                     saved_at=saved_at, trace=trace)
+            return PreparedPhoto(filepath, ok=True, thumbnail=thumbnail, saved_at=saved_at,
+                                 trace=trace)
+        return PreparedPhoto(filepath, ok=True, viewer_image=viewer_image,
+                             thumbnail=thumbnail, pyramid=pyramid, saved_at=saved_at, trace=trace)
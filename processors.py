@@ -0,0 +1,75 @@
+"""
+The Elite Flower — Cadena de procesadores de imágenes (plugins).
+Compartida por la app de escritorio (AppManager) y el modo headless.
+Sin dependencias de GUI.
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from catalog import get_catalog
+from config import APP_CONFIG
+from metrics import REGISTRY
+from storage import is_stored_photo
+
+if TYPE_CHECKING:
+    from tracing import Trace
+
+logger = logging.getLogger("processors")
+
+PROCESSOR_SECONDS = REGISTRY.histogram(
+    "elite_processor_duration_seconds",
+    "Duración de cada procesador registrado (sin la espera del lock serial)", ("processor",))
+
+
+class ProcessorChain:
+    """
+    Funciones que procesan cada foto recibida, ejecutadas en orden de registro.
+
+    Cada función recibe la ruta del archivo y devuelve una ruta (la misma o la
+    de un archivo nuevo). Se llama desde hilos de trabajo: los procesadores que
+    no se declaran thread_safe se ejecutan de uno en uno.
+    """
+
+    def __init__(self):
+        self._fns: List[Tuple[Callable[[str], str], bool]] = []
+        self._serial_lock = threading.Lock()
+
+    def register(self, fn: Callable[[str], str], thread_safe: bool = False):
+        self._fns.append((fn, thread_safe))
+        logger.info("Procesador registrado: %s", fn.__name__)
+
+    def __len__(self) -> int:
+        return len(self._fns)
+
+    def __call__(self, filepath: str, trace: Optional["Trace"] = None) -> str:
+        """Ejecuta todos los procesadores registrados en orden."""
+        original = filepath
+        for fn, thread_safe in self._fns:
+            try:
+                if thread_safe:
+                    filepath = self._timed(fn, filepath, trace)
+                else:
+                    with self._serial_lock:
+                        filepath = self._timed(fn, filepath, trace)
+            except Exception as e:
+                logger.warning("Processor %s falló: %s", fn.__name__, e)
+        if filepath != original:
+            # Un procesador generó un archivo nuevo: mantener el catálogo al día
+            folder = APP_CONFIG["upload_folder"]
+            if is_stored_photo(filepath, folder):
+                get_catalog().add(filepath)
+        return filepath
+
+    @staticmethod
+    def _timed(fn: Callable[[str], str], filepath: str, trace: Optional["Trace"]) -> str:
+        started = time.perf_counter()
+        try:
+            return fn(filepath)
+        finally:
+            ended = time.perf_counter()
+            PROCESSOR_SECONDS.labels(fn.__name__).observe(ended - started)
+            if trace is not None:
+                trace.span(fn.__name__, "procesador", started, ended)
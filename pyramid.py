@@ -0,0 +1,124 @@
+"""
+The Elite Flower — Pirámide de resoluciones para el visor.
+Cada foto se decodifica una vez al tamaño de la pantalla y se guardan niveles
+reducidos a la mitad sucesivamente. Al redimensionar la ventana se remuestrea
+desde el nivel inmediatamente mayor: nunca se vuelve al disco ni al original.
+
+PyramidCache guarda las pirámides de la foto actual y sus vecinas en el
+historial, con un presupuesto de memoria y expulsión LRU.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from imaging import open_scaled
+
+logger = logging.getLogger("pyramid")
+
+# Los niveles se detienen cuando el lado mayor baja de este valor
+MIN_LEVEL_SIDE = 256
+
+
+class ImagePyramid:
+    """Niveles de una imagen, del mayor al menor, cada uno la mitad del anterior."""
+
+    def __init__(self, levels: List[Image.Image]):
+        self.levels = levels
+        # PIL guarda RGB y RGBA con 4 bytes por píxel
+        self.nbytes = sum(4 * level.width * level.height for level in levels)
+
+    @classmethod
+    def build(cls, base: Image.Image) -> "ImagePyramid":
+        levels = [base]
+        while max(levels[-1].size) >= 2 * MIN_LEVEL_SIDE:
+            levels.append(levels[-1].reduce(2))
+        return cls(levels)
+
+    @classmethod
+    def open(cls, filepath: str, box: Tuple[int, int]) -> "ImagePyramid":
+        """Decodifica `filepath` reducida a `box` y construye sus niveles."""
+        return cls.build(open_scaled(filepath, box))
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.levels[0].size
+
+    def fit(self, box: Tuple[int, int]) -> Image.Image:
+        """Imagen ajustada a `box` (sin ampliar), remuestreada desde el nivel mayor más cercano."""
+        width, height = self.size
+        scale = min(box[0] / width, box[1] / height, 1.0)
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+        source = self.levels[0]
+        for level in self.levels[1:]:
+            if level.width < target[0] or level.height < target[1]:
+                break
+            source = level
+        if source.size == target:
+            return source
+        return source.resize(target, Image.LANCZOS)
+
+
+class PyramidCache:
+    """Pirámides por ruta, con presupuesto en bytes y expulsión LRU. Seguro entre hilos."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget = budget_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, ImagePyramid]" = OrderedDict()
+        self._total = 0
+        self._loading = set()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyramid")
+
+    def get(self, filepath: str) -> Optional[ImagePyramid]:
+        with self._lock:
+            pyramid = self._entries.get(filepath)
+            if pyramid is not None:
+                self._entries.move_to_end(filepath)
+            return pyramid
+
+    def put(self, filepath: str, pyramid: ImagePyramid):
+        with self._lock:
+            old = self._entries.pop(filepath, None)
+            if old is not None:
+                self._total -= old.nbytes
+            self._entries[filepath] = pyramid
+            self._total += pyramid.nbytes
+            while self._total > self.budget and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= evicted.nbytes
+
+    def load(self, filepath: str, box: Tuple[int, int]) -> ImagePyramid:
+        """Pirámide de `filepath`, desde la caché o decodificándola (lanza si no es válida)."""
+        pyramid = self.get(filepath)
+        if pyramid is None:
+            pyramid = ImagePyramid.open(filepath, box)
+            self.put(filepath, pyramid)
+        return pyramid
+
+    def prefetch(self, paths: Iterable[str], box: Tuple[int, int]):
+        """Prepara en segundo plano las pirámides que falten (vecinas de la foto actual)."""
+        for filepath in paths:
+            with self._lock:
+                if filepath in self._entries or filepath in self._loading:
+                    continue
+                self._loading.add(filepath)
+            self._pool.submit(self._prefetch_one, filepath, box)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total, "budget_bytes": self.budget}
+
+    def _prefetch_one(self, filepath: str, box: Tuple[int, int]):
+        try:
+            self.put(filepath, ImagePyramid.open(filepath, box))
+        except Exception as e:
+            logger.debug("No se pudo precargar %s: %s", filepath, e)
+        finally:
+            with self._lock:
+                self._loading.discard(filepath)
@@ -0,0 +1,230 @@
+"""
+The Elite Flower — Subidas reanudables por bloques.
+Protocolo: init → PUT de bloques por offset → consulta del offset recibido → complete.
+El estado parcial vive en disco (<carpeta>/.partial/) y sobrevive a reinicios;
+el archivo final se obtiene renombrando el .part, sin volver a leerlo.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from ingest import IngestResult, UploadRejected
+from validation import inspect_image
+
+logger = logging.getLogger("resumable")
+
+PARTIAL_DIRNAME = ".partial"
+
+
+class OffsetMismatch(UploadRejected):
+    """El bloque no empieza donde termina lo ya recibido."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Offset incorrecto; el servidor tiene {offset} bytes.", 409)
+        self.offset = offset
+
+
+class _Session:
+    """Estado en memoria de una subida: metadatos + hash incremental."""
+
+    def __init__(self, upload_id: str, meta: dict):
+        self.id = upload_id
+        self.filename: str = meta["filename"]
+        self.size: int = meta["size"]
+        self.created: float = meta["created"]
+        self.lock = threading.Lock()
+        # El hash sólo es válido si cubre exactamente los bytes del .part
+        self.hasher: Optional["hashlib._Hash"] = None
+        self.hashed = 0
+
+
+class ResumableStore:
+    """Gestiona las sesiones de subida reanudable bajo la carpeta de destino."""
+
+    def __init__(self, folder_getter: Callable[[], str]):
+        self._folder_getter = folder_getter
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+
+    # ───────── Rutas ─────────
+    @property
+    def directory(self) -> str:
+        return os.path.join(self._folder_getter(), PARTIAL_DIRNAME)
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    @staticmethod
+    def valid_id(upload_id: str) -> bool:
+        return len(upload_id) == 32 and all(c in "0123456789abcdef" for c in upload_id)
+
+    # ───────── Protocolo ─────────
+    def create(self, filename: str, size: int) -> str:
+        """Abre una sesión nueva y devuelve su id."""
+        os.makedirs(self.directory, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        meta = {"filename": filename, "size": size, "created": time.time()}
+        open(self._part_path(upload_id), "xb").close()
+        with open(self._meta_path(upload_id), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        session = _Session(upload_id, meta)
+        session.hasher = hashlib.sha256()
+        with self._lock:
+            self._sessions[upload_id] = session
+        logger.info("Subida reanudable iniciada: %s (%s, %d bytes)", upload_id, filename, size)
+        return upload_id
+
+    def status(self, upload_id: str) -> dict:
+        """Offset recibido, tamaño total y nombre original de la sesión."""
+        session = self._get(upload_id)
+        return {
+            "upload_id": upload_id,
+            "filename": session.filename,
+            "offset": self._received(upload_id),
+            "size": session.size,
+        }
+
+    def write_chunk(self, upload_id: str, offset: int,
+                    read: Callable[[int], bytes], chunk_size: int) -> int:
+        """
+        Escribe el cuerpo de un PUT a partir de `offset` y devuelve el nuevo offset.
+        Si la conexión se corta a mitad, lo escrito se conserva para reanudar.
+        """
+        session = self._get(upload_id)
+        with session.lock:
+            received = self._received(upload_id)
+            if offset != received:
+                raise OffsetMismatch(received)
+
+            hashing = session.hasher is not None and session.hashed == received
+            with open(self._part_path(upload_id), "r+b") as fh:
+                fh.seek(received)
+                try:
+                    while True:
+                        data = read(chunk_size)
+                        if not data:
+                            break
+                        if received + len(data) > session.size:
+                            fh.truncate(offset)
+                            session.hasher, session.hashed = None, 0
+                            raise UploadRejected(
+                                f"El bloque excede el tamaño declarado ({session.size} bytes).",
+                                reason="too_large")
+                        fh.write(data)
+                        received += len(data)
+                        if hashing:
+                            session.hasher.update(data)
+                            session.hashed = received
+                finally:
+                    # Tocar el .part mantiene viva la sesión frente al barrido
+                    os.utime(self._part_path(upload_id))
+            return received
+
+    def complete(self, upload_id: str, dest_path: str) -> IngestResult:
+        """Mueve el .part completo a su ruta final y cierra la sesión."""
+        session = self._get(upload_id)
+        with session.lock:
+            received = self._received(upload_id)
+            if received != session.size:
+                raise OffsetMismatch(received)
+
+            if session.hasher is not None and session.hashed == received:
+                digest = session.hasher.hexdigest()
+            else:
+                # Sesión retomada tras un reinicio: no hay hash incremental
+                digest = self._hash_file(self._part_path(upload_id))
+
+            os.replace(self._part_path(upload_id), dest_path)
+            self._discard(upload_id)
+
+        return IngestResult(
+            field="image",
+            original_name=session.filename,
+            filepath=dest_path,
+            size=received,
+            sha256=digest,
+            duration_s=time.time() - session.created,
+            verdict=inspect_image(dest_path),
+        )
+
+    def cancel(self, upload_id: str):
+        """Descarta una sesión y su archivo parcial."""
+        session = self._get(upload_id)
+        with session.lock:
+            self._discard(upload_id, remove_part=True)
+
+    # ───────── Expiración ─────────
+    def sweep(self, ttl_s: float) -> int:
+        """Elimina sesiones sin actividad desde hace más de ttl_s. Devuelve cuántas."""
+        directory = self.directory
+        if not os.path.isdir(directory):
+            return 0
+        cutoff = time.time() - ttl_s
+        removed = 0
+        for entry in os.scandir(directory):
+            upload_id, ext = os.path.splitext(entry.name)
+            if ext != ".part" or not self.valid_id(upload_id):
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                continue
+            self._discard(upload_id, remove_part=True)
+            removed += 1
+        if removed:
+            logger.info("Subidas reanudables expiradas eliminadas: %d", removed)
+        return removed
+
+    # ───────── Internos ─────────
+    def _get(self, upload_id: str) -> _Session:
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                return session
+            # Sesión creada antes de un reinicio: recuperar metadatos de disco
+            try:
+                with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                raise UploadRejected("Subida no encontrada o expirada.", 404, "not_found")
+            if not os.path.isfile(self._part_path(upload_id)):
+                raise UploadRejected("Subida no encontrada o expirada.", 404, "not_found")
+            session = self._sessions[upload_id] = _Session(upload_id, meta)
+            return session
+
+    def _received(self, upload_id: str) -> int:
+        try:
+            return os.path.getsize(self._part_path(upload_id))
+        except OSError:
+            raise UploadRejected("Subida no encontrada o expirada.", 404, "not_found")
+
+    def _discard(self, upload_id: str, remove_part: bool = False):
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        paths = [self._meta_path(upload_id)]
+        if remove_part:
+            paths.append(self._part_path(upload_id))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
@@ -5,76 +5,189 @@ Encapsula toda la lógica HTTP en la clase ImageServer.
 
 import logging
 import os
+import shutil
 import threading
-import queue
 import time
-from datetime import datetime
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
-from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
+from flask import Flask, Response, g, request, jsonify
+from werkzeug.http import parse_options_header
 
 from config import APP_CONFIG
+from engines import make_engine
+from events import PhotoEvent, PhotoQueue
+from catalog import get_catalog
+from ingest import IngestResult, MultipartIngestor, UploadRejected, UploadSink, ingest_stream
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from resumable import OffsetMismatch, ResumableStore
+from startup import SERVER_LISTENING, STARTUP
+from storage import new_photo_path
+from tracing import TRACES, Trace, chrome_trace
+from validation import Verdict
 
 logger = logging.getLogger("server")
 
+# (cuerpo JSON, código HTTP)
+Reply = Tuple[dict, int]
+
+# ───────── Métricas (/metrics) ─────────
+UPLOADS = REGISTRY.counter("elite_uploads_total", "Fotos guardadas, por ruta de subida", ("route",))
+UPLOAD_BYTES = REGISTRY.counter("elite_upload_bytes_total", "Bytes de fotos guardadas")
+DUPLICATES = REGISTRY.counter("elite_uploads_duplicate_total",
+                              "Subidas descartadas por contenido ya recibido")
+REJECTED = REGISTRY.counter("elite_uploads_rejected_total", "Subidas rechazadas, por motivo",
+                            ("reason",))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "elite_http_request_duration_seconds",
+    "Duración de las peticiones HTTP, incluida la recepción del cuerpo", ("route", "method"))
+QUEUE_DEPTH = REGISTRY.gauge("elite_queue_depth", "Eventos en la cola servidor → manager")
+
 
 class ImageServer:
     """Servidor Flask que recibe imágenes vía POST y notifica al manager."""
 
-    def __init__(self, photo_queue: queue.Queue):
+    def __init__(self, photo_queue: PhotoQueue):
         self._queue = photo_queue
+        self._notify: Optional[Callable[[], None]] = None
         self._cfg = APP_CONFIG
         self._thread: Optional[threading.Thread] = None
+        self._httpd = None
+        self.listening = threading.Event()  # socket abierto y aceptando conexiones
         self._start_time: float = 0.0
         self._received_count: int = 0
+        self._rejected_busy: int = 0
+        self._count_lock = threading.Lock()
+
+        self._resumable = ResumableStore(lambda: self._cfg["upload_folder"])
+        self._sweeper: Optional[threading.Thread] = None
 
         self._app = Flask(__name__)
         self._app.config["MAX_CONTENT_LENGTH"] = self._cfg["max_upload_mb"] * 1024 * 1024
         self._register_routes()
         self._register_error_handlers()
+        self._register_metrics()
 
     # ───────── Rutas Flask ─────────
     def _register_routes(self):
         @self._app.route("/upload", methods=["POST"])
         def upload_image():
-            if "image" not in request.files:
-                logger.warning("Petición sin campo 'image'")
-                return jsonify({"error": "No se encontró el campo 'image' en la petición."}), 400
+            ingestor, early = self._begin_upload(request.content_type,
+                                                 request.headers.get("X-Content-SHA256", ""),
+                                                 request.content_length,
+                                                 request.headers.get("X-Filename", ""))
+            if early is not None:
+                return jsonify(early[0]), early[1], self._reply_headers(early[1])
+            try:
+                ingest_stream(request.stream.read, ingestor, self._chunk_size)
+            except (UploadRejected, ValueError) as e:
+                payload, status = self._ingest_failed(e, ingestor)
+                return jsonify(payload), status
+            payload, status = self._finish_upload(ingestor)
+            return jsonify(payload), status
 
-            file = request.files["image"]
-            if file.filename == "":
-                return jsonify({"error": "No se seleccionó ningún archivo."}), 400
+        @self._app.route("/upload/batch", methods=["POST"])
+        def upload_batch():
+            ingestor, outcomes, early = self._begin_batch(request.content_type,
+                                                          request.content_length)
+            if early is not None:
+                return jsonify(early[0]), early[1], self._reply_headers(early[1])
+            try:
+                ingest_stream(request.stream.read, ingestor, self._chunk_size)
+            except (UploadRejected, ValueError) as e:
+                payload, status = self._ingest_failed(e, ingestor)
+                return jsonify(payload), status
+            payload, status = self._finish_batch(ingestor, outcomes)
+            return jsonify(payload), status
 
-            if not self._allowed_file(file.filename):
+        # ── Subidas reanudables ──
+        @self._app.route("/upload/resumable", methods=["POST"])
+        def resumable_init():
+            data = request.get_json(silent=True) or {}
+            filename = str(data.get("filename", ""))
+            try:
+                size = int(data.get("size", 0))
+            except (TypeError, ValueError):
+                size = 0
+            if not filename:
+                REJECTED.labels("no_file").inc()
+                return jsonify({"error": "No se seleccionó ningún archivo."}), 400
+            if not self._allowed_file(filename):
+                REJECTED.labels("extension").inc()
                 exts = ", ".join(sorted(self._cfg["allowed_extensions"]))
-                logger.warning("Extensión rechazada: %s", file.filename)
+                logger.warning("Extensión rechazada: %s", filename)
                 return jsonify({"error": f"Extensión no permitida. Usa: {exts}"}), 400
+            max_mb = self._cfg["resumable_max_mb"]
+            if size <= 0 or size > max_mb * 1024 * 1024:
+                REJECTED.labels("invalid_size").inc()
+                return jsonify({"error": f"Tamaño inválido (máximo {max_mb} MB)."}), 400
 
-            upload_folder = self._cfg["upload_folder"]
-            os.makedirs(upload_folder, exist_ok=True)
+            upload_id = self._resumable.create(filename, size)
+            return jsonify({
+                "upload_id": upload_id,
+                "offset": 0,
+                "size": size,
+                "chunk_size": self._cfg["resumable_chunk_mb"] * 1024 * 1024,
+                "expires_in": self._cfg["resumable_ttl_s"],
+            }), 201
 
-            extension = secure_filename(file.filename).rsplit(".", 1)[1].lower()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            unique_filename = f"foto_{timestamp}.{extension}"
+        @self._app.route("/upload/resumable/<upload_id>", methods=["GET", "PUT", "DELETE"])
+        def resumable_chunk(upload_id: str):
+            if not self._resumable.valid_id(upload_id):
+                return jsonify({"error": "Subida no encontrada o expirada."}), 404
+            try:
+                if request.method == "GET":
+                    return jsonify(self._resumable.status(upload_id)), 200
+                if request.method == "DELETE":
+                    self._resumable.cancel(upload_id)
+                    return jsonify({"message": "Subida cancelada."}), 200
 
-            filepath = os.path.join(upload_folder, unique_filename)
-            file.save(filepath)
+                offset = request.args.get("offset", request.headers.get("Upload-Offset", ""))
+                if not offset.isdigit():
+                    return jsonify({"error": "Falta el offset del bloque."}), 400
+                new_offset = self._resumable.write_chunk(
+                    upload_id, int(offset), request.stream.read, self._chunk_size)
+            except OffsetMismatch as e:
+                return jsonify({"error": e.message, "offset": e.offset}), e.status
+            except UploadRejected as e:
+                REJECTED.labels(e.reason).inc()
+                return jsonify({"error": e.message}), e.status
+            return jsonify({"upload_id": upload_id, "offset": new_offset}), 200
 
-            file_size_kb = round(os.path.getsize(filepath) / 1024, 1)
-            self._received_count += 1
+        @self._app.route("/upload/resumable/<upload_id>/complete", methods=["POST"])
+        def resumable_complete(upload_id: str):
+            if not self._resumable.valid_id(upload_id):
+                return jsonify({"error": "Subida no encontrada o expirada."}), 404
+            try:
+                info = self._resumable.status(upload_id)
+                os.makedirs(self._cfg["upload_folder"], exist_ok=True)
+                result = self._resumable.complete(upload_id, self._new_filepath(info["filename"]))
+            except OffsetMismatch as e:
+                return jsonify({"error": e.message, "offset": e.offset}), e.status
+            except UploadRejected as e:
+                REJECTED.labels(e.reason).inc()
+                return jsonify({"error": e.message}), e.status
 
-            logger.info("📸 Foto recibida: %s (%.1f KB)", unique_filename, file_size_kb)
+            corrupt = self._reject_corrupt(result)
+            if corrupt is not None:
+                return jsonify(corrupt[0]), corrupt[1]
 
-            # Notificar al manager vía cola
-            self._queue.put(filepath)
+            trace = self._start_trace(result)
+            existing = self._register_upload(result, trace)
+            if existing is not None:
+                return jsonify(self._duplicate_payload(existing, result.sha256)), 200
 
-            return jsonify({
-                "message": "Imagen subida exitosamente.",
-                "filename": unique_filename,
-                "file_size_kb": file_size_kb,
-                "total_received": self._received_count,
-            }), 200
+            total = self._count_received(1)
+            UPLOADS.labels("resumable").inc()
+            UPLOAD_BYTES.inc(result.size)
+            logger.info("📸 Foto recibida (reanudable): %s (%.1f KB)",
+                        os.path.basename(result.filepath), result.size_kb)
+
+            # Mismo camino que /upload
+            payload = self._photo_payload(result, total, trace)
+            if not self._publish([result.filepath], [trace], [result.verdict]):
+                payload["display_skipped"] = True
+
+            return jsonify(payload), 200
 
         @self._app.route("/", methods=["GET"])
         def index():
@@ -86,12 +199,7 @@ class ImageServer:
         @self._app.route("/health", methods=["GET"])
         def health():
             upload_folder = self._cfg["upload_folder"]
-            photo_count = 0
-            if os.path.isdir(upload_folder):
-                photo_count = len([
-                    f for f in os.listdir(upload_folder)
-                    if os.path.isfile(os.path.join(upload_folder, f))
-                ])
+            photo_count = get_catalog().count()
             uptime_secs = round(time.time() - self._start_time) if self._start_time else 0
             return jsonify({
                 "status": "ok",
@@ -99,38 +207,469 @@ class ImageServer:
                 "photos_in_folder": photo_count,
                 "photos_received_session": self._received_count,
                 "upload_folder": upload_folder,
+                "storage_layout": self._cfg["storage_layout"],
                 "max_upload_mb": self._cfg["max_upload_mb"],
                 "port": self._cfg["port"],
+                "queue": self._queue.stats(),
+                "backpressure_mode": self._cfg["backpressure_mode"],
+                "rejected_busy": self._rejected_busy,
+                "free_disk_mb": round((self._free_disk_bytes() or 0) / 1024 / 1024),
             }), 200
 
+        @self._app.route("/metrics", methods=["GET"])
+        def metrics():
+            return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+        @self._app.route("/traces", methods=["GET"])
+        def traces():
+            # Chrome Trace Event JSON: ?id=<trace_id>, ?slowest=N o todas las del anillo
+            trace_id = request.args.get("id")
+            slowest = request.args.get("slowest", "")
+            if trace_id:
+                trace = TRACES.find(trace_id)
+                if trace is None:
+                    return jsonify({"error": "Traza no encontrada (puede haber salido del anillo)."}), 404
+                selected = [trace]
+            elif slowest.isdigit():
+                selected = TRACES.slowest(int(slowest))
+            else:
+                selected = TRACES.recent()
+            return jsonify(chrome_trace(selected)), 200
+
+    # ───────── Lógica de subida (compartida con el motor asyncio) ─────────
+    # Cada ruta multipart se divide en begin (cabeceras), ingesta del cuerpo y
+    # finish (dedup, conteo, cola), para que el cuerpo pueda leerse de forma
+    # síncrona (WSGI) o asíncrona (aioserver). Devuelven (payload, status).
+    # Los motores envían el 100 Continue al empezar a leer el cuerpo, es decir,
+    # sólo si begin no respondió ya.
+    def _begin_upload(self, content_type: Optional[str], announced: str,
+                      length: Optional[int] = None, filename_hint: str = ""
+                      ) -> Tuple[Optional[MultipartIngestor], Optional[Reply]]:
+        boundary = self._multipart_boundary(content_type)
+        if boundary is None:
+            REJECTED.labels("not_multipart").inc()
+            return None, ({"error": "La petición debe ser multipart/form-data."}, 400)
+        refused = self._admit(length, filename_hint)
+        if refused is not None:
+            return None, refused
+
+        # El cliente puede anunciar el hash: si ya lo tenemos, ni se lee el cuerpo
+        announced = announced.lower()
+        if announced and self._cfg["dedup_uploads"]:
+            existing = get_catalog().lookup(announced)
+            if existing is not None:
+                DUPLICATES.inc()
+                logger.info("Duplicado anunciado por hash: %s", existing)
+                return None, (self._duplicate_payload(existing, announced), 200)
+
+        os.makedirs(self._cfg["upload_folder"], exist_ok=True)
+        return MultipartIngestor(boundary, self._open_image_sink, max_files=1), None
+
+    def _finish_upload(self, ingestor: MultipartIngestor) -> Reply:
+        if not ingestor.results:
+            REJECTED.labels("missing_image").inc()
+            logger.warning("Petición sin campo 'image'")
+            return {"error": "No se encontró el campo 'image' en la petición."}, 400
+
+        result = ingestor.results[0]
+        corrupt = self._reject_corrupt(result)
+        if corrupt is not None:
+            return corrupt
+
+        trace = self._start_trace(result)
+        existing = self._register_upload(result, trace)
+        if existing is not None:
+            return self._duplicate_payload(existing, result.sha256), 200
+
+        total = self._count_received(1)
+        UPLOADS.labels("upload").inc()
+        UPLOAD_BYTES.inc(result.size)
+
+        logger.info("📸 Foto recibida: %s (%.1f KB, %.1f MB/s)",
+                    os.path.basename(result.filepath), result.size_kb, result.throughput_mbps)
+
+        # Notificar al manager vía cola
+        payload = self._photo_payload(result, total, trace)
+        if not self._publish([result.filepath], [trace], [result.verdict]):
+            payload["display_skipped"] = True
+
+        return payload, 200
+
+    def _begin_batch(self, content_type: Optional[str], length: Optional[int] = None
+                     ) -> Tuple[Optional[MultipartIngestor], list, Optional[Reply]]:
+        boundary = self._multipart_boundary(content_type)
+        if boundary is None:
+            REJECTED.labels("not_multipart").inc()
+            return None, [], ({"error": "La petición debe ser multipart/form-data."}, 400)
+        refused = self._admit(length)
+        if refused is not None:
+            return None, [], refused
+
+        os.makedirs(self._cfg["upload_folder"], exist_ok=True)
+
+        # Una parte rechazada no aborta el lote: se anota y se ignora
+        outcomes: list = []
+
+        def open_sink(field: str, filename: str) -> Optional[UploadSink]:
+            try:
+                sink = self._open_image_sink(field, filename)
+            except UploadRejected as e:
+                REJECTED.labels(e.reason).inc()
+                outcomes.append({"original_name": filename, "error": e.message})
+                return None
+            if sink is not None:
+                outcomes.append(sink)
+            return sink
+
+        return MultipartIngestor(boundary, open_sink), outcomes, None
+
+    def _finish_batch(self, ingestor: MultipartIngestor, outcomes: list) -> Reply:
+        if not outcomes:
+            REJECTED.labels("missing_image").inc()
+            return {"error": "No se encontró el campo 'image' en la petición."}, 400
+
+        by_path = {r.filepath: r for r in ingestor.results}
+        files = []
+        saved = []
+        traces = []
+        for outcome in outcomes:
+            if isinstance(outcome, dict):
+                files.append(outcome)
+                continue
+            result = by_path[outcome.filepath]
+            corrupt = self._reject_corrupt(result)
+            if corrupt is not None:
+                files.append({"original_name": result.original_name, **corrupt[0]})
+                continue
+            trace = self._start_trace(result)
+            existing = self._register_upload(result, trace)
+            if existing is not None:
+                files.append(self._duplicate_payload(existing, result.sha256))
+                continue
+            saved.append(result)
+            traces.append(trace)
+            files.append(self._photo_payload(result, self._count_received(1), trace))
+            UPLOADS.labels("batch").inc()
+            UPLOAD_BYTES.inc(result.size)
+
+        total_kb = sum(r.size_kb for r in saved)
+        duplicates = sum(1 for f in files if f.get("duplicate"))
+        logger.info("📸 Lote recibido: %d fotos (%.1f KB), %d duplicadas, %d rechazadas",
+                    len(saved), total_kb, duplicates, len(files) - len(saved) - duplicates)
+
+        # El lote entero viaja como un solo elemento de la cola
+        payload = {
+            "message": f"{len(saved)} de {len(files)} imágenes subidas exitosamente.",
+            "files": files,
+            "total_received": self._received_count,
+        }
+        if saved and not self._publish([r.filepath for r in saved], traces,
+                                       [r.verdict for r in saved]):
+            payload["display_skipped"] = True
+
+        return payload, 200 if saved or duplicates else 400
+
+    def _admit(self, length: Optional[int], filename_hint: str = "") -> Optional[Reply]:
+        """
+        Admisión sólo con las cabeceras, antes de recibir el cuerpo: nombre
+        anunciado (X-Filename), Content-Length, espacio libre en el disco de
+        destino y presión de la cola.
+        """
+        if filename_hint and not self._allowed_file(filename_hint):
+            REJECTED.labels("extension").inc()
+            exts = ", ".join(sorted(self._cfg["allowed_extensions"]))
+            logger.warning("Extensión rechazada (cabeceras): %s", filename_hint)
+            return {"error": f"Extensión no permitida. Usa: {exts}"}, 400
+        if length is not None and length > self._app.config["MAX_CONTENT_LENGTH"]:
+            return self._too_large_payload(), 413
+        free = self._free_disk_bytes()
+        reserve = self._cfg["min_free_disk_mb"] * 1024 * 1024
+        if free is not None and free - (length or 0) < reserve:
+            REJECTED.labels("disk_full").inc()
+            logger.warning("Disco casi lleno (%.0f MB libres): subida rechazada", free / 1024 / 1024)
+            return {"error": "El disco del receptor está lleno."}, 507
+        return self._check_backpressure()
+
+    def _free_disk_bytes(self) -> Optional[int]:
+        """Bytes libres en el volumen de la carpeta de destino (None si no se puede saber)."""
+        folder = self._cfg["upload_folder"]
+        # La carpeta puede no existir todavía: vale cualquier ancestro del mismo volumen
+        while not os.path.isdir(folder):
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return None
+            folder = parent
+        try:
+            return shutil.disk_usage(folder).free
+        except OSError:
+            return None
+
+    def _check_backpressure(self) -> Optional[Reply]:
+        """503 si la cola pasó la marca de presión y el modo es "reject"."""
+        if self._cfg["backpressure_mode"] != "reject" or not self._queue.under_pressure:
+            return None
+        with self._count_lock:
+            self._rejected_busy += 1
+        REJECTED.labels("busy").inc()
+        retry_after = self._cfg["backpressure_retry_after_s"]
+        logger.warning("Cola saturada (%d en espera): subida rechazada, reintentar en %d s",
+                       self._queue.qsize(), retry_after)
+        return {
+            "error": "El receptor está ocupado. Reintenta en unos segundos.",
+            "retry_after": retry_after,
+        }, 503
+
+    def _reply_headers(self, status: int) -> List[Tuple[str, str]]:
+        if status == 503:
+            return [("Retry-After", str(self._cfg["backpressure_retry_after_s"]))]
+        return []
+
+    @staticmethod
+    def _reject_corrupt(result: IngestResult) -> Optional[Reply]:
+        """
+        422 si la validación estructural falló: se borra el archivo y el teléfono
+        puede reintentar en el acto, antes de que la GUI intente decodificarlo.
+        """
+        verdict = result.verdict
+        if verdict is None or verdict.ok:
+            return None
+        try:
+            os.remove(result.filepath)
+        except OSError:
+            pass
+        REJECTED.labels("corrupt").inc()
+        logger.warning("Imagen dañada rechazada: %s (%s)",
+                       result.original_name or os.path.basename(result.filepath), verdict.reason)
+        return {
+            "error": f"La imagen llegó dañada o incompleta: {verdict.reason}. Vuelve a enviarla.",
+            "corrupt": True,
+        }, 422
+
+    @staticmethod
+    def _ingest_failed(e: Exception, ingestor: MultipartIngestor) -> Reply:
+        """
+        Respuesta para un cuerpo rechazado o mal formado durante la ingesta. Las
+        partes que ya se completaron también se borran: sin catalogar ni encolar,
+        quedarían huérfanas y el reintento del cliente parecería un duplicado.
+        """
+        ingestor.discard()
+        if isinstance(e, UploadRejected):
+            REJECTED.labels(e.reason).inc()
+            return {"error": e.message}, e.status
+        REJECTED.labels("invalid_multipart").inc()
+        logger.warning("Cuerpo multipart inválido: %s", e)
+        return {"error": "Cuerpo multipart inválido."}, 400
+
+    def _too_large_payload(self) -> dict:
+        REJECTED.labels("too_large").inc()
+        max_mb = self._cfg["max_upload_mb"]
+        logger.warning("Archivo rechazado: excede el límite de %d MB", max_mb)
+        return {"error": f"El archivo excede el límite de {max_mb} MB."}
+
     # ───────── Error handlers ─────────
     def _register_error_handlers(self):
         @self._app.errorhandler(413)
         def file_too_large(e):
-            max_mb = self._cfg["max_upload_mb"]
-            logger.warning("Archivo rechazado: excede el límite de %d MB", max_mb)
-            return jsonify({
-                "error": f"El archivo excede el límite de {max_mb} MB.",
-            }), 413
+            return jsonify(self._too_large_payload()), 413
+
+    def _register_metrics(self):
+        QUEUE_DEPTH.set_function(self._queue.qsize)
+
+        @self._app.before_request
+        def start_timer():
+            g.started = time.perf_counter()
+
+        @self._app.after_request
+        def observe_duration(response):
+            started = g.get("started")
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule is not None else "otra"
+                REQUEST_SECONDS.labels(route, request.method).observe(time.perf_counter() - started)
+            return response
 
     # ───────── Helpers ─────────
+    def set_notifier(self, notify: Optional[Callable[[], None]]):
+        """
+        Registra la función que despierta al consumidor tras cada put() en la cola.
+        Se llama desde los hilos del servidor: debe ser segura entre hilos y no bloquear.
+        """
+        self._notify = notify
+
+    def _publish(self, paths: List[str], traces: Optional[List[Optional[Trace]]] = None,
+                 verdicts: Optional[List[Optional[Verdict]]] = None) -> bool:
+        """
+        Entrega las fotos (ya guardadas) al manager sin bloquear nunca.
+        False si no se mostrarán: modo "save_only" bajo presión o cola llena.
+        """
+        if self._cfg["backpressure_mode"] == "save_only" and self._queue.under_pressure:
+            logger.info("Cola saturada: %d foto(s) guardadas sin mostrar", len(paths))
+            return False
+        if not self._queue.offer(PhotoEvent(paths, traces=traces or [], verdicts=verdicts or [])):
+            logger.warning("Cola llena (%d): %d foto(s) guardadas sin mostrar",
+                           self._queue.maxsize, len(paths))
+            return False
+        notify = self._notify
+        if notify is not None:
+            notify()
+        return True
+
     def _allowed_file(self, filename: str) -> bool:
         return "." in filename and filename.rsplit(".", 1)[1].lower() in self._cfg["allowed_extensions"]
 
+    def _count_received(self, n: int) -> int:
+        """Suma n fotos al contador de sesión (seguro entre hilos) y devuelve el total."""
+        with self._count_lock:
+            self._received_count += n
+            return self._received_count
+
+    def _photo_payload(self, result: IngestResult, total_received: int,
+                       trace: Optional[Trace] = None) -> dict:
+        """Respuesta JSON estándar para una foto guardada."""
+        payload = {
+            "message": "Imagen subida exitosamente.",
+            "filename": self._stored_name(result.filepath),
+            "file_size_kb": result.size_kb,
+            "sha256": result.sha256,
+            "throughput_mbps": result.throughput_mbps,
+            "total_received": total_received,
+        }
+        if trace is not None:
+            payload["trace_id"] = trace.trace_id
+        return payload
+
+    def _stored_name(self, filepath: str) -> str:
+        """Nombre relativo a la carpeta (AAAA/MM/DD/… con la disposición por fecha)."""
+        return os.path.relpath(filepath, self._cfg["upload_folder"]).replace(os.sep, "/")
+
+    def _duplicate_payload(self, existing: str, digest: str) -> dict:
+        """Respuesta para una foto cuyo contenido ya estaba guardado."""
+        return {
+            "message": "La imagen ya existe; no se guardó de nuevo.",
+            "duplicate": True,
+            "filename": existing.replace(os.sep, "/"),
+            "sha256": digest,
+            "total_received": self._received_count,
+        }
+
+    # ───────── Trazas ─────────
+    @staticmethod
+    def _start_trace(result: IngestResult) -> Optional[Trace]:
+        """Abre la traza de una foto recién escrita con su tramo de recepción (red + disco)."""
+        trace = TRACES.start(os.path.basename(result.filepath))
+        if trace is not None:
+            end = time.perf_counter()
+            trace.span("recepción", "servidor", end - result.duration_s, end,
+                       bytes=result.size, mbps=result.throughput_mbps)
+        return trace
+
+    # ───────── Catálogo y deduplicación ─────────
+    def _register_upload(self, result: IngestResult, trace: Optional[Trace] = None
+                         ) -> Optional[str]:
+        """
+        Registra una foto recién guardada en el catálogo. Si su contenido ya
+        existía, borra la copia nueva y devuelve el nombre del archivo original.
+        """
+        started = time.perf_counter()
+        existing = self._claim(result)
+        if trace is not None:
+            trace.span("catálogo", "servidor", started, duplicate=existing is not None)
+        return existing
+
+    def _claim(self, result: IngestResult) -> Optional[str]:
+        catalog = get_catalog()
+        if not self._cfg["dedup_uploads"]:
+            catalog.add(result.filepath, result.sha256)
+            return None
+        existing = catalog.claim(result.sha256, result.filepath)
+        if existing is None:
+            return None
+        DUPLICATES.inc()
+        try:
+            os.remove(result.filepath)
+        except OSError as e:
+            logger.warning("No se pudo borrar el duplicado %s: %s", result.filepath, e)
+        logger.info("Duplicado descartado: %s = %s",
+                    result.original_name or os.path.basename(result.filepath), existing)
+        return existing
+
+    @property
+    def _chunk_size(self) -> int:
+        return self._cfg["ingest_chunk_kb"] * 1024
+
+    @staticmethod
+    def _multipart_boundary(content_type: Optional[str]) -> Optional[bytes]:
+        """Boundary del cuerpo multipart, o None si la petición no es multipart."""
+        mimetype, params = parse_options_header(content_type or "")
+        if mimetype != "multipart/form-data":
+            return None
+        boundary = params.get("boundary")
+        return boundary.encode("latin-1") if boundary else None
+
+    def _new_filepath(self, original_name: str) -> str:
+        """Genera la ruta final única para una foto según su extensión."""
+        # La extensión ya fue validada por _allowed_file
+        extension = original_name.rsplit(".", 1)[1].lower()
+        return new_photo_path(self._cfg["upload_folder"], extension)
+
+    def _open_image_sink(self, field: str, filename: str) -> Optional[UploadSink]:
+        """Valida la parte 'image' y abre su archivo destino; ignora otros campos."""
+        if field != "image":
+            return None
+        if not filename:
+            raise UploadRejected("No se seleccionó ningún archivo.", reason="no_file")
+        if not self._allowed_file(filename):
+            exts = ", ".join(sorted(self._cfg["allowed_extensions"]))
+            logger.warning("Extensión rechazada: %s", filename)
+            raise UploadRejected(f"Extensión no permitida. Usa: {exts}", reason="extension")
+        return UploadSink(self._new_filepath(filename), field, filename)
+
     # ───────── Ciclo de vida ─────────
     def start(self):
-        """Inicia el servidor Flask en un hilo daemon."""
+        """Inicia el servidor HTTP en un hilo daemon."""
         self._start_time = time.time()
+        get_catalog()  # reconciliación con el disco en segundo plano
 
-        self._thread = threading.Thread(
-            target=self._app.run,
-            kwargs={
-                "host": self._cfg["host"],
-                "port": self._cfg["port"],
-                "debug": False,
-                "use_reloader": False,
-            },
-            daemon=True,
-        )
+        self._thread = threading.Thread(target=self._serve, name="http-server", daemon=True)
         self._thread.start()
-        logger.info("Servidor Flask iniciado en puerto %d", self._cfg["port"])
+
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="resumable-sweeper", daemon=True)
+        self._sweeper.start()
+
+        logger.info("Servidor Flask iniciado en puerto %d (motor: %s)",
+                    self._cfg["port"], self._cfg["server_engine"])
+
+    def _serve(self):
+        self._httpd = make_engine(self._app, self._cfg)
+        self.listening.set()
+        STARTUP.mark(SERVER_LISTENING)
+        self._httpd.serve_forever()
+
+    def _sweep_loop(self):
+        """Elimina periódicamente las subidas reanudables abandonadas."""
+        while True:
+            try:
+                self._resumable.sweep(self._cfg["resumable_ttl_s"])
+            except Exception as e:
+                logger.warning("Barrido de subidas reanudables falló: %s", e)
+            time.sleep(self._cfg["resumable_sweep_s"])
+
+    def stop(self, drain: bool = False):
+        """
+        Detiene el servidor HTTP y libera el puerto. Las peticiones en curso
+        terminan en su hilo; con drain=True se espera a que terminen (motor "pool").
+        """
+        httpd, self._httpd = self._httpd, None
+        if httpd is None:
+            return
+        httpd.shutdown()
+        if drain:
+            httpd.block_on_close = True
+        httpd.server_close()
+
+
+def create_image_server(photo_queue: PhotoQueue) -> ImageServer:
+    """ImageServer del motor configurado; "asyncio" vive en aioserver.py (import diferido)."""
+    if APP_CONFIG["server_engine"] == "asyncio":
+        from aioserver import AsyncImageServer
+        return AsyncImageServer(photo_queue)
+    return ImageServer(photo_queue)
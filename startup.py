@@ -0,0 +1,209 @@
+"""
+The Elite Flower — Medición del arranque por fases.
+Importar este módulo lo antes posible (main.py) fija el instante cero.
+Las fases pueden medirse desde cualquier hilo; finish() registra el resumen.
+
+Con --profile-startup además se mide el tiempo de importación de cada módulo
+(propio y acumulado, como `python -X importtime`, pero también en el .exe de
+PyInstaller), se escribe el resultado en JSON si se pide y la app se cierra
+en cuanto termina el arranque.
+"""
+
+import importlib.abc
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("startup")
+
+# Hito que marca la ventana en pantalla (o el servidor listo, en headless)
+FIRST_WINDOW = "ventana visible"
+SERVER_LISTENING = "servidor escuchando"
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Envuelve el loader real para cronometrar exec_module()."""
+
+    def __init__(self, loader, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        # get_data, is_package, get_resource_reader… van al loader real
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler.timing(module.__name__):
+            self._loader.exec_module(module)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Finder de sys.meta_path que mide cuánto tarda cada import."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # módulo → (tiempo propio, tiempo acumulado) en segundos
+        self.records: Dict[str, Tuple[float, float]] = {}
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @contextmanager
+    def timing(self, name: str) -> Iterator[None]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        start = time.perf_counter()
+        stack.append(0.0)  # tiempo acumulado de los imports anidados
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.records[name] = (elapsed - children, elapsed)
+
+    def top(self, n: int) -> List[Tuple[str, float, float]]:
+        """Los n módulos con más tiempo propio: (nombre, propio, acumulado)."""
+        with self._lock:
+            items = [(name, own, cum) for name, (own, cum) in self.records.items()]
+        return sorted(items, key=lambda item: item[1], reverse=True)[:n]
+
+
+class StartupTimer:
+    """Hitos (instantes) y fases (intervalos) relativos al inicio del proceso."""
+
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        # (nombre, inicio, fin) en segundos desde t0; en los hitos inicio == fin
+        self.entries: List[Tuple[str, float, float]] = []
+        self.imports: Optional[ImportProfiler] = None
+        self.output: Optional[str] = None
+        self._finished = False
+
+    @property
+    def profiling(self) -> bool:
+        """True con --profile-startup: la app se cierra al terminar el arranque."""
+        return self.imports is not None
+
+    def enable_profiling(self, output: Optional[str] = None):
+        self.imports = ImportProfiler()
+        self.imports.install()
+        self.output = output
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def mark(self, name: str):
+        """Registra un hito (p. ej. «ventana visible»)."""
+        now = self.elapsed()
+        self._add(name, now, now)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mide la duración del bloque `with`."""
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            self._add(name, start, self.elapsed())
+
+    def milestone(self, name: str) -> Optional[float]:
+        """Milisegundos hasta el primer hito o fase con ese nombre."""
+        with self._lock:
+            for entry_name, _, end in self.entries:
+                if entry_name == name:
+                    return end * 1000
+        return None
+
+    def finish(self):
+        """Registra el resumen (una sola vez) y escribe el JSON de --profile-output."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        self.report()
+        if self.imports is not None:
+            self.imports.uninstall()
+            self._report_imports()
+        if self.output:
+            try:
+                with open(self.output, "w", encoding="utf-8") as f:
+                    json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+                logger.info("Perfil de arranque guardado en %s", self.output)
+            except OSError as e:
+                logger.warning("No se pudo guardar el perfil de arranque: %s", e)
+
+    def report(self):
+        with self._lock:
+            entries = sorted(self.entries, key=lambda e: e[2])
+        logger.info("Arranque (ms desde el inicio del proceso):")
+        for name, start, end in entries:
+            if end > start:
+                logger.info("  %-26s %8.1f  (%.1f ms)", name, end * 1000, (end - start) * 1000)
+            else:
+                logger.info("  %-26s %8.1f", name, end * 1000)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            entries = list(self.entries)
+        result = {
+            "time_to_first_window_ms": self.milestone(FIRST_WINDOW),
+            "time_to_listening_ms": self.milestone(SERVER_LISTENING),
+            "entries": [
+                {"name": name, "start_ms": start * 1000, "end_ms": end * 1000}
+                for name, start, end in entries
+            ],
+        }
+        if self.imports is not None:
+            records = self.imports.top(len(self.imports.records))
+            result["imports_total_ms"] = sum(own for _, own, _ in records) * 1000
+            result["imports"] = [
+                {"module": name, "self_ms": own * 1000, "cumulative_ms": cum * 1000}
+                for name, own, cum in records
+            ]
+        return result
+
+    def _report_imports(self, n: int = 15):
+        total = sum(own for own, _ in self.imports.records.values())
+        logger.info("Imports: %d módulos, %.1f ms en total. Más lentos (propio / acumulado):",
+                    len(self.imports.records), total * 1000)
+        for name, own, cum in self.imports.top(n):
+            logger.info("  %-32s %7.1f  %7.1f", name, own * 1000, cum * 1000)
+
+    def _add(self, name: str, start: float, end: float):
+        with self._lock:
+            self.entries.append((name, start, end))
+        logger.debug("Arranque · %s: %.1f ms", name, end * 1000)
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,195 @@
+"""
+The Elite Flower — Organización de las fotos en disco.
+Con storage_layout "flat" todas las fotos van a la raíz de la carpeta de destino;
+con "date" se reparten en subcarpetas AAAA/MM/DD según el día de recepción, para
+que ni los listados ni las copias de seguridad tengan que recorrer cientos de
+miles de entradas en un solo directorio.
+
+Las dos disposiciones pueden convivir en la misma carpeta: los listados recorren
+la raíz y las subcarpetas de fecha. migrate_flat() re-organiza una carpeta plana
+en caliente, con la app funcionando:
+
+    python main.py --migrate-storage
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+from config import APP_CONFIG, save_settings
+
+logger = logging.getLogger("storage")
+
+LAYOUTS = ("flat", "date")
+
+_YEAR = re.compile(r"\d{4}")
+_MONTH_DAY = re.compile(r"\d{2}")
+# foto_AAAAMMDD_HHMMSS_ffffff[_n].ext (nombre generado por new_photo_path)
+_STAMPED = re.compile(r"foto_(\d{4})(\d{2})(\d{2})_")
+
+# Último nombre emitido en este proceso: dos subidas en el mismo microsegundo
+# (o con un reloj de poca resolución, como el de Windows) reciben sufijos _1, _2…
+_name_lock = threading.Lock()
+_last_stem = ""
+_last_seq = 0
+
+
+def is_photo_name(name: str) -> bool:
+    """True si el nombre tiene una extensión de imagen permitida."""
+    return "." in name and name.rsplit(".", 1)[1].lower() in APP_CONFIG["allowed_extensions"]
+
+
+def shard_dir(folder: str, when: datetime) -> str:
+    """Subcarpeta AAAA/MM/DD de `when` (o la raíz con la disposición plana)."""
+    if APP_CONFIG["storage_layout"] != "date":
+        return folder
+    return os.path.join(folder, f"{when:%Y}", f"{when:%m}", f"{when:%d}")
+
+
+def new_photo_path(folder: str, extension: str, now: Optional[datetime] = None) -> str:
+    """
+    Ruta nueva y única para una foto recibida ahora. UploadSink abre el archivo
+    en modo exclusivo ("xb"), así que otro proceso nunca se sobrescribe.
+    """
+    global _last_stem, _last_seq
+    now = now or datetime.now()
+    directory = shard_dir(folder, now)
+    if directory != folder:
+        os.makedirs(directory, exist_ok=True)
+    stem = f"foto_{now:%Y%m%d_%H%M%S_%f}"
+    with _name_lock:
+        seq = _last_seq + 1 if stem == _last_stem else 0
+        while True:
+            name = f"{stem}_{seq}" if seq else stem
+            # Tras un reinicio el contador se pierde: el disco tiene la última palabra
+            if not os.path.exists(os.path.join(directory, f"{name}.{extension}")):
+                break
+            seq += 1
+        _last_stem, _last_seq = stem, seq
+    return os.path.join(directory, f"{name}.{extension}")
+
+
+def iter_photos(folder: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    (nombre relativo a `folder`, DirEntry) de cada foto, en la raíz y en las
+    subcarpetas AAAA/MM/DD. Otras subcarpetas (.elite, las del usuario) se ignoran.
+    """
+    if not os.path.isdir(folder):
+        return
+    for entry in os.scandir(folder):
+        try:
+            if _YEAR.fullmatch(entry.name) and entry.is_dir(follow_symlinks=False):
+                yield from _iter_shards(entry.path, entry.name, depth=2)
+            elif is_photo_name(entry.name) and entry.is_file():
+                yield entry.name, entry
+        except OSError:
+            continue
+
+
+def _iter_shards(path: str, prefix: str, depth: int) -> Iterator[Tuple[str, os.DirEntry]]:
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return
+    for entry in entries:
+        name = os.path.join(prefix, entry.name)
+        try:
+            if depth and _MONTH_DAY.fullmatch(entry.name) and entry.is_dir(follow_symlinks=False):
+                yield from _iter_shards(entry.path, name, depth - 1)
+            elif not depth and is_photo_name(entry.name) and entry.is_file():
+                yield name, entry
+        except OSError:
+            continue
+
+
+def is_stored_photo(filepath: str, folder: str) -> bool:
+    """True si `filepath` está en la raíz de `folder` o en una de sus subcarpetas de fecha."""
+    rel = os.path.relpath(os.path.abspath(filepath), os.path.abspath(folder))
+    parts = rel.split(os.sep)
+    if len(parts) == 1:
+        return parts[0] not in (os.curdir, os.pardir)
+    return (len(parts) == 4 and bool(_YEAR.fullmatch(parts[0]))
+            and all(_MONTH_DAY.fullmatch(p) for p in parts[1:3]))
+
+
+def photo_date(name: str, mtime: float) -> datetime:
+    """Día de recepción: el del nombre foto_AAAAMMDD_… o, si no lo tiene, el mtime."""
+    match = _STAMPED.match(name)
+    if match:
+        try:
+            return datetime(*(int(g) for g in match.groups()))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(mtime)
+
+
+# ──────────────────────────────────────────────
+# Migración de una carpeta plana
+# ──────────────────────────────────────────────
+def migrate_flat(folder: str, catalog=None, min_age_s: float = 60) -> dict:
+    """
+    Mueve las fotos de la raíz de `folder` a su subcarpeta AAAA/MM/DD.
+    Cada foto se mueve con un rename atómico (misma carpeta, mismo disco) dentro de
+    la transacción que la renombra en el catálogo (PhotoCatalog.rename), así que
+    puede ejecutarse con el servidor activo.
+    Las fotos modificadas hace menos de `min_age_s` se dejan: pueden estar
+    escribiéndose todavía; una segunda pasada las recoge.
+    """
+    moved = skipped = failed = 0
+    if not os.path.isdir(folder):
+        return {"moved": moved, "skipped": skipped, "failed": failed}
+    cutoff = time.time() - min_age_s
+    for entry in list(os.scandir(folder)):
+        try:
+            if not is_photo_name(entry.name) or not entry.is_file():
+                continue
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        if mtime > cutoff:
+            skipped += 1
+            continue
+        when = photo_date(entry.name, mtime)
+        directory = os.path.join(folder, f"{when:%Y}", f"{when:%m}", f"{when:%d}")
+        target = os.path.join(directory, entry.name)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if os.path.exists(target):
+                logger.warning("Ya existe %s: se deja %s en la raíz", target, entry.name)
+                skipped += 1
+                continue
+            if catalog is not None:
+                catalog.rename(entry.name, os.path.relpath(target, folder))
+            else:
+                os.rename(entry.path, target)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("No se pudo mover %s: %s", entry.name, e)
+            failed += 1
+            continue
+        moved += 1
+        if moved % 1000 == 0:
+            logger.info("Migración: %d fotos movidas", moved)
+    logger.info("Migración de %s: %d movidas, %d pendientes, %d con error",
+                folder, moved, skipped, failed)
+    return {"moved": moved, "skipped": skipped, "failed": failed}
+
+
+def migrate_storage() -> dict:
+    """
+    python main.py --migrate-storage: activa la disposición por fecha (se guarda
+    en settings.json) y re-organiza la carpeta actual.
+    """
+    from catalog import PhotoCatalog  # diferido: catalog importa este módulo
+
+    folder = APP_CONFIG["upload_folder"]
+    if APP_CONFIG["storage_layout"] != "date":
+        APP_CONFIG["storage_layout"] = "date"
+        save_settings()
+        logger.info("Disposición por fecha activada; una app ya abierta la usará al reiniciarse "
+                    "(lo que guarde mientras tanto se recoge repitiendo la migración)")
+    return migrate_flat(folder, PhotoCatalog(folder))
@@ -0,0 +1,189 @@
+"""
+The Elite Flower — Caché persistente de miniaturas.
+Guarda en disco las miniaturas RGBA ya terminadas (fondo + bordes redondeados)
+para no decodificar los originales en cada arranque ni en cada render del historial.
+
+Ubicación: <carpeta>/.elite/thumbs/<clave>.png
+Clave: ruta absoluta + mtime + tamaño del original + tamaño de miniatura.
+Presupuesto en bytes con expulsión LRU; el orden LRU persiste vía mtime del archivo.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from config import APP_CONFIG, THEME, meta_dir
+from imaging import open_thumbnail
+
+logger = logging.getLogger("thumbcache")
+
+THUMBS_DIRNAME = "thumbs"
+
+
+@lru_cache(maxsize=8)
+def rounded_mask(size: Tuple[int, int], radius: int) -> Image.Image:
+    """Máscara de bordes redondeados (se calcula una vez por tamaño)."""
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle([0, 0, *size], radius=radius, fill=255)
+    return mask
+
+
+def render_thumbnail(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """
+    Miniatura centrada sobre fondo oscuro con bordes redondeados (RGBA).
+    `img` debería venir ya reducida por imaging.open_thumbnail().
+    """
+    thumb = img.copy()
+    thumb.thumbnail(size, Image.LANCZOS)
+
+    bg = Image.new("RGB", size, THEME["thumb_bg_rgb"])
+    offset_x = (size[0] - thumb.size[0]) // 2
+    offset_y = (size[1] - thumb.size[1]) // 2
+    bg.paste(thumb, (offset_x, offset_y))
+    bg.putalpha(rounded_mask(size, THEME["radius_thumbnail"]))
+    return bg
+
+
+class ThumbnailCache:
+    """Caché en disco de miniaturas con presupuesto en bytes y expulsión LRU."""
+
+    def __init__(self, directory: str, budget_bytes: int):
+        self.directory = directory
+        self.budget = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # clave → bytes en disco, del menos al más recientemente usado
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._load_index()
+
+    # ───────── API ─────────
+    def get_or_create(self, filepath: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+        """Miniatura de `filepath`, desde la caché o generándola. None si no se puede abrir."""
+        key = self._key(filepath, size)
+        if key is None:
+            return None
+        thumb = self._get(key)
+        if thumb is not None:
+            return thumb
+
+        try:
+            thumb = render_thumbnail(open_thumbnail(filepath, size), size)
+        except Exception:
+            return None
+        self._put(key, thumb)
+        return thumb
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "budget_bytes": self.budget,
+            }
+
+    # ───────── Internos ─────────
+    def _key(self, filepath: str, size: Tuple[int, int]) -> Optional[str]:
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(filepath)}|{st.st_mtime_ns}|{st.st_size}|{size[0]}x{size[1]}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _get(self, key: str) -> Optional[Image.Image]:
+        with self._lock:
+            known = key in self._entries
+            if known:
+                self._entries.move_to_end(key)
+        if not known:
+            with self._lock:
+                self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with Image.open(path) as cached:
+                thumb = cached.copy()
+            os.utime(path)  # conserva el orden LRU entre arranques
+        except Exception:
+            self._drop(key)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return thumb
+
+    def _put(self, key: str, thumb: Image.Image):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            thumb.save(tmp, "PNG")
+            os.replace(tmp, path)
+            nbytes = os.path.getsize(path)
+        except OSError as e:
+            logger.debug("No se pudo guardar la miniatura en caché: %s", e)
+            return
+        with self._lock:
+            self._total += nbytes - self._entries.pop(key, 0)
+            self._entries[key] = nbytes
+            victims = []
+            while self._total > self.budget and len(self._entries) > 1:
+                old_key, old_bytes = self._entries.popitem(last=False)
+                self._total -= old_bytes
+                victims.append(old_key)
+        for old_key in victims:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _drop(self, key: str):
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+
+    def _load_index(self):
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".png"):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            found.append((st.st_mtime_ns, entry.name[:-4], st.st_size))
+        for _, key, nbytes in sorted(found):
+            self._entries[key] = nbytes
+            self._total += nbytes
+
+
+# ──────────────────────────────────────────────
+# Caché compartida de la carpeta actual
+# ──────────────────────────────────────────────
+_current: Optional[ThumbnailCache] = None
+_current_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Caché de miniaturas de APP_CONFIG["upload_folder"] (se recrea si la carpeta cambia)."""
+    global _current
+    directory = os.path.join(meta_dir(), THUMBS_DIRNAME)
+    with _current_lock:
+        if _current is None or _current.directory != directory:
+            _current = ThumbnailCache(directory, APP_CONFIG["thumb_cache_mb"] * 1024 * 1024)
+        return _current
@@ -0,0 +1,118 @@
+"""
+The Elite Flower — Trazas por foto de extremo a extremo.
+Cada foto recibida lleva un Trace con tramos (spans) de cada etapa:
+recepción y catálogo en el servidor, espera en la cola, procesadores,
+decodificación y pintado en la GUI. Las últimas `trace_buffer` trazas se
+guardan en memoria y se exportan en formato Chrome Trace Event
+(chrome://tracing, https://ui.perfetto.dev):
+
+    curl http://<ip>:5000/traces -o trazas.json              # todas
+    curl "http://<ip>:5000/traces?id=<trace_id>" -o foto.json  # una (trace_id de la respuesta)
+    curl "http://<ip>:5000/traces?slowest=10" -o lentas.json
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import APP_CONFIG
+
+# Origen común de las marcas de tiempo (time.perf_counter, como PhotoEvent.saved_at)
+_EPOCH = time.perf_counter()
+
+
+class Trace:
+    """Línea de tiempo de una foto. Los tramos pueden añadirse desde cualquier hilo."""
+
+    __slots__ = ("trace_id", "name", "started", "spans")
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started = time.perf_counter()
+        # (nombre, categoría, inicio, fin, hilo, args); inicio == fin en los instantes
+        self.spans: List[Tuple[str, str, float, float, str, dict]] = []
+
+    def span(self, name: str, category: str, start: float, end: Optional[float] = None,
+             **args):
+        """Registra un tramo ya medido (instantes de time.perf_counter)."""
+        if end is None:
+            end = time.perf_counter()
+        self.spans.append((name, category, start, end, threading.current_thread().name, args))
+
+    def instant(self, name: str, category: str, **args):
+        now = time.perf_counter()
+        self.span(name, category, now, now, **args)
+
+    @property
+    def duration(self) -> float:
+        """Segundos desde el primer tramo hasta el último terminado."""
+        spans = list(self.spans)
+        if not spans:
+            return 0.0
+        return max(s[3] for s in spans) - min(s[2] for s in spans)
+
+
+class TraceBuffer:
+    """Anillo con las últimas `capacity` trazas (capacity=0 desactiva el trazado)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._traces: Deque[Trace] = deque(maxlen=capacity or 1)
+        self._lock = threading.Lock()
+
+    def start(self, name: str) -> Optional[Trace]:
+        if not self.capacity:
+            return None
+        trace = Trace(name)
+        with self._lock:
+            self._traces.append(trace)
+        return trace
+
+    def find(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+    def recent(self) -> List[Trace]:
+        with self._lock:
+            return list(self._traces)
+
+    def slowest(self, n: int) -> List[Trace]:
+        return sorted(self.recent(), key=lambda t: t.duration, reverse=True)[:n]
+
+
+def chrome_trace(traces: Iterable[Trace]) -> dict:
+    """
+    Formato Chrome Trace Event: cada foto es un «proceso» con su nombre y
+    cada hilo que la tocó (http, decode, Tk…) una fila.
+    """
+    events: List[dict] = []
+    tids: Dict[str, int] = {}
+    for pid, trace in enumerate(traces, start=1):
+        events.append({"name": "process_name", "ph": "M", "pid": pid,
+                       "args": {"name": f"{trace.name} · {trace.trace_id}"}})
+        events.append({"name": "process_sort_index", "ph": "M", "pid": pid,
+                       "args": {"sort_index": pid}})
+        named = set()
+        for name, category, start, end, thread, args in list(trace.spans):
+            tid = tids.setdefault(thread, len(tids) + 1)
+            if tid not in named:
+                named.add(tid)
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                               "args": {"name": thread}})
+            event = {"name": name, "cat": category, "pid": pid, "tid": tid,
+                     "ts": round((start - _EPOCH) * 1e6, 1), "args": args}
+            if end > start:
+                event.update(ph="X", dur=round((end - start) * 1e6, 1))
+            else:
+                event.update(ph="i", s="p")
+            events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+TRACES = TraceBuffer(APP_CONFIG["trace_buffer"])
@@ -5,18 +5,23 @@ Compone Sidebar + ImageViewer + HistoryBar.
 
 import logging
 import os
-from tkinter import messagebox
+import queue
+import threading
 from typing import TYPE_CHECKING
 
 import customtkinter as ctk
-from PIL import Image, ImageTk
 
+from catalog import get_catalog, newest_on_disk
 from config import APP_CONFIG, THEME, get_local_ip, get_icon_path
+from pyramid import ImagePyramid
+from startup import FIRST_WINDOW, STARTUP
+from ui.dispatch import DisplayScheduler
 from ui.sidebar import Sidebar
 from ui.viewer import ImageViewer, HistoryBar
 
 if TYPE_CHECKING:
     from manager import AppManager
+    from pipeline import PreparedPhoto
 
 logger = logging.getLogger("ui")
 
@@ -24,6 +29,8 @@ logger = logging.getLogger("ui")
 class AppInterface(ctk.CTk):
     """Ventana principal que ensambla todos los widgets."""
 
+    _STARTUP_PUMP_MS = 30
+
     def __init__(self, local_ip: str | None = None,
                  manager: "AppManager | None" = None):
         super().__init__()
@@ -71,26 +78,36 @@ class AppInterface(ctk.CTk):
         self._viewer = ImageViewer(main, local_ip=self._local_ip)
         self._viewer.grid(row=0, column=0, sticky="nswe", padx=16, pady=(16, 8))
 
-        self._history = HistoryBar(main, on_thumbnail_click=self._viewer.show_image)
+        self._history = HistoryBar(main, on_thumbnail_click=self._on_thumbnail_click)
         self._history.grid(row=1, column=0, sticky="we", padx=16, pady=(4, 16))
 
-        # ── Cargar fotos existentes ──
-        self._load_existing_photos()
+        self._dispatch = DisplayScheduler(
+            self._viewer, self._history, self._sidebar,
+            on_shown=manager.on_photo_shown if manager is not None else None,
+        )
+        # Recarga del historial en curso tras una migración de la carpeta (_relocate)
+        self._relocating = False
+
+        STARTUP.mark("ventana creada")
+
+        # ── Cargar fotos existentes (en segundo plano) ──
+        self._start_loading()
 
     # ───────── API pública (llamada por AppManager) ─────────
-    def display_image(self, filepath: str):
-        """Muestra una nueva foto: visor + thumbnail + LED."""
-        success = self._viewer.show_image(filepath)
-        self._history.add_thumbnail(filepath)
-        self._sidebar.flash_led()
-
-        if success:
-            self._sidebar.set_status(os.path.basename(filepath))
-        else:
-            self._sidebar.set_status("⚠ Foto corrupta", is_error=True)
-            logger.warning("Imagen corrupta recibida: %s", filepath)
+    def display_prepared(self, photo: "PreparedPhoto"):
+        """
+        Encola una foto ya decodificada por el pipeline. El planificador agrupa
+        las ráfagas: un render del visor y miniaturas repartidas en cuadros.
+        """
+        self._dispatch.push(photo)
 
-        self._sidebar.update_photo_count()
+    def viewer_box(self) -> tuple[int, int]:
+        """Tamaño al que el pipeline debe reducir las fotos para el visor."""
+        return self._viewer.viewer_box()
+
+    def pyramid_box(self) -> tuple[int, int]:
+        """Tamaño del nivel mayor de las pirámides que prepara el pipeline."""
+        return self._viewer.pyramid_box()
 
     def on_storage_path_changed(self, new_path: str):
         """Llamado por el manager cuando cambia la carpeta de destino."""
@@ -103,8 +120,67 @@ class AppInterface(ctk.CTk):
         if self._manager is not None:
             self._manager.update_storage_path(new_path)
 
+    def _on_thumbnail_click(self, filepath: str):
+        """Muestra una foto del historial y precarga sus vecinas para la siguiente."""
+        if not os.path.isfile(filepath):
+            self._relocate(filepath)
+        else:
+            self._show_from_history(filepath)
+
+    def _show_from_history(self, filepath: str):
+        if self._viewer.show_image(filepath):
+            self._viewer.prefetch(
+                self._history.neighbours(filepath, APP_CONFIG["viewer_prefetch_radius"])
+            )
+
+    # ───────── Fotos movidas ─────────
+    def _relocate(self, filepath: str):
+        """
+        La foto ya no está donde la dejó el historial: `python main.py --migrate-storage`
+        movió la carpeta a subcarpetas AAAA/MM/DD (con los nombres intactos). El
+        catálogo ya tiene las rutas nuevas; se consultan, junto con qué entradas del
+        historial siguen existiendo, en un hilo aparte, y al terminar se muestra la foto.
+        """
+        if self._relocating:
+            return
+        self._relocating = True
+        result: queue.Queue = queue.Queue()
+        threading.Thread(target=self._find_moved, args=(filepath, self._history.paths, result),
+                         name="relocate", daemon=True).start()
+        self.after(self._STARTUP_PUMP_MS, self._apply_moved, filepath, result)
+
+    @staticmethod
+    def _find_moved(filepath: str, history: list[str], result: queue.Queue):
+        """Hilo de relocate: sólo catálogo y disco, sin tocar widgets."""
+        files, gone, moved = [], set(), None
+        try:
+            files = get_catalog().newest(APP_CONFIG["history_max_entries"])
+            known = set(files)
+            gone = {fp for fp in history if fp not in known and not os.path.isfile(fp)}
+            name = os.path.basename(filepath)
+            moved = next((fp for fp in reversed(files) if os.path.basename(fp) == name), None)
+        except Exception as e:
+            logger.warning("No se pudo recargar el historial: %s", e)
+        finally:
+            result.put((files, gone, moved))
+
+    def _apply_moved(self, filepath: str, result: queue.Queue):
+        try:
+            files, gone, moved = result.get_nowait()
+        except queue.Empty:
+            self.after(self._STARTUP_PUMP_MS, self._apply_moved, filepath, result)
+            return
+        self._relocating = False
+        if files:
+            self._history.set_entries(files, gone)
+        if moved is not None:
+            self._viewer.relocate(filepath, moved)
+            self._show_from_history(moved)
+
     def _on_close(self):
         """Confirmación antes de cerrar la aplicación."""
+        from tkinter import messagebox  # diferido: sólo se usa al cerrar
+
         if messagebox.askyesno(
             "Cerrar aplicación",
             "¿Estás seguro de que deseas cerrar el receptor de fotos?",
@@ -114,32 +190,79 @@ class AppInterface(ctk.CTk):
             self.destroy()
 
     # ───────── Carga inicial ─────────
-    def _load_existing_photos(self):
-        """Carga fotos que ya existan en la carpeta al iniciar."""
-        upload_folder = APP_CONFIG["upload_folder"]
-        if not os.path.isdir(upload_folder):
-            self._sidebar.update_photo_count()
-            return
+    def _start_loading(self):
+        """
+        Rellena historial y visor en segundo plano: la ventana aparece sin esperar
+        a la carpeta. Primero las fotos más recientes, luego el historial completo.
+        """
+        self._startup_queue: queue.Queue = queue.Queue()
+        self._mapped = False
+        self.bind("<Map>", self._on_first_map, add="+")
+        threading.Thread(target=self._load_existing_photos, args=(self.pyramid_box(),),
+                         name="startup-loader", daemon=True).start()
+        self.after(self._STARTUP_PUMP_MS, self._pump_startup)
 
-        allowed = APP_CONFIG["allowed_extensions"]
-        files = sorted(
-            [
-                os.path.join(upload_folder, f)
-                for f in os.listdir(upload_folder)
-                if os.path.isfile(os.path.join(upload_folder, f))
-                and "." in f
-                and f.rsplit(".", 1)[1].lower() in allowed
-            ],
-            key=os.path.getmtime,
-        )
+    def _on_first_map(self, event):
+        # <Map> de la raíz también se dispara para cada widget hijo
+        if event.widget is self and not self._mapped:
+            self._mapped = True
+            STARTUP.mark(FIRST_WINDOW)
 
-        max_thumbs = APP_CONFIG["max_thumbnails"]
-        for fp in files[-max_thumbs:]:
-            self._history.add_thumbnail(fp)
+    def _load_existing_photos(self, pyramid_box: tuple[int, int]):
+        """Hilo de carga: sólo lee disco y decodifica; los widgets se tocan en _pump_startup."""
+        post = self._startup_queue.put
+        try:
+            with STARTUP.phase("fotos recientes"):
+                catalog = get_catalog()
+                quick = APP_CONFIG["startup_recent"]
+                # Catálogo de una sesión anterior: consulta indexada sin esperar la reconciliación
+                if catalog.count():
+                    recent = catalog.newest(quick)
+                else:
+                    recent = newest_on_disk(catalog.folder, quick)
+            post(("recent", recent))
 
-        # Mostrar la última foto en el visor
-        if files:
-            self._viewer.show_image(files[-1])
+            if recent:
+                with STARTUP.phase("foto en el visor"):
+                    try:
+                        post(("viewer", recent[-1], ImagePyramid.open(recent[-1], pyramid_box)))
+                    except Exception as e:
+                        logger.warning("No se pudo cargar la imagen %s: %s", recent[-1], e)
 
-        self._sidebar.update_photo_count()
-        logger.info("Cargadas %d fotos existentes del historial", len(files))
+            with STARTUP.phase("historial completo"):
+                # La fase rápida de reconciliación sólo hace stat; los hashes siguen en segundo plano
+                catalog.scanned.wait()
+                files = catalog.newest(APP_CONFIG["history_max_entries"])
+            post(("history", files))
+        finally:
+            post(("done",))
+
+    def _pump_startup(self):
+        """Aplica en el hilo de Tk lo que va preparando el hilo de carga."""
+        try:
+            while True:
+                message = self._startup_queue.get_nowait()
+                kind = message[0]
+                if kind == "recent":
+                    self._history.set_entries(message[1])
+                elif kind == "viewer":
+                    # Si ya llegó una foto nueva, no reemplazarla por una antigua
+                    if not self._viewer.has_image:
+                        _, filepath, pyramid = message
+                        self._viewer.show_prepared(filepath, pyramid.fit(self._viewer.viewer_box()),
+                                                   pyramid)
+                        STARTUP.mark("primera foto en pantalla")
+                elif kind == "history":
+                    self._history.set_entries(message[1])
+                    self._sidebar.update_photo_count()
+                    logger.info("Cargadas %d fotos existentes en el historial (%d en la carpeta)",
+                                len(message[1]), get_catalog().count())
+                elif kind == "done":
+                    if self._manager is not None:
+                        self._manager.on_startup_done()
+                    else:
+                        STARTUP.finish()
+                    return
+        except queue.Empty:
+            pass
+        self.after(self._STARTUP_PUMP_MS, self._pump_startup)
@@ -0,0 +1,140 @@
+"""
+The Elite Flower — Planificador de despacho a la GUI.
+Agrupa las ráfagas de fotos en cuadros con presupuesto de tiempo:
+  • el visor sólo renderiza la foto más nueva de la ráfaga;
+  • las miniaturas se añaden poco a poco, las que quepan en cada cuadro;
+  • LED, estado y contador se actualizan una vez por ráfaga, no por foto.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Optional
+
+from config import APP_CONFIG
+from metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from pipeline import PreparedPhoto
+    from ui.sidebar import Sidebar
+    from ui.viewer import HistoryBar, ImageViewer
+
+logger = logging.getLogger("dispatch")
+
+RENDER_SECONDS = REGISTRY.histogram("elite_render_seconds",
+                                    "Tiempo en el hilo de Tk por foto mostrada", ("target",))
+DISPATCH_LAG = REGISTRY.histogram(
+    "elite_dispatch_lag_seconds",
+    "Desde que la foto está decodificada hasta que la GUI la pinta", ("target",))
+_RENDER_VIEWER = RENDER_SECONDS.labels("viewer")
+_RENDER_THUMBNAIL = RENDER_SECONDS.labels("thumbnail")
+_LAG_VIEWER = DISPATCH_LAG.labels("viewer")
+_LAG_THUMBNAIL = DISPATCH_LAG.labels("thumbnail")
+
+
+class DisplayScheduler:
+    """Cola de fotos listas para mostrar, consumida por cuadros en el hilo de Tk."""
+
+    def __init__(self, viewer: "ImageViewer", history: "HistoryBar", sidebar: "Sidebar",
+                 on_shown: Optional[Callable[["PreparedPhoto"], None]] = None):
+        self._viewer = viewer
+        self._history = history
+        self._sidebar = sidebar
+        self._on_shown = on_shown
+
+        self._budget_s = APP_CONFIG["frame_budget_ms"] / 1000
+        self._frame_ms = APP_CONFIG["frame_interval_ms"]
+        self._debounce_ms = APP_CONFIG["status_debounce_ms"]
+
+        self._thumbs: Deque["PreparedPhoto"] = deque()
+        self._latest: Optional["PreparedPhoto"] = None
+        self._frame_id: Optional[str] = None
+        self._status_id: Optional[str] = None
+
+        # Resumen de la ráfaga en curso (para el estado)
+        self._arrived = False
+        self._received = 0
+        self._errors = 0
+        self._last_name = ""
+
+    def push(self, photo: "PreparedPhoto"):
+        """Encola una foto preparada; se mostrará en el próximo cuadro."""
+        if photo.thumbnail is not None:
+            self._thumbs.append(photo)
+        if photo.ok:
+            self._received += 1
+            self._last_name = os.path.basename(photo.filepath)
+            if photo.viewer_image is not None:
+                self._latest = photo
+        else:
+            self._errors += 1
+            logger.warning("Imagen corrupta recibida: %s (%s)", photo.filepath, photo.error)
+        self._arrived = True
+
+        if self._frame_id is None:
+            self._frame_id = self._viewer.after_idle(self._frame)
+
+    @property
+    def backlog(self) -> int:
+        return len(self._thumbs)
+
+    # ───────── Cuadros ─────────
+    def _frame(self):
+        self._frame_id = None
+        deadline = time.perf_counter() + self._budget_s
+
+        if self._latest is not None:
+            photo, self._latest = self._latest, None
+            started = time.perf_counter()
+            _LAG_VIEWER.observe(started - photo.ready_at)
+            self._viewer.show_prepared(photo.filepath, photo.viewer_image, photo.pyramid)
+            ended = time.perf_counter()
+            _RENDER_VIEWER.observe(ended - started)
+            if photo.trace is not None:
+                photo.trace.span("espera Tk", "gui", photo.ready_at, started, target="viewer")
+                photo.trace.span("visor", "gui", started, ended)
+            if self._on_shown is not None:
+                # Tras el redibujado que dejó pendiente configure()
+                self._viewer.after_idle(self._on_shown, photo)
+
+        if self._arrived:
+            self._arrived = False
+            self._sidebar.flash_led()
+            if self._status_id is None:
+                self._status_id = self._viewer.after(self._debounce_ms, self._flush_status)
+
+        # Al menos una miniatura por cuadro para avanzar aunque el presupuesto sea mínimo
+        while self._thumbs:
+            photo = self._thumbs.popleft()
+            started = time.perf_counter()
+            _LAG_THUMBNAIL.observe(started - photo.ready_at)
+            self._history.add_thumbnail(photo.filepath, photo.thumbnail)
+            now = time.perf_counter()
+            _RENDER_THUMBNAIL.observe(now - started)
+            if photo.trace is not None:
+                photo.trace.span("espera Tk", "gui", photo.ready_at, started, target="thumbnail")
+                photo.trace.span("miniatura", "gui", started, now)
+            if now >= deadline:
+                break
+
+        if self._thumbs:
+            self._frame_id = self._viewer.after(self._frame_ms, self._frame)
+
+    def _flush_status(self):
+        self._status_id = None
+        received, errors = self._received, self._errors
+        self._received = self._errors = 0
+
+        if errors and not received:
+            text = "Foto corrupta" if errors == 1 else f"{errors} fotos corruptas"
+            self._sidebar.set_status(text, is_error=True)
+        elif received == 1 and not errors:
+            self._sidebar.set_status(self._last_name)
+        elif received:
+            text = f"{received} fotos · {self._last_name}"
+            if errors:
+                text += f" · {errors} corruptas"
+            self._sidebar.set_status(text)
+
+        self._sidebar.update_photo_count()
@@ -5,12 +5,11 @@ Muestra IP, puerto, LED de estado, contador y botón de carpeta.
 
 import os
 import sys
-import subprocess
-from tkinter import filedialog
 from typing import Callable, Optional
 
 import customtkinter as ctk
 
+from catalog import get_catalog
 from config import APP_CONFIG, THEME
 
 
@@ -34,6 +33,8 @@ class Sidebar(ctk.CTkFrame):
         self._local_ip = local_ip
         self._on_select_folder = on_select_folder
         self._led_after_id: str | None = None
+        self._status_after_id: str | None = None
+        self._count_after_id: str | None = None
         self._font = THEME["font_family"]
         self._accent = THEME["accent"]
 
@@ -185,21 +186,29 @@ class Sidebar(ctk.CTkFrame):
             self._status_label.configure(text=f"⚠ {filename}", text_color="#ef4444")
         else:
             self._status_label.configure(text=f"✔ {filename}", text_color=self._accent)
-        self.after(
-            APP_CONFIG["status_duration_ms"],
-            lambda: self._status_label.configure(
-                text="Esperando fotos…", text_color=THEME["text_secondary"]
-            ),
-        )
+        # Un solo reinicio pendiente: el último estado dura status_duration_ms completos
+        if self._status_after_id is not None:
+            self.after_cancel(self._status_after_id)
+        self._status_after_id = self.after(APP_CONFIG["status_duration_ms"], self._reset_status)
+
+    def _reset_status(self):
+        self._status_after_id = None
+        self._status_label.configure(text="Esperando fotos…", text_color=THEME["text_secondary"])
 
     def update_photo_count(self):
-        """Actualiza el contador de fotos."""
-        folder = APP_CONFIG["upload_folder"]
-        if os.path.isdir(folder):
-            count = len([f for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f))])
-        else:
-            count = 0
-        self._count_label.configure(text=f"{count} fotos recibidas")
+        """Actualiza el contador de fotos (desde el catálogo, sin escanear la carpeta)."""
+        if self._count_after_id is not None:
+            self.after_cancel(self._count_after_id)
+            self._count_after_id = None
+        catalog = get_catalog()
+        self._count_label.configure(text=f"{catalog.count()} fotos recibidas")
+        if not catalog.scanned.is_set():
+            # Carpeta recién abierta: repetir cuando termine la reconciliación
+            self._count_after_id = self.after(250, self._retry_photo_count)
+
+    def _retry_photo_count(self):
+        self._count_after_id = None
+        self.update_photo_count()
 
     # ───────── Carpeta ─────────
     def _open_folder(self):
@@ -207,13 +216,18 @@ class Sidebar(ctk.CTkFrame):
         os.makedirs(folder, exist_ok=True)
         if sys.platform == "win32":
             os.startfile(folder)
-        elif sys.platform == "darwin":
+            return
+
+        import subprocess  # diferido: sólo macOS/Linux
+        if sys.platform == "darwin":
             subprocess.Popen(["open", folder])
         else:
             subprocess.Popen(["xdg-open", folder])
 
     def _select_folder(self):
         """Abre diálogo nativo para elegir carpeta de destino."""
+        from tkinter import filedialog  # diferido: sólo al pulsar el botón
+
         new_path = filedialog.askdirectory(
             title="Seleccionar carpeta de destino",
             initialdir=APP_CONFIG["upload_folder"],
@@ -3,12 +3,16 @@ The Elite Flower — Visor de imágenes e historial de miniaturas.
 """
 
 import logging
-from typing import Callable, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Collection, Optional
 
 import customtkinter as ctk
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk
 
 from config import APP_CONFIG, THEME
+from pyramid import ImagePyramid, PyramidCache
+from thumbcache import get_thumbnail_cache, rounded_mask
 
 logger = logging.getLogger("viewer")
 
@@ -27,6 +31,9 @@ class ImageViewer(ctk.CTkFrame):
         )
         self._current_ref: Optional[ImageTk.PhotoImage] = None
         self._current_filepath: Optional[str] = None
+        # Pirámide de la foto actual (fijada aunque la caché la expulse) y de sus vecinas
+        self._pyramid: Optional[ImagePyramid] = None
+        self._pyramids = PyramidCache(APP_CONFIG["viewer_cache_mb"] * 1024 * 1024)
 
         self._image_label = ctk.CTkLabel(self, text="", fg_color="transparent")
         self._image_label.pack(expand=True, fill="both", padx=8, pady=8)
@@ -52,27 +59,48 @@ class ImageViewer(ctk.CTkFrame):
         Devuelve True si tuvo éxito, False si la imagen está corrupta.
         """
         try:
-            img = Image.open(filepath)
-            img.load()  # Forzar lectura completa para detectar archivos corruptos
+            pyramid = self._pyramids.load(filepath, self.pyramid_box())
         except Exception as e:
             logger.warning("No se pudo cargar la imagen %s: %s", filepath, e)
             return False
 
+        self.update_idletasks()
+        self.show_prepared(filepath, pyramid.fit(self.viewer_box()), pyramid)
+        return True
+
+    def show_prepared(self, filepath: str, img: Image.Image,
+                      pyramid: Optional[ImagePyramid] = None):
+        """Muestra una imagen ya decodificada y reducida en segundo plano."""
         self._placeholder.place_forget()
         self._current_filepath = filepath
-        self._render_image(img)
-        return True
+        self._pyramid = pyramid
+        if pyramid is not None:
+            self._pyramids.put(filepath, pyramid)
+        self._set_photo(img)
 
-    def _render_image(self, img: Image.Image):
-        """Renderiza una imagen PIL ajustada al tamaño actual del visor."""
-        self.update_idletasks()
+    def relocate(self, old_path: str, new_path: str):
+        """La foto actual cambió de ruta (migración de la carpeta)."""
+        if self._current_filepath == old_path:
+            self._current_filepath = new_path
+
+    def prefetch(self, paths: list[str]):
+        """Prepara en segundo plano las pirámides de las fotos vecinas."""
+        self._pyramids.prefetch(paths, self.pyramid_box())
+
+    @property
+    def has_image(self) -> bool:
+        return self._current_filepath is not None
 
-        max_w = max(self.winfo_width() - 24, 200)
-        max_h = max(self.winfo_height() - 24, 200)
+    def viewer_box(self) -> tuple[int, int]:
+        """Tamaño máximo disponible para la imagen dentro del visor."""
+        return max(self.winfo_width() - 24, 200), max(self.winfo_height() - 24, 200)
 
-        display = img.copy()
-        display.thumbnail((max_w, max_h), Image.LANCZOS)
-        photo = ImageTk.PhotoImage(display)
+    def pyramid_box(self) -> tuple[int, int]:
+        """Nivel mayor de la pirámide: el visor nunca será más grande que la pantalla."""
+        return self.winfo_screenwidth(), self.winfo_screenheight()
+
+    def _set_photo(self, img: Image.Image):
+        photo = ImageTk.PhotoImage(img)
         self._current_ref = photo
         self._image_label.configure(image=photo, text="")
 
@@ -85,36 +113,104 @@ class ImageViewer(ctk.CTkFrame):
         self._resize_after_id = self.after(150, self._do_resize)
 
     def _do_resize(self):
-        """Re-carga y re-escala la imagen actual al nuevo tamaño del visor."""
+        """Re-escala la imagen actual desde su pirámide (sin volver al disco)."""
         self._resize_after_id = None
         if self._current_filepath is None:
             return
-        try:
-            img = Image.open(self._current_filepath)
-            self._render_image(img)
-        except Exception:
-            pass
+        if self._pyramid is None:
+            try:
+                self._pyramid = self._pyramids.load(self._current_filepath, self.pyramid_box())
+            except Exception:
+                return
+        self._set_photo(self._pyramid.fit(self.viewer_box()))
+
+
+class _ThumbnailLoader:
+    """
+    Carga miniaturas (caché en disco) en un hilo aparte para HistoryBar.
+    Los resultados se recogen desde el hilo de Tk con collect().
+    """
+
+    def __init__(self, size: tuple[int, int]):
+        self._size = size
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._done: deque = deque()
+        self._requested: set[str] = set()
+        # Rutas visibles: una carga que salió de pantalla antes de empezar se descarta
+        self.wanted: frozenset[str] = frozenset()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._requested)
+
+    def request(self, filepath: str):
+        if filepath not in self._requested:
+            self._requested.add(filepath)
+            self._pool.submit(self._load, filepath)
+
+    def collect(self) -> list[tuple[str, Optional[Image.Image], bool]]:
+        """Resultados terminados: (ruta, miniatura o None si falló, descartada)."""
+        results = []
+        while self._done:
+            filepath, thumb, skipped = self._done.popleft()
+            self._requested.discard(filepath)
+            results.append((filepath, thumb, skipped))
+        return results
+
+    def _load(self, filepath: str):
+        if filepath not in self.wanted:
+            self._done.append((filepath, None, True))
+            return
+        thumb = get_thumbnail_cache().get_or_create(filepath, self._size)
+        if thumb is None:
+            logger.warning("No se pudo crear miniatura de %s", filepath)
+        self._done.append((filepath, thumb, False))
 
 
 class HistoryBar(ctk.CTkFrame):
-    """Barra inferior con miniaturas clicables de fotos anteriores."""
+    """
+    Barra inferior con miniaturas clicables de fotos anteriores.
+
+    Virtualizada: la lista de rutas no tiene tope práctico, pero sólo existen
+    los huecos visibles del canvas, que se reciclan al desplazarse. Las
+    miniaturas se cargan en segundo plano y sólo las últimas usadas quedan
+    en memoria como PhotoImage.
+    """
+
+    _GAP = 8
+    _COLLECT_MS = 30
 
     def __init__(self, master, on_thumbnail_click: Optional[Callable[[str], None]] = None, **kwargs):
+        self._thumb_size = APP_CONFIG["thumbnail_size"]
         super().__init__(
             master,
             fg_color=THEME["panel_bg"],
             corner_radius=THEME["radius_frame"],
-            height=130,
+            height=self._thumb_size[1] + 60,
             border_width=1,
             border_color=THEME["border_color"],
             **kwargs,
         )
         self.grid_propagate(False)
+        self.pack_propagate(False)
 
         self._on_click = on_thumbnail_click
-        self._thumb_refs: list[ImageTk.PhotoImage] = []
-        self._thumb_size = APP_CONFIG["thumbnail_size"]
-        self._max = APP_CONFIG["max_thumbnails"]
+        self._max_entries = APP_CONFIG["history_max_entries"]
+        self._max_images = APP_CONFIG["history_loaded_images"]
+        self._pitch = self._thumb_size[0] + self._GAP
+
+        # Lista completa (de la más antigua a la más nueva) e índice inverso
+        self._paths: list[str] = []
+        self._index: dict[str, int] = {}
+        # PhotoImage por ruta, LRU acotado
+        self._images: "OrderedDict[str, ImageTk.PhotoImage]" = OrderedDict()
+        self._failed: set[str] = set()
+        self._loader = _ThumbnailLoader(self._thumb_size)
+        self._collect_id: Optional[str] = None
+
+        self._offset = 0      # desplazamiento en píxeles desde la primera miniatura
+        self._follow = True   # pegado al final: las fotos nuevas quedan a la vista
+        self._slots: list[int] = []
 
         ctk.CTkLabel(
             self, text="  HISTORIAL",
@@ -123,50 +219,193 @@ class HistoryBar(ctk.CTkFrame):
             anchor="w",
         ).pack(fill="x", padx=12, pady=(8, 4))
 
-        self._scroll = ctk.CTkScrollableFrame(
-            self, orientation="horizontal",
-            fg_color="transparent", height=90,
-            scrollbar_button_color=THEME["accent"],
-            scrollbar_button_hover_color=THEME["accent_hover"],
+        self._canvas = ctk.CTkCanvas(
+            self, height=self._thumb_size[1] + 8,
+            bg=THEME["panel_bg"], highlightthickness=0, bd=0, cursor="hand2",
         )
-        self._scroll.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        self._canvas.pack(fill="x", padx=8)
 
-    def add_thumbnail(self, filepath: str):
-        """Añade una miniatura al historial."""
-        try:
-            img = Image.open(filepath)
-        except Exception:
-            logger.warning("No se pudo crear miniatura de %s", filepath)
+        self._scrollbar = ctk.CTkScrollbar(
+            self, orientation="horizontal", command=self._on_scrollbar,
+            button_color=THEME["accent"], button_hover_color=THEME["accent_hover"],
+        )
+        self._scrollbar.pack(fill="x", padx=8, pady=(2, 8))
+
+        empty = Image.new("RGBA", self._thumb_size, (*THEME["thumb_bg_rgb"], 255))
+        empty.putalpha(rounded_mask(self._thumb_size, THEME["radius_thumbnail"]))
+        self._empty = ImageTk.PhotoImage(empty)
+
+        self._canvas.bind("<Configure>", lambda e: self._layout())
+        self._canvas.bind("<Button-1>", self._on_canvas_click)
+        self._canvas.bind("<MouseWheel>", self._on_wheel)
+        self._canvas.bind("<Shift-MouseWheel>", self._on_wheel)
+        self._canvas.bind("<Button-4>", lambda e: self._scroll_by(-self._pitch))
+        self._canvas.bind("<Button-5>", lambda e: self._scroll_by(self._pitch))
+
+    # ───────── API ─────────
+    def add_thumbnail(self, filepath: str, thumb: Optional[Image.Image] = None):
+        """
+        Añade una foto al final del historial. Si se pasa la miniatura ya
+        generada se usa directamente; si no, se carga cuando sea visible.
+        """
+        if filepath not in self._index:
+            self._index[filepath] = len(self._paths)
+            self._paths.append(filepath)
+            self._trim()
+        if thumb is not None:
+            self._store(filepath, thumb)
+        if self._follow:
+            self._offset = self._max_offset()
+        self._render()
+
+    @property
+    def paths(self) -> list[str]:
+        """Rutas del historial, de la más antigua a la más nueva."""
+        return list(self._paths)
+
+    def set_entries(self, paths: list[str], gone: Collection[str] = ()):
+        """
+        Reemplaza el historial completo (de la más antigua a la más nueva).
+        Las fotos ya presentes que no estén en `paths` se conservan al final, salvo
+        las de `gone` (ya comprobadas fuera del hilo de Tk: movidas o borradas).
+        """
+        known = set(paths)
+        added = [fp for fp in self._paths if fp not in known and fp not in gone]
+        self._paths = (list(paths) + added)[-self._max_entries:]
+        self._index = {fp: i for i, fp in enumerate(self._paths)}
+        self._images.clear()
+        self._failed.clear()
+        self._follow = True
+        self._offset = self._max_offset()
+        self._render()
+
+    def neighbours(self, filepath: str, radius: int = 1) -> list[str]:
+        """Rutas de las miniaturas a cada lado de `filepath`, de la más cercana a la más lejana."""
+        index = self._index.get(filepath)
+        if index is None:
+            return []
+        result = []
+        for step in range(1, radius + 1):
+            for i in (index + step, index - step):
+                if 0 <= i < len(self._paths):
+                    result.append(self._paths[i])
+        return result
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    # ───────── Virtualización ─────────
+    def _layout(self):
+        """Ajusta el número de huecos reciclables al ancho del canvas."""
+        needed = self._canvas.winfo_width() // self._pitch + 2
+        while len(self._slots) < needed:
+            self._slots.append(self._canvas.create_image(0, 4, anchor="nw", state="hidden"))
+        while len(self._slots) > needed:
+            self._canvas.delete(self._slots.pop())
+        if self._follow:
+            self._offset = self._max_offset()
+        self._render()
+
+    def _render(self):
+        """Asigna a cada hueco la foto que le toca según el desplazamiento."""
+        first = self._offset // self._pitch
+        visible = []
+        for i, item in enumerate(self._slots):
+            index = first + i
+            if index >= len(self._paths):
+                self._canvas.itemconfigure(item, state="hidden")
+                continue
+            filepath = self._paths[index]
+            visible.append(filepath)
+            self._canvas.coords(item, index * self._pitch - self._offset + self._GAP // 2, 4)
+            self._canvas.itemconfigure(item, image=self._image_for(filepath), state="normal")
+        self._loader.wanted = frozenset(visible)
+        self._update_scrollbar()
+
+    def _image_for(self, filepath: str) -> ImageTk.PhotoImage:
+        photo = self._images.get(filepath)
+        if photo is not None:
+            self._images.move_to_end(filepath)
+            return photo
+        if filepath in self._failed:
+            return self._empty
+        self._loader.request(filepath)
+        if self._collect_id is None:
+            self._collect_id = self.after(self._COLLECT_MS, self._collect)
+        return self._empty
+
+    def _collect(self):
+        """Recoge las miniaturas cargadas en segundo plano (sólo mientras haya pendientes)."""
+        self._collect_id = None
+        changed = False
+        for filepath, thumb, skipped in self._loader.collect():
+            if skipped:
+                # Volvió a la vista mientras esperaba: se pedirá de nuevo al renderizar
+                changed |= filepath in self._loader.wanted
+            elif thumb is None:
+                self._failed.add(filepath)
+            elif filepath in self._index:
+                self._store(filepath, thumb)
+                changed = True
+        if changed:
+            self._render()
+        if self._loader.busy and self._collect_id is None:
+            self._collect_id = self.after(self._COLLECT_MS, self._collect)
+
+    def _store(self, filepath: str, thumb: Image.Image):
+        self._images[filepath] = ImageTk.PhotoImage(thumb)
+        self._images.move_to_end(filepath)
+        while len(self._images) > max(self._max_images, len(self._slots)):
+            self._images.popitem(last=False)
+
+    def _trim(self):
+        # Recorte por bloques: amortiza la reconstrucción del índice
+        excess = len(self._paths) - self._max_entries
+        if excess <= 0:
             return
+        excess = max(excess, self._max_entries // 100)
+        for filepath in self._paths[:excess]:
+            self._images.pop(filepath, None)
+        del self._paths[:excess]
+        self._index = {fp: i for i, fp in enumerate(self._paths)}
+        self._offset = max(0, self._offset - excess * self._pitch)
+
+    # ───────── Desplazamiento ─────────
+    def _max_offset(self) -> int:
+        return max(0, len(self._paths) * self._pitch + self._GAP - self._canvas.winfo_width())
+
+    def _scroll_to(self, offset: int):
+        self._offset = min(max(0, int(offset)), self._max_offset())
+        self._follow = self._offset >= self._max_offset()
+        self._render()
+
+    def _scroll_by(self, delta: int):
+        self._scroll_to(self._offset + delta)
+
+    def _on_wheel(self, event):
+        # Windows: múltiplos de 120 por muesca; macOS: valores pequeños
+        notches = event.delta / 120 if abs(event.delta) >= 120 else event.delta
+        self._scroll_by(int(-notches * self._pitch))
+
+    def _on_scrollbar(self, action: str, value, unit: Optional[str] = None):
+        if action == "moveto":
+            self._scroll_to(float(value) * self._total_width())
+        elif action == "scroll":
+            step = self._canvas.winfo_width() if unit == "pages" else self._pitch
+            self._scroll_by(int(value) * step)
+
+    def _update_scrollbar(self):
+        total = self._total_width()
+        width = self._canvas.winfo_width()
+        if total <= width:
+            self._scrollbar.set(0.0, 1.0)
+        else:
+            self._scrollbar.set(self._offset / total, (self._offset + width) / total)
+
+    def _total_width(self) -> int:
+        return max(1, len(self._paths) * self._pitch + self._GAP)
 
-        thumb = img.copy()
-        thumb.thumbnail(self._thumb_size, Image.LANCZOS)
-
-        # Fondo oscuro cuadrado
-        bg_rgb = THEME["thumb_bg_rgb"]
-        bg = Image.new("RGB", self._thumb_size, bg_rgb)
-        offset_x = (self._thumb_size[0] - thumb.size[0]) // 2
-        offset_y = (self._thumb_size[1] - thumb.size[1]) // 2
-        bg.paste(thumb, (offset_x, offset_y))
-
-        # Bordes redondeados
-        mask = Image.new("L", self._thumb_size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.rounded_rectangle([0, 0, *self._thumb_size], radius=THEME["radius_thumbnail"], fill=255)
-        bg.putalpha(mask)
-
-        photo = ImageTk.PhotoImage(bg)
-        self._thumb_refs.append(photo)
-
-        label = ctk.CTkLabel(self._scroll, image=photo, text="", fg_color="transparent", cursor="hand2")
-        label.pack(side="left", padx=4, pady=4)
-
-        if self._on_click is not None:
-            label.bind("<Button-1>", lambda e, fp=filepath: self._on_click(fp))
-
-        # Limitar cantidad
-        children = self._scroll.winfo_children()
-        while len(children) > self._max:
-            children[0].destroy()
-            self._thumb_refs.pop(0)
-            children = self._scroll.winfo_children()
+    def _on_canvas_click(self, event):
+        index = (event.x + self._offset) // self._pitch
+        if self._on_click is not None and 0 <= index < len(self._paths):
+            self._on_click(self._paths[index])
@@ -0,0 +1,171 @@
+"""
+The Elite Flower — Validación estructural de las fotos recibidas.
+Comprueba sin decodificar píxeles que lo recibido es una imagen completa:
+  1. firma (magic bytes) de los primeros bytes, ya durante la recepción;
+  2. cabecera: Pillow lee formato y dimensiones sin decodificar
+     (HEIC/HEIF: cajas ISO-BMFF, Pillow no lo abre sin plugin);
+  3. final: marcador de fin (JPEG, PNG, GIF) o tamaño declarado en la
+     cabecera (WebP, BMP, HEIC) frente a lo recibido.
+El veredicto viaja con la foto (IngestResult → PhotoEvent): una subida dañada
+se rechaza al momento y la GUI no la descubre al decodificarla.
+"""
+
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from metrics import REGISTRY
+
+VALIDATE_SECONDS = REGISTRY.histogram(
+    "elite_validate_seconds", "Validación estructural de una foto recibida (sin decodificar)",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+
+# Bytes necesarios para reconocer cualquiera de los formatos admitidos
+SNIFF_BYTES = 32
+
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+_PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+# XMP de las cámaras que añaden un vídeo tras el fin del JPEG
+_JPEG_TRAILER_HINTS = (b"MotionPhoto", b"MicroVideo")
+_TOO_LARGE = "demasiados píxeles para decodificarla (límite de Pillow)"
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """Resultado de validar una foto; `reason` explica el rechazo."""
+
+    ok: bool
+    format: str = ""
+    size: Tuple[int, int] = (0, 0)
+    # Pillow puede decodificarla (un HEIC íntegro sin plugin es válido pero no visible)
+    displayable: bool = False
+    # Por qué se rechaza, o por qué una foto válida no se puede mostrar
+    reason: str = ""
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """Formato según los primeros SNIFF_BYTES bytes, o None si no es una imagen admitida."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if head.startswith(b"BM"):
+        return "BMP"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[4:8] == b"ftyp":
+        # Marca principal o alguna compatible (las que caben en la cabecera leída)
+        box_end = min(struct.unpack(">I", head[:4])[0], len(head))
+        brands = [head[8:12]] + [head[i:i + 4] for i in range(16, box_end - 3, 4)]
+        if _HEIF_BRANDS.intersection(brands):
+            return "HEIF"
+    return None
+
+
+def inspect_image(filepath: str, head: Optional[bytes] = None) -> Verdict:
+    """Valida el archivo ya escrito; `head` evita releer los primeros bytes."""
+    started = time.perf_counter()
+    try:
+        return _inspect(filepath, head)
+    except OSError as e:
+        return Verdict(False, reason=f"no se pudo leer: {e}")
+    finally:
+        VALIDATE_SECONDS.observe(time.perf_counter() - started)
+
+
+def _inspect(filepath: str, head: Optional[bytes]) -> Verdict:
+    with open(filepath, "rb") as f:
+        if head is None or len(head) < SNIFF_BYTES:
+            head = f.read(SNIFF_BYTES)
+        fmt = sniff(head)
+        if fmt is None:
+            return Verdict(False, reason="no es una imagen (formato no reconocido)")
+        file_size = os.fstat(f.fileno()).st_size
+        if fmt == "HEIF":
+            return _inspect_heif(f, file_size)
+        if not _complete(f, fmt, head, file_size):
+            return Verdict(False, fmt, reason="archivo incompleto (transferencia cortada)")
+
+    from PIL import Image, UnidentifiedImageError  # diferido: headless arranca sin Pillow
+
+    try:
+        # Image.open sólo lee la cabecera: la decodificación es perezosa
+        with Image.open(filepath) as img:
+            size = img.size
+    except Image.DecompressionBombError:
+        # Íntegra pero por encima de Image.MAX_IMAGE_PIXELS: se guarda, no se decodifica
+        return Verdict(True, fmt, reason=_TOO_LARGE)
+    except (UnidentifiedImageError, SyntaxError, ValueError, struct.error) as e:
+        return Verdict(False, fmt, reason=f"cabecera dañada ({e})")
+    if not size[0] or not size[1]:
+        return Verdict(False, fmt, reason="cabecera dañada (dimensiones nulas)")
+    return Verdict(True, fmt, size, displayable=True)
+
+
+def _tail(f, n: int, file_size: int) -> bytes:
+    f.seek(max(0, file_size - n))
+    return f.read(n)
+
+
+def _complete(f, fmt: str, head: bytes, file_size: int) -> bool:
+    """False si el archivo termina antes que su propia estructura."""
+    if fmt == "JPEG":
+        # FF D9 no puede aparecer dentro de los datos comprimidos (FF va seguido de 00):
+        # si está cerca del final, la imagen terminó (con o sin relleno detrás)
+        tail = _tail(f, 4096, file_size)
+        if b"\xff\xd9" in tail or tail.endswith(b"SEFT"):
+            return True
+        # Vídeo añadido tras el EOI («foto en movimiento»): lo anuncia el XMP
+        f.seek(0)
+        return any(hint in f.read(64 * 1024) for hint in _JPEG_TRAILER_HINTS)
+    if fmt == "PNG":
+        return _tail(f, len(_PNG_IEND), file_size) == _PNG_IEND
+    if fmt == "GIF":
+        return _tail(f, 1, file_size) == b";"
+    if fmt == "WEBP":
+        return file_size >= struct.unpack("<I", head[4:8])[0] + 8
+    if fmt == "BMP":
+        declared = struct.unpack("<I", head[2:6])[0]
+        return declared == 0 or file_size >= declared
+    return True
+
+
+def _inspect_heif(f, file_size: int) -> Verdict:
+    """Recorre las cajas de primer nivel: deben existir meta y mdat y cuadrar con el tamaño."""
+    offset = 0
+    boxes = set()
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return Verdict(False, "HEIF", reason="archivo incompleto (caja cortada)")
+        size, kind = struct.unpack(">I4s", header[:8])
+        if size == 1:
+            if len(header) < 16:
+                return Verdict(False, "HEIF", reason="archivo incompleto (caja cortada)")
+            size = struct.unpack(">Q", header[8:16])[0]
+        elif size == 0:
+            size = file_size - offset  # la última caja llega hasta el final
+        if size < 8:
+            return Verdict(False, "HEIF", reason="cabecera dañada (caja inválida)")
+        if offset + size > file_size:
+            return Verdict(False, "HEIF", reason="archivo incompleto (transferencia cortada)")
+        boxes.add(kind)
+        offset += size
+    if not {b"meta", b"mdat"} <= boxes:
+        return Verdict(False, "HEIF", reason="cabecera dañada (faltan meta/mdat)")
+
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # Sólo con un plugin HEIF registrado en Pillow
+        with Image.open(f.name) as img:
+            return Verdict(True, "HEIF", img.size, displayable=True)
+    except Image.DecompressionBombError:
+        return Verdict(True, "HEIF", reason=_TOO_LARGE)
+    except (UnidentifiedImageError, SyntaxError, ValueError):
+        return Verdict(True, "HEIF")